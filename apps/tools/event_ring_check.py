@@ -0,0 +1,75 @@
+"""Check that the dashboard event ring keeps history through idle runs, wraps and restarts.
+
+Builds an `EventStore` on a small ring in a temporary directory and checks that:
+
+- a long `no_target` run is one event (with its `count`) and evicts nothing older;
+- a cursor client polling during the run sees every update;
+- reopening the file restores the same ids and events;
+- once the ring wraps, `since(0)` returns the newest `capacity` events in order.
+
+    python -m apps.tools.event_ring_check --capacity 64 --idle 1000
+"""
+from __future__ import annotations
+
+import argparse
+import tempfile
+from pathlib import Path
+from typing import List
+
+from dashboard_pkg.backend.events import EventStore
+
+
+def check(args: argparse.Namespace, workdir: Path) -> List[str]:
+    failures: List[str] = []
+    path = workdir / "events.ring"
+    store = EventStore(memory_size=args.memory, path=path, capacity=args.capacity)
+    target_ids = [store.append({"message": "target", "has_target": True}) for _ in range(args.targets)]
+    cursor = store.last_id
+    for frame in range(args.idle):
+        store.append({"message": "no_target", "has_target": False})
+        update = store.since(cursor)
+        if len(update) != 1 or update[0].get("count", 1) != frame + 1:
+            failures.append(f"idle frame {frame}: cursor poll returned {update}")
+            break
+        cursor = update[0]["id"]
+    history = store.since(0, limit=args.capacity)
+    kept = [event["id"] for event in history if event["message"] == "target"]
+    if kept != target_ids:
+        failures.append(f"after {args.idle} idle frames: target ids {kept}, expected {target_ids}")
+    runs = [event for event in history if event["message"] == "no_target"]
+    if len(runs) != 1 or runs[0].get("count") != args.idle:
+        failures.append(f"idle run stored as {[(e['id'], e.get('count')) for e in runs]}")
+    store.close()
+
+    store = EventStore(memory_size=args.memory, path=path, capacity=args.capacity)
+    if store.last_id != cursor or store.since(0, limit=args.capacity) != history:
+        failures.append(f"reopened ring: last_id {store.last_id} (expected {cursor}) or events differ")
+    wrapped = [store.append({"message": "target", "has_target": True}) for _ in range(args.capacity * 3)]
+    ids = [event["id"] for event in store.since(0, limit=args.capacity * 2)]
+    if ids != wrapped[-args.capacity :]:
+        failures.append(f"after wrapping: {len(ids)} events from id {ids[:1]}, expected the newest {args.capacity}")
+    store.close()
+    return failures
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--capacity", type=int, default=64, help="Ring slots")
+    p.add_argument("--memory", type=int, default=4, help="Events kept in memory (fewer than --targets)")
+    p.add_argument("--targets", type=int, default=6, help="Target events before the idle run")
+    p.add_argument("--idle", type=int, default=1000, help="Consecutive no_target frames")
+    args = p.parse_args()
+    if not args.memory < args.targets < args.capacity:
+        p.error("need --memory < --targets < --capacity, so older events are read back from the ring")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        failures = check(args, Path(tmp))
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if failures:
+        raise SystemExit(1)
+    print(f"ok: {args.targets} targets kept through {args.idle} idle frames in a {args.capacity}-slot ring")
+
+
+if __name__ == "__main__":
+    main()
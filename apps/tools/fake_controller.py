@@ -0,0 +1,269 @@
+"""pty stand-in for the UNO R4 controller, for exercising the host stack without hardware.
+
+It speaks the firmware's JSON-lines protocol (`ping`, `home`, `move`, `path`, `config`),
+keeps the same drop-oldest command queue, and "executes" moves in real time with
+`control.host.trajectory.execute_waypoint` (firmware slew, laser pulse, arrive-by
+pacing) so host-side throughput and timing can be measured. Its `millis()` can be
+given an offset and drift to exercise host clock sync.
+
+    python -m apps.tools.fake_controller          # prints the pty path to pass as --serial-port
+"""
+from __future__ import annotations
+
+import json
+import os
+import pty
+import select
+import threading
+import time
+import tty
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+from control.host.trajectory import (
+    COMMAND_QUEUE_CAP,
+    PATH_LATE_TOLERANCE_MS,
+    PATH_MAX_WAYPOINTS,
+    FirmwareWaypoint,
+    execute_waypoint,
+)
+
+TELEMETRY_PERIOD_S = 0.25
+
+
+class FakeController:
+    """Controller emulator on the slave side of a pseudo-terminal."""
+
+    def __init__(
+        self,
+        pan_dps: float = 90.0,
+        tilt_dps: float = 90.0,
+        pulse_ms: int = 500,
+        boot_delay_s: float = 0.0,
+        homed: bool = True,
+        telemetry: bool = True,
+        clock_offset_ms: float = 0.0,
+        clock_drift_ppm: float = 0.0,
+    ) -> None:
+        self.pan_dps = pan_dps
+        self.tilt_dps = tilt_dps
+        self.pulse_ms = pulse_ms
+        self.boot_delay_s = boot_delay_s
+        self.homed = homed
+        self.telemetry = telemetry
+        self.clock_offset_ms = clock_offset_ms
+        self.clock_rate = 1.0 + clock_drift_ppm * 1e-6
+        self.received: List[Dict] = []
+        self.completed: List[Dict] = []
+        self.dropped = 0
+        self.skipped = 0
+        self._joints = {"pan": 0.0, "tilt": 0.0}
+        self._target = dict(self._joints)  # set at dispatch; _joints catches up when the dwell ends
+        self._queue: Deque[FirmwareWaypoint] = deque()
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._t0 = time.monotonic()
+        self._master, self._slave = pty.openpty()
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self._threads = [
+            threading.Thread(target=self._serial_loop, daemon=True),
+            threading.Thread(target=self._motion_loop, daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def millis(self) -> int:
+        return int((time.monotonic() - self._t0) * self.clock_rate * 1000 + self.clock_offset_ms)
+
+    def _sleep_until_ms(self, fw_ms: float) -> None:
+        delay = (fw_ms - self.millis()) / 1000.0 / self.clock_rate
+        if delay > 0:
+            self._stop.wait(delay)
+
+    def close(self) -> None:
+        """Stop the emulator; the host sees the port vanish as a disconnect."""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        for fd in (self._slave, self._master):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    # ------------------------------------------------------------------ protocol
+
+    def _emit(self, payload: Dict) -> None:
+        line = (json.dumps(payload) + "\n").encode("utf-8")
+        with self._write_lock:
+            try:
+                os.write(self._master, line)
+            except OSError:
+                pass
+
+    def _ack(
+        self, status: str, detail: Optional[str] = None, seq: Optional[int] = None, tag: Optional[int] = None
+    ) -> None:
+        payload = {
+            "status": status,
+            "queue": len(self._queue),
+            "pan_homed": self.homed,
+            "tilt_homed": self.homed,
+            "homing": False,  # homing completes instantly here
+            "time_ms": self.millis(),
+        }
+        if detail:
+            payload["detail"] = detail
+        if seq is not None:
+            payload["seq"] = seq
+        if tag:
+            payload["tag"] = tag
+        self._emit(payload)
+
+    def _telemetry(self) -> Dict:
+        """Firmware `emitTelemetry` subset: queue depth, axis steps vs target, laser busy."""
+        busy = self._joints != self._target
+        payload: Dict = {"status": "telemetry", "time_ms": self.millis(), "queue": len(self._queue)}
+        for axis in ("pan", "tilt"):
+            payload[axis] = {
+                "steps": int(round(self._joints[axis] * 100)),
+                "target": int(round(self._target[axis] * 100)),
+                "homed": self.homed,
+            }
+        payload["laser"] = {"pending": busy, "active": False}
+        return payload
+
+    def _handle(self, msg: Dict) -> None:
+        cmd = msg.get("cmd")
+        if cmd == "ping":
+            self._ack("pong", seq=msg.get("seq"))
+        elif cmd == "home":
+            with self._cond:
+                self._queue.clear()
+                self._joints = {"pan": 0.0, "tilt": 0.0}
+                self._target = dict(self._joints)
+            self.homed = True
+            self._ack("homing")
+        elif cmd == "move":
+            if not self.homed:
+                self._ack("error", "home_required")
+                return
+            joints = msg.get("joints") or {}
+            pan, tilt = float(joints.get("pan", 0.0)), float(joints.get("tilt", 0.0))
+            item = FirmwareWaypoint(pan, tilt, None, self.pulse_ms, self.millis(), tag=msg.get("tag"))
+            dropped = self._push([item])
+            if "pan" not in joints or "tilt" not in joints:
+                self._ack("error", "missing_joints")
+            else:
+                self._ack("queued", "dropped_oldest" if dropped else None)
+        elif cmd == "path":
+            if not self.homed:
+                self._ack("error", "home_required")
+                return
+            rows = msg.get("wp") or []
+            if not rows:
+                self._ack("error", "missing_wp")
+                return
+            if len(rows) > PATH_MAX_WAYPOINTS:
+                self._ack("error", "path_too_long")
+                return
+            late_ms = float(msg.get("late_ms", PATH_LATE_TOLERANCE_MS))
+            now_ms = self.millis()
+            tag = msg.get("tag")  # waypoint i carries tag + i, like the firmware
+            items = [
+                FirmwareWaypoint(
+                    float(pan), float(tilt), float(arrive_ms), float(dwell_ms), now_ms, late_ms,
+                    tag=(tag + i) if tag else None,
+                )
+                for i, (pan, tilt, arrive_ms, dwell_ms) in enumerate(rows)
+            ]
+            dropped = self._push(items)
+            self._ack("queued", "path_dropped_oldest" if dropped else "path")
+        elif cmd == "config":
+            self._ack("config", "no_change")
+        else:
+            self._ack("error", "unknown_cmd")
+
+    def _push(self, items: List[FirmwareWaypoint]) -> bool:
+        dropped = False
+        with self._cond:
+            for item in items:
+                if len(self._queue) >= COMMAND_QUEUE_CAP:
+                    self._queue.popleft()
+                    self.dropped += 1
+                    dropped = True
+                self._queue.append(item)
+            self._cond.notify_all()
+        return dropped
+
+    def _serial_loop(self) -> None:
+        buf = b""
+        next_telemetry = time.monotonic()
+        while not self._stop.is_set():
+            if self.telemetry and time.monotonic() >= next_telemetry:
+                next_telemetry += TELEMETRY_PERIOD_S
+                self._emit(self._telemetry())
+            try:
+                ready, _, _ = select.select([self._master], [], [], 0.05)
+                if not ready:
+                    continue
+                data = os.read(self._master, 4096)
+            except (OSError, ValueError):
+                return
+            buf += data
+            while b"\n" in buf:
+                raw, buf = buf.split(b"\n", 1)
+                if time.monotonic() - self._t0 < self.boot_delay_s:
+                    continue  # still "in the bootloader"
+                try:
+                    msg = json.loads(raw)
+                except json.JSONDecodeError:
+                    self._ack("error", "json_parse")
+                    continue
+                self.received.append(msg)
+                self._handle(msg)
+
+    def _motion_loop(self) -> None:
+        while not self._stop.is_set():
+            with self._cond:
+                while not self._queue and not self._stop.is_set():
+                    self._cond.wait(0.1)
+                if self._stop.is_set():
+                    return
+                item = self._queue.popleft()
+            pose = (self._joints["pan"], self._joints["tilt"])
+            result = execute_waypoint(pose, item, self.millis(), self.pan_dps, self.tilt_dps)
+            if result.skipped:
+                self.skipped += 1
+                self._ack("skipped", "late", tag=item.tag)
+                continue
+            self._target = {"pan": item.pan, "tilt": item.tilt}
+            self._ack("dispatch", tag=item.tag)
+            self._sleep_until_ms(result.end_ms)
+            self._joints = {"pan": item.pan, "tilt": item.tilt}
+            self.completed.append(
+                {
+                    "time_ms": self.millis(),
+                    "joints": dict(self._joints),
+                    "arrive_by_ms": item.arrive_ms,
+                    "fire_ms": result.fire_ms,
+                }
+            )
+
+
+def main() -> None:
+    ctrl = FakeController()
+    print(ctrl.port, flush=True)
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ctrl.close()
+
+
+if __name__ == "__main__":
+    main()
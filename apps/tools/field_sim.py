@@ -0,0 +1,325 @@
+"""Synthetic weed field: drive the runtime's planner past simulated weeds and score the shots.
+
+The camera moves over a random weed field at `--speed`. Each inference frame projects the
+visible weeds into pixel detections through the configured homography (or
+`projection.fallback`), with pixel noise, misses and false positives. Each frame becomes a
+detection-log entry (`records.encode_frame`) and goes to `Runtime.ingest` / `Runtime.plan`
+on a simulated clock. Heads are built from `configs/robot.yaml`, so `PanTiltRig` limits,
+slew rates and dwell apply. A dispatched target is a hit if the weed is within
+`--hit-radius` of the aim point when the head arrives. The weed has kept moving since its
+frame was captured, and the runtime does not predict that motion.
+
+Planned moves are committed directly instead of going through `Runtime.send`, so
+`command_shaping` (deadband, coalescing, `max_rate_hz`) is not applied: the shaper runs
+on the wall clock with a timer thread, and the simulation runs on its own clock. Shots
+are therefore an upper bound on the moves a real link would carry, and a head is never
+held back by the rate limit.
+
+Comma lists sweep speed, density and queue settings; every combination is one row:
+
+    python -m apps.tools.field_sim --speed 0.05,0.1,0.2 --density 5,20
+    python -m apps.tools.field_sim --queue-len 3,5,10 --queue-stale 0.5,1.0 --json
+    python -m apps.tools.field_sim --write-log /tmp/sim.log   # replay with runtime --once --dry-run
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from apps.weeder_runtime.field_registry import FieldPose
+from apps.weeder_runtime.runtime import Runtime, build_heads, load_config
+from vision.calibration.homography import Homography
+from vision.capture.pipeline import load_camera_config
+from vision.detection.records import decode_line, encode_frame
+
+
+@dataclass
+class Scenario:
+    speed_mps: float
+    density_per_m2: float
+    queue_len: int
+    queue_stale_s: float
+    queue_merge_m: float
+
+
+@dataclass
+class SimSettings:
+    duration_s: float = 30.0  # weeds enter the view for this long; the run continues until they leave
+    infer_fps: float = 15.0
+    latency_s: float = 0.08  # capture -> detection entry reaches the runtime
+    link_s: float = 0.02  # runtime send -> controller starts the move
+    noise_px: float = 2.0
+    miss_rate: float = 0.1  # per frame, per visible weed
+    false_per_frame: float = 0.05  # mean false positives per frame
+    weed_size_m: float = 0.03
+    hit_radius_m: float = 0.015
+    match_m: float = 0.04  # a target further than this from every weed is a false-positive shot
+    seed: int = 0
+
+
+def projection_homography(cfg: Dict) -> Homography:
+    """The runtime's homography, or one built from `projection.fallback` when none is configured.
+
+    The fallback is linear: `x = forward_offset_m + v * scale_y_m_per_px`,
+    `y = (u - center_u_px) * scale_x_m_per_px`.
+    """
+    proj = cfg.get("projection") or {}
+    path = cfg.get("homography_path") or proj.get("homography_path")
+    if path:
+        return Homography.load(path)
+    fb = proj.get("fallback") or {}
+    sx = float(fb.get("scale_x_m_per_px", 0.0008))
+    sy = float(fb.get("scale_y_m_per_px", 0.0008))
+    cu = float(fb.get("center_u_px", 640.0))
+    x0 = float(fb.get("forward_offset_m", 0.5))
+    return Homography(np.array([[0.0, sy, x0], [sx, 0.0, -sx * cu], [0.0, 0.0, 1.0]]))
+
+
+class FieldSim:
+    """One scenario: a weed field, a camera moving over it, and the runtime aiming at it."""
+
+    def __init__(
+        self, cfg: Dict, homography: Homography, width: int, height: int, scenario: Scenario, settings: SimSettings
+    ) -> None:
+        self.cfg = cfg
+        self.homography = homography
+        self.width = width
+        self.height = height
+        self.scenario = scenario
+        self.settings = settings
+        if scenario.speed_mps <= 0:
+            raise ValueError(f"speed must be positive (got {scenario.speed_mps}); a parked vehicle sees no new weeds")
+        self.rng = np.random.default_rng(settings.seed)
+        self._to_image = np.linalg.inv(homography.matrix)
+
+        # weeds move through the view top to bottom (increasing v), the order the planner expects
+        top = np.array(homography.image_to_ground(width / 2.0, 0.0))
+        bottom = np.array(homography.image_to_ground(width / 2.0, float(height)))
+        self.view_len_m = float(np.linalg.norm(bottom - top))
+        self.direction = (bottom - top) / self.view_len_m
+        lateral = np.array([-self.direction[1], self.direction[0]])
+        half_width = max(
+            float(np.linalg.norm(np.subtract(homography.image_to_ground(width, v), homography.image_to_ground(0, v))))
+            for v in (0.0, float(height))
+        ) / 2.0
+        centre = np.array(homography.image_to_ground(width / 2.0, height / 2.0))
+        scale = float(np.linalg.norm(np.subtract(homography.image_to_ground(width / 2.0 + 1, height / 2.0), centre)))
+        self.weed_px = settings.weed_size_m / max(scale, 1e-9)
+
+        # weeds upstream of the top edge, entering the view during the first duration_s
+        strip_m = scenario.speed_mps * settings.duration_s
+        count = self.rng.poisson(scenario.density_per_m2 * strip_m * 2.0 * half_width)
+        along = self.rng.uniform(0.0, strip_m, count)
+        across = self.rng.uniform(-half_width, half_width, count)
+        self.start = top - np.outer(along, self.direction) + np.outer(across, lateral)  # ground XY at t = 0
+        self.seen = np.zeros(count, dtype=bool)
+        self.detected = np.zeros(count, dtype=bool)
+        self.hit = np.zeros(count, dtype=bool)
+
+    def positions(self, t: float) -> np.ndarray:
+        return self.start + self.direction * (self.scenario.speed_mps * t)
+
+    def project(self, ground: np.ndarray) -> np.ndarray:
+        pts = np.hstack([ground, np.ones((len(ground), 1))]) @ self._to_image.T
+        return pts[:, :2] / pts[:, 2:3]
+
+    def frame(self, t: float) -> np.ndarray:
+        """(N, 6) `[x1, y1, x2, y2, conf, cls]` boxes for a frame captured at `t`."""
+        s = self.settings
+        pix = self.project(self.positions(t))
+        visible = (pix[:, 0] >= 0) & (pix[:, 0] < self.width) & (pix[:, 1] >= 0) & (pix[:, 1] < self.height)
+        self.seen |= visible
+        found = visible & (self.rng.random(len(pix)) >= s.miss_rate)
+        self.detected |= found
+        centres = pix[found] + self.rng.normal(0.0, s.noise_px, (int(found.sum()), 2))
+        conf = self.rng.uniform(0.55, 0.95, len(centres))
+        n_false = self.rng.poisson(s.false_per_frame)
+        if n_false:
+            fake = self.rng.uniform((0, 0), (self.width, self.height), (n_false, 2))
+            centres = np.vstack([centres, fake])
+            conf = np.concatenate([conf, self.rng.uniform(0.3, 0.8, n_false)])
+        half = self.weed_px / 2.0
+        boxes = np.empty((len(centres), 6), dtype=np.float32)
+        boxes[:, 0:2] = centres - half
+        boxes[:, 2:4] = centres + half
+        boxes[:, 4] = conf
+        boxes[:, 5] = 0
+        return boxes
+
+    def build_runtime(self) -> Runtime:
+        sc = self.scenario
+        return Runtime(
+            heads=build_heads(self.cfg),
+            homography=self.homography,
+            pose=FieldPose(),
+            extrinsics=self.cfg.get("camera_to_arm", {}),
+            plane_z=float(self.cfg.get("target_plane_z_m", 0.0)),
+            min_conf=float(self.cfg.get("min_confidence", 0.5)),
+            min_area=float(self.cfg.get("min_bbox_area_px", 20)),
+            queue_len=sc.queue_len,
+            queue_stale_s=sc.queue_stale_s,
+            queue_merge_m=sc.queue_merge_m,
+        )
+
+    def run(self, log: Optional[Path] = None) -> Dict:
+        s = self.settings
+        runtime = self.build_runtime()
+        end = s.duration_s + (self.view_len_m + s.match_m) / self.scenario.speed_mps + 1.0
+        dispatch_ms: List[float] = []
+        fire_ms: List[float] = []
+        shots = off_target = false_shots = repeat_shots = 0
+        sink = log.open("wb") if log is not None else None
+        try:
+            for k in range(int(end * s.infer_fps)):
+                captured = k / s.infer_fps
+                now = captured + s.latency_s
+                line = encode_frame(captured, self.frame(captured))
+                if sink is not None:
+                    sink.write(line)
+                runtime.ingest(decode_line(line), now)
+                batches, _, depth_after = runtime.plan(now)
+                for batch in batches:  # one target per batch: no link, so no clock for waypoint paths
+                    assignment = batch[0]
+                    head, target = assignment.head, assignment.target
+                    start = now + s.link_s
+                    # the planner measured slew from `now`; the controller starts after the link delay
+                    arrive = max(assignment.arrive_at, now) + s.link_s
+                    head.commit(assignment.joints, start, arrive_at=arrive)
+                    runtime.record(batch, now, depth_after)
+                    shots += 1
+                    dispatch_ms.append((now - target.timestamp) * 1000.0)
+                    fire_ms.append((arrive - target.timestamp) * 1000.0)
+                    aim = np.array([target.x_ground, target.y_ground])
+                    weed = self._match(aim, target.timestamp)
+                    if weed is None:
+                        false_shots += 1
+                        continue
+                    if np.linalg.norm(self.positions(arrive)[weed] - aim) > s.hit_radius_m:
+                        off_target += 1
+                    elif self.hit[weed]:
+                        repeat_shots += 1
+                    else:
+                        self.hit[weed] = True
+        finally:
+            if sink is not None:
+                sink.close()
+        weeds = int(self.seen.sum())
+        detected = int((self.detected & self.seen).sum())
+        hit_weeds = int(self.hit.sum())
+        return {
+            **asdict(self.scenario),
+            "weeds": weeds,
+            "detected": detected,
+            "shots": shots,
+            "hits": hit_weeds,
+            "hit_rate": hit_weeds / weeds if weeds else 0.0,
+            "missed": weeds - hit_weeds,
+            "never_detected": weeds - detected,
+            "off_target": off_target,
+            "false_shots": false_shots,
+            "repeat_shots": repeat_shots,
+            "weeds_per_min": hit_weeds / s.duration_s * 60.0,
+            "dispatch_ms_p50": _pct(dispatch_ms, 50),
+            "dispatch_ms_p95": _pct(dispatch_ms, 95),
+            "fire_ms_p50": _pct(fire_ms, 50),
+            "fire_ms_p95": _pct(fire_ms, 95),
+        }
+
+    def _match(self, aim: np.ndarray, captured: float) -> Optional[int]:
+        if not len(self.start):
+            return None
+        dist = np.linalg.norm(self.positions(captured) - aim, axis=1)
+        weed = int(dist.argmin())
+        return weed if dist[weed] <= self.settings.match_m else None
+
+
+def _pct(values: List[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def _floats(text: str) -> List[float]:
+    return [float(x) for x in text.split(",") if x.strip()]
+
+
+COLUMNS: List[Tuple[str, str, str]] = [
+    ("speed_mps", "speed", ".2f"),
+    ("density_per_m2", "dens", ".0f"),
+    ("queue_len", "qlen", "d"),
+    ("queue_stale_s", "stale", ".2f"),
+    ("weeds", "weeds", "d"),
+    ("detected", "seen", "d"),
+    ("shots", "shots", "d"),
+    ("hits", "hits", "d"),
+    ("hit_rate", "hit%", ".0%"),
+    ("missed", "missed", "d"),
+    ("off_target", "off", "d"),
+    ("false_shots", "false", "d"),
+    ("dispatch_ms_p50", "disp50", ".0f"),
+    ("dispatch_ms_p95", "disp95", ".0f"),
+    ("fire_ms_p95", "fire95", ".0f"),
+    ("weeds_per_min", "w/min", ".1f"),
+]
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--config", type=Path, default=Path("configs/robot.yaml"))
+    p.add_argument("--camera-config", type=Path, default=None, help="Image size (default configs/camera.yaml)")
+    p.add_argument("--speed", type=_floats, default=[0.05, 0.1, 0.2], help="Vehicle speeds (m/s)")
+    p.add_argument("--density", type=_floats, default=[10.0], help="Weeds per square meter")
+    p.add_argument("--queue-len", type=_floats, default=[5], help="Runtime target queue lengths")
+    p.add_argument("--queue-stale", type=_floats, default=[1.0], help="Queue stale seconds")
+    p.add_argument("--queue-merge", type=float, default=0.05, help="Queue merge distance (meters)")
+    defaults = SimSettings()
+    p.add_argument("--duration", type=float, default=defaults.duration_s, help="Seconds of weeds entering the view")
+    p.add_argument("--fps", type=float, default=defaults.infer_fps, help="Inference frames per second")
+    p.add_argument("--latency", type=float, default=defaults.latency_s, help="Capture to runtime (seconds)")
+    p.add_argument("--link", type=float, default=defaults.link_s, help="Send to move start (seconds)")
+    p.add_argument("--noise-px", type=float, default=defaults.noise_px)
+    p.add_argument("--miss-rate", type=float, default=defaults.miss_rate, help="Per-frame detection miss rate")
+    p.add_argument("--false-rate", type=float, default=defaults.false_per_frame, help="False positives per frame")
+    p.add_argument("--hit-radius", type=float, default=defaults.hit_radius_m, help="Laser spot radius (meters)")
+    p.add_argument("--seed", type=int, default=defaults.seed)
+    p.add_argument("--write-log", type=Path, default=None, help="Write the first scenario's detection log here")
+    p.add_argument("--json", action="store_true", help="Print one JSON object per scenario")
+    args = p.parse_args()
+    if any(speed <= 0 for speed in args.speed):
+        p.error("--speed values must be positive")
+
+    cfg = load_config(args.config)
+    cam = load_camera_config(args.camera_config)
+    homography = projection_homography(cfg)
+    settings = SimSettings(
+        duration_s=args.duration,
+        infer_fps=args.fps,
+        latency_s=args.latency,
+        link_s=args.link,
+        noise_px=args.noise_px,
+        miss_rate=args.miss_rate,
+        false_per_frame=args.false_rate,
+        hit_radius_m=args.hit_radius,
+        seed=args.seed,
+    )
+    scenarios = [
+        Scenario(speed, density, int(qlen), stale, args.queue_merge)
+        for speed, density, qlen, stale in itertools.product(args.speed, args.density, args.queue_len, args.queue_stale)
+    ]
+    if not args.json:
+        print(" ".join(f"{title:>6}" for _, title, _ in COLUMNS))
+    for idx, scenario in enumerate(scenarios):
+        sim = FieldSim(cfg, homography, int(cam["width"]), int(cam["height"]), scenario, settings)
+        result = sim.run(args.write_log if idx == 0 else None)
+        if args.json:
+            print(json.dumps(result))
+        else:
+            print(" ".join(f"{format(result[key], fmt):>6}" for key, _, fmt in COLUMNS))
+
+
+if __name__ == "__main__":
+    main()
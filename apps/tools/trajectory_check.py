@@ -0,0 +1,204 @@
+"""Compare stop-and-go moves with streamed waypoint paths, and check host-firmware clock sync.
+
+The default run is offline and uses `ReferenceExecutor` (the firmware's queue, slew,
+arrive-by pacing and late-skip rules). It feeds the same random target sequence two ways:
+
+- stop-and-go: one `move` per target, sent on the host tick after the head is believed free;
+- streamed: `--batch` targets per `path`, with arrive-by times planned back to back and
+  the next path sent `--lookahead-ms` before the current one ends.
+
+Serial latency and clock error are applied to both. `--live` also runs a `FakeController`
+with a skewed, drifting `millis()` behind a real `ArduinoBridge` over a pty. It reports the
+bridge's clock error and how far the fired times landed from the requested arrive-by.
+
+    python -m apps.tools.trajectory_check --targets 200 --batch 4
+    python -m apps.tools.trajectory_check --live --drift-ppm 200
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import time
+from typing import Dict, List, Tuple
+
+from control.host.trajectory import (
+    FirmwareWaypoint,
+    ReferenceExecutor,
+    WaypointResult,
+    plan_arrivals,
+    slew_s,
+    utilisation,
+)
+
+
+def make_targets(rng: random.Random, count: int, step_deg: float) -> List[Tuple[float, float]]:
+    """Neighbouring weeds: a random walk of up to `step_deg` per axis, kept inside the bed."""
+    pan, tilt = 0.0, 90.0
+    out = []
+    for _ in range(count):
+        pan = min(max(pan + rng.uniform(-step_deg, step_deg), -30.0), 30.0)
+        tilt = min(max(tilt + rng.uniform(-step_deg, step_deg), 60.0), 120.0)
+        out.append((pan, tilt))
+    return out
+
+
+def stop_and_go(targets: List[Tuple[float, float]], args: argparse.Namespace, rng: random.Random) -> List[WaypointResult]:
+    """Host sends the next `move` on its first tick after its own busy estimate expires."""
+    submissions = []
+    pose, host_t = (0.0, 0.0), 0.0
+    for idx, (pan, tilt) in enumerate(targets):
+        sent = _next_tick(host_t, args.tick_ms)
+        received = sent + args.latency_ms + rng.uniform(0.0, args.jitter_ms)
+        submissions.append((received, [FirmwareWaypoint(pan, tilt, None, args.dwell_ms, received, tag=idx)]))
+        host_t = sent + 1000.0 * slew_s(pose, (pan, tilt), args.pan_dps, args.tilt_dps) + args.dwell_ms
+        pose = (pan, tilt)
+    return ReferenceExecutor(args.pan_dps, args.tilt_dps).run(submissions)
+
+
+def streamed(
+    targets: List[Tuple[float, float]], args: argparse.Namespace, rng: random.Random
+) -> Tuple[List[WaypointResult], Dict[int, float]]:
+    """Host plans `batch` targets back to back and sends them as one `path` just before the head frees up."""
+    submissions = []
+    wanted: Dict[int, float] = {}
+    pose, busy_until, sent = (0.0, 0.0), 0.0, -1.0
+    for start in range(0, len(targets), args.batch):
+        chunk = targets[start : start + args.batch]
+        sent = _next_tick(max(busy_until - args.lookahead_ms, sent), args.tick_ms)
+        ready = max(busy_until, sent + args.lead_ms)
+        plan = plan_arrivals(pose, chunk, ready / 1000.0, args.pan_dps, args.tilt_dps, args.dwell_ms / 1000.0)
+        received = sent + args.latency_ms + rng.uniform(0.0, args.jitter_ms)
+        clock_error = rng.uniform(-args.clock_error_ms, args.clock_error_ms)
+        rows = []
+        for offset, wp in enumerate(plan):
+            wanted[start + offset] = wp.arrive_by * 1000.0
+            rows.append(
+                FirmwareWaypoint(
+                    wp.pan, wp.tilt, wp.arrive_by * 1000.0 + clock_error, args.dwell_ms, received, args.late_ms, start + offset
+                )
+            )
+        submissions.append((received, rows))
+        busy_until = plan[-1].arrive_by * 1000.0 + args.dwell_ms
+        pose = chunk[-1]
+    executor = ReferenceExecutor(args.pan_dps, args.tilt_dps)
+    return executor.run(submissions), wanted
+
+
+def _next_tick(t_ms: float, tick_ms: float) -> float:
+    return t_ms if tick_ms <= 0 else (int(t_ms // tick_ms) + 1) * tick_ms
+
+
+def report(name: str, results: List[WaypointResult], wanted: Dict[int, float], late_ms: float) -> Dict[str, float]:
+    done = [r for r in results if not r.skipped]
+    span_s = (max(r.end_ms for r in done) - min(r.received_ms for r in done)) / 1000.0 if done else 0.0
+    lateness = [r.lateness_ms(wanted.get(r.tag)) for r in done]
+    return {
+        "mode": name,
+        "done": len(done),
+        "skipped": len(results) - len(done),
+        "late": sum(1 for x in lateness if x > late_ms),
+        "targets_per_s": len(done) / span_s if span_s else 0.0,
+        "idle": 1.0 - utilisation(results),
+        "p95_late_ms": _percentile(lateness, 95),
+    }
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def live(args: argparse.Namespace) -> bool:
+    """Sync a real bridge against a skewed stand-in, then stream paths and time the firing."""
+    from apps.tools.fake_controller import FakeController
+    from control.host.serial_bridge import ArduinoBridge
+
+    ctrl = FakeController(
+        pulse_ms=int(args.dwell_ms),
+        clock_offset_ms=123456.0,
+        clock_drift_ppm=args.drift_ppm,
+    )
+    bridge = ArduinoBridge(port=ctrl.port, clock_sync_interval_s=0.5)
+    rng = random.Random(args.seed)
+    try:
+        errors = []
+        deadline = time.monotonic() + args.live_s
+        while time.monotonic() < deadline:
+            now = time.monotonic()
+            errors.append(bridge.clock.to_firmware_ms(now) - ctrl.millis())
+            time.sleep(0.05)
+        pose, busy_until = (0.0, 0.0), 0.0
+        paths = 0
+        while paths < args.live_paths:
+            chunk = make_targets(rng, args.batch, args.step_deg)
+            ready = max(busy_until, time.monotonic() + args.lead_ms / 1000.0)
+            plan = plan_arrivals(pose, chunk, ready, args.pan_dps, args.tilt_dps, args.dwell_ms / 1000.0)
+            if not bridge.send_path(plan, metadata={"conf": 1.0}, late_ms=args.late_ms):
+                raise SystemExit("bridge clock never synchronised")
+            busy_until = plan[-1].arrive_by + args.dwell_ms / 1000.0
+            time.sleep(max(busy_until - args.lookahead_ms / 1000.0 - time.monotonic(), 0.0))
+            pose = chunk[-1]
+            paths += 1
+        time.sleep(max(busy_until - time.monotonic(), 0.0) + 0.2)
+        timed = [c for c in ctrl.completed if c.get("arrive_by_ms") is not None]
+        arrival = [c["fire_ms"] - c["arrive_by_ms"] for c in timed]
+        clock = bridge.clock.summary()
+    finally:
+        bridge.close()
+        ctrl.close()
+    abs_err = [abs(e) for e in errors[len(errors) // 2 :]]  # after the drift term has settled
+    print(f"clock: {clock}")
+    print(f"clock error after settling: median {statistics.median(abs_err):.1f} ms, max {max(abs_err):.1f} ms")
+    print(
+        f"arrival vs arrive-by over {len(arrival)} waypoints ({ctrl.skipped} skipped): "
+        f"median {statistics.median(arrival):+.1f} ms, max {max(arrival):+.1f} ms"
+    )
+    return max(abs_err) <= args.max_clock_error_ms and max(arrival) <= args.late_ms and ctrl.skipped == 0
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--targets", type=int, default=200)
+    p.add_argument("--step-deg", type=float, default=5.0, help="Largest pan/tilt step between neighbouring weeds")
+    p.add_argument("--batch", type=int, default=4, help="Waypoints per path (firmware max 6)")
+    p.add_argument("--dwell-ms", type=float, default=100.0, help="Laser dwell per target")
+    p.add_argument("--pan-dps", type=float, default=90.0)
+    p.add_argument("--tilt-dps", type=float, default=90.0)
+    p.add_argument("--tick-ms", type=float, default=33.0, help="Host loop period (one detection frame)")
+    p.add_argument("--latency-ms", type=float, default=5.0, help="One-way serial latency")
+    p.add_argument("--jitter-ms", type=float, default=5.0)
+    p.add_argument("--lead-ms", type=float, default=50.0, help="Earliest arrival after sending to an idle head")
+    p.add_argument("--lookahead-ms", type=float, default=300.0, help="Send the next path this long before the head frees up")
+    p.add_argument("--late-ms", type=float, default=150.0, help="Firmware late-skip tolerance")
+    p.add_argument("--clock-error-ms", type=float, default=2.0, help="Uniform host-firmware clock error")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--live", action="store_true", help="Also check clock sync against a pty stand-in")
+    p.add_argument("--live-s", type=float, default=6.0, help="Seconds of clock sampling in --live")
+    p.add_argument("--live-paths", type=int, default=5)
+    p.add_argument("--drift-ppm", type=float, default=100.0, help="Stand-in clock drift in --live")
+    p.add_argument("--max-clock-error-ms", type=float, default=5.0)
+    args = p.parse_args()
+
+    targets = make_targets(random.Random(args.seed), args.targets, args.step_deg)
+    base = report("stop-and-go", stop_and_go(targets, args, random.Random(args.seed + 1)), {}, args.late_ms)
+    results, wanted = streamed(targets, args, random.Random(args.seed + 1))
+    stream = report(f"path x{args.batch}", results, wanted, args.late_ms)
+    print(f"{'mode':>12} {'done':>5} {'skipped':>7} {'late':>5} {'tgt/s':>7} {'idle':>6} {'p95 late ms':>11}")
+    for row in (base, stream):
+        print(
+            f"{row['mode']:>12} {row['done']:>5} {row['skipped']:>7} {row['late']:>5} "
+            f"{row['targets_per_s']:>7.2f} {row['idle']:>6.1%} {row['p95_late_ms']:>11.1f}"
+        )
+    print(f"speed-up: {stream['targets_per_s'] / base['targets_per_s']:.2f}x")
+    ok = stream["skipped"] == 0 and stream["late"] == 0
+    if args.live:
+        ok = live(args) and ok
+    if not ok:
+        raise SystemExit("streamed waypoints were skipped or late")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+"""Asyncio driver for `Runtime`: ingest, scheduling, serial I/O, acks and telemetry as tasks.
+
+`run_sync` re-plans only when a log line arrives, and every step waits on the slowest
+one. Here the steps are independent tasks joined by bounded queues:
+
+- `ingest` tails the detection log. In follow mode, when the scheduler falls behind,
+  the oldest entry is dropped.
+- `schedule` re-plans on each new entry, every `tick_s`, and when a head frees up: its
+  busy estimate runs out, its send completes, or its controller reports it idle.
+- one `serial` task per head runs `Runtime.send` on that head's own thread. A slow link,
+  or dry-run printing, only holds up that head.
+- `acks` reads the replies each bridge's I/O thread forwards. A telemetry line showing
+  an idle head (empty queue, axes on target, laser off), once every command sent to it
+  has been acknowledged, frees that head before its estimate says so.
+- `telemetry` writes CSV rows in batches, off the event loop.
+
+SIGINT/SIGTERM, or `--once` once it has dispatched, stops ingest and scheduling first.
+Queued sends and telemetry rows then get `drain_s` to finish. A serial, ack or telemetry
+task that dies stops the loop the same way, and its exception is raised from `run`.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from vision.detection.records import decode_line
+
+from .runtime import Head, Runtime, TelemetryLog
+
+
+@dataclass
+class LoopSettings:
+    tick_s: float = 0.05  # re-plan at least this often, even without new detections
+    poll_s: float = 0.01  # log tail poll when no new line has been written
+    ingest_queue: int = 8  # log entries between ingest and the scheduler
+    ack_queue: int = 256  # controller replies between the bridge threads and `acks`
+    telemetry_queue: int = 256  # CSV rows waiting to be written
+    drain_s: float = 1.0  # on stop: time allowed for queued sends and rows
+
+    @classmethod
+    def from_config(cls, cfg: Dict) -> "LoopSettings":
+        return cls(
+            tick_s=float(cfg.get("tick_s", cls.tick_s)),
+            poll_s=float(cfg.get("poll_s", cls.poll_s)),
+            ingest_queue=max(int(cfg.get("ingest_queue", cls.ingest_queue)), 1),
+            ack_queue=max(int(cfg.get("ack_queue", cls.ack_queue)), 1),
+            telemetry_queue=max(int(cfg.get("telemetry_queue", cls.telemetry_queue)), 1),
+            drain_s=float(cfg.get("drain_s", cls.drain_s)),
+        )
+
+
+class AsyncLoop:
+    def __init__(
+        self,
+        runtime: Runtime,
+        settings: LoopSettings,
+        log_path: Path,
+        telemetry: Optional[TelemetryLog] = None,
+        once: bool = False,
+    ) -> None:
+        self.runtime = runtime
+        self.settings = settings
+        self.log_path = Path(log_path)
+        self.telemetry = telemetry
+        self.once = once
+        self.stats: Dict[str, int] = {
+            "entries": 0,
+            "ingest_dropped": 0,
+            "plans": 0,
+            "batches": 0,
+            "acks": 0,
+            "ack_dropped": 0,
+            "freed_early": 0,
+            "rows": 0,
+            "rows_dropped": 0,
+        }
+        self.ack_counts: Dict[str, int] = {}
+        self._ingest_done = False
+        self._dispatched = False
+        self._closing = False
+
+    def run(self) -> None:
+        asyncio.run(self._main())
+
+    async def _main(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._entries: asyncio.Queue = asyncio.Queue(self.settings.ingest_queue)
+        self._acks: asyncio.Queue = asyncio.Queue(self.settings.ack_queue)
+        self._rows: asyncio.Queue = asyncio.Queue(self.settings.telemetry_queue)
+        heads = self.runtime.heads
+        # one slot each: a head is not planned again until its batch has been sent
+        self._commands: Dict[int, asyncio.Queue] = {id(head): asyncio.Queue(1) for head in heads}
+        self._outstanding: Dict[int, int] = {id(head): 0 for head in heads}
+        executors = {
+            id(head): ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{head.name}-send") for head in heads
+        }
+        for head in heads:
+            if head.bridge is not None:
+                head.bridge.add_message_listener(lambda reply, head=head: self._on_reply(head, reply))
+        signals = []
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                self._loop.add_signal_handler(sig, self._stop.set)
+                signals.append(sig)
+            except (NotImplementedError, RuntimeError, ValueError):
+                pass  # not the main thread, or no signal support
+
+        front = [asyncio.create_task(self._ingest()), asyncio.create_task(self._schedule())]
+        back = [asyncio.create_task(self._serial(head, executors[id(head)])) for head in heads]
+        back.append(asyncio.create_task(self._ack_loop()))
+        if self.telemetry is not None:
+            back.append(asyncio.create_task(self._telemetry_loop()))
+        for task in back:
+            task.add_done_callback(self._back_done)
+        stopper = asyncio.create_task(self._stop.wait())
+        results: list = []
+        try:
+            await asyncio.wait(front + [stopper], return_when=asyncio.FIRST_COMPLETED)
+            for task in front + [stopper]:
+                task.cancel()
+            results += await asyncio.gather(*front, return_exceptions=True)
+            await self._drain()
+        finally:
+            self._closing = True
+            for task in back:
+                task.cancel()
+            results += await asyncio.gather(*back, return_exceptions=True)
+            for executor in executors.values():
+                executor.shutdown(wait=True)
+            for sig in signals:
+                self._loop.remove_signal_handler(sig)
+            print(f"[loop] {self.summary()}")
+        errors = [r for r in results if isinstance(r, Exception)]
+        if errors:
+            raise errors[0]
+
+    def summary(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = dict(self.stats)
+        out["ack_status"] = dict(self.ack_counts)
+        return out
+
+    # ------------------------------------------------------------------ tasks
+
+    async def _ingest(self) -> None:
+        partial = ""
+        with self.log_path.open() as fh:
+            if not self.once:
+                fh.seek(0, 2)
+            while True:
+                chunk = fh.readline()
+                if not chunk:
+                    if self.once:
+                        break
+                    await asyncio.sleep(self.settings.poll_s)
+                    continue
+                if not chunk.endswith("\n") and not self.once:
+                    partial += chunk  # the writer is mid-line; wait for the rest
+                    continue
+                line, partial = (partial + chunk).strip(), ""
+                if not line:
+                    continue
+                try:
+                    entry = decode_line(line)
+                except json.JSONDecodeError:
+                    continue
+                self.stats["entries"] += 1
+                if self.once:
+                    await self._entries.put(entry)  # replaying a file: keep every entry
+                else:
+                    if self._entries.full():
+                        self._entries.get_nowait()
+                        self.stats["ingest_dropped"] += 1
+                    self._entries.put_nowait(entry)
+                self._wake.set()
+                await asyncio.sleep(0)
+        self._ingest_done = True
+        self._wake.set()
+        await self._stop.wait()
+
+    async def _schedule(self) -> None:
+        runtime = self.runtime
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self._next_wakeup(time.time()))
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            now = time.time()
+            # replaying (--once) plans after every entry, like the synchronous loop
+            for _ in range(1 if self.once else self._entries.qsize()):
+                if self._entries.empty():
+                    break
+                runtime.ingest(self._entries.get_nowait(), now)
+            if self.once and not self._entries.empty():
+                self._wake.set()
+            batches, depth_before, depth_after = runtime.plan(now)
+            self.stats["plans"] += 1
+            for batch in batches:
+                head = batch[0].head
+                head.sending = True
+                self._outstanding[id(head)] += 1
+                self._commands[id(head)].put_nowait((batch, now, depth_before, depth_after))
+                self.stats["batches"] += 1
+            if self.once and (batches or (self._ingest_done and self._entries.empty())):
+                self._stop.set()
+                return
+
+    async def _serial(self, head: Head, executor: ThreadPoolExecutor) -> None:
+        commands = self._commands[id(head)]
+        while True:
+            batch, planned_at, depth_before, depth_after = await commands.get()
+            superseded = head.superseded_total
+            try:
+                sent, requeue = await self._loop.run_in_executor(
+                    executor, self.runtime.send, batch, planned_at, depth_before, depth_after
+                )
+            except Exception as exc:
+                print(f"[{head.name}] send failed: {exc}")
+                sent, requeue = [], []
+            finally:
+                head.sending = False
+                commands.task_done()
+            # a move the shaper dropped (deadband, or a held move replaced by this one) is never acked
+            unacked = (0 if sent else 1) + head.superseded_total - superseded
+            if unacked:
+                self._outstanding[id(head)] = max(self._outstanding[id(head)] - unacked, 0)
+            self.runtime.requeue(requeue)
+            for row in self.runtime.record(sent, time.time(), depth_after):
+                self._put_row(row)
+            self._dispatched = self._dispatched or bool(sent)
+            self._wake.set()
+
+    async def _ack_loop(self) -> None:
+        while True:
+            head, reply, received = await self._acks.get()
+            status = str(reply.get("status"))
+            self.stats["acks"] += 1
+            self.ack_counts[status] = self.ack_counts.get(status, 0) + 1
+            key = id(head)
+            if status in ("queued", "error"):  # every move/path is answered by exactly one of these
+                self._outstanding[key] = max(self._outstanding[key] - 1, 0)
+            if status in ("skipped", "error") and self.runtime.verbose:
+                print(f"[{head.name}] controller {status}: {reply.get('detail')}")
+            now = time.time()
+            if head.busy_until <= now:
+                self._outstanding[key] = 0  # estimate already ran out; stop waiting for lost acks
+            elif status == "telemetry" and self._idle(head, reply):
+                head.busy_until = received
+                self.stats["freed_early"] += 1
+                self._wake.set()
+
+    async def _telemetry_loop(self) -> None:
+        assert self.telemetry is not None
+        while True:
+            rows = [await self._rows.get()]
+            while not self._rows.empty():
+                rows.append(self._rows.get_nowait())
+            try:
+                await self._loop.run_in_executor(None, self.telemetry.write, rows)
+            finally:
+                for _ in rows:
+                    self._rows.task_done()
+
+    # ------------------------------------------------------------------ helpers
+
+    def _next_wakeup(self, now: float) -> float:
+        """Seconds until the next tick, or sooner if a head's busy estimate runs out first."""
+        wait = self.settings.tick_s
+        if self.runtime.target_queue:
+            for head in self.runtime.heads:
+                free_in = head.busy_until - head.lookahead_s - now
+                if not head.sending and free_in > 0:  # already-free heads change only on new data
+                    wait = min(wait, free_in)
+        return max(wait, 0.001)
+
+    def _idle(self, head: Head, reply: Dict) -> bool:
+        if head.sending or self._outstanding[id(head)] > 0 or reply.get("queue", 1) != 0:
+            return False
+        laser = reply.get("laser") or {}
+        if laser.get("pending") or laser.get("active"):
+            return False
+        for axis in ("pan", "tilt"):
+            state = reply.get(axis)
+            if not isinstance(state, dict) or state.get("steps") != state.get("target"):
+                return False
+        return True
+
+    def _back_done(self, task: asyncio.Task) -> None:
+        """A background task ended before shutdown cancelled it: report it and stop the loop."""
+        if task.cancelled() or self._closing:
+            return
+        exc = task.exception()
+        print(f"[loop] {task.get_coro().__qualname__} stopped: {exc!r}")
+        self._stop.set()
+
+    def _on_reply(self, head: Head, reply: Dict) -> None:
+        """Bridge I/O thread: hand the reply to the event loop."""
+        if self._closing:
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._push_ack, head, reply, time.time())
+        except RuntimeError:
+            pass  # loop already closed
+
+    def _push_ack(self, head: Head, reply: Dict, received: float) -> None:
+        if self._acks.full():
+            self._acks.get_nowait()
+            self.stats["ack_dropped"] += 1
+        self._acks.put_nowait((head, reply, received))
+
+    def _put_row(self, row: list) -> None:
+        if self.telemetry is None:
+            return
+        if self._rows.full():
+            self.stats["rows_dropped"] += 1
+            return
+        self._rows.put_nowait(row)
+        self.stats["rows"] += 1
+
+    async def _drain(self) -> None:
+        async def drained() -> None:
+            for commands in self._commands.values():
+                await commands.join()
+            await self._rows.join()
+
+        try:
+            await asyncio.wait_for(drained(), self.settings.drain_s)
+        except asyncio.TimeoutError:
+            print(f"[loop] stopped with sends or telemetry still queued after {self.settings.drain_s:.1f}s")
+
+
+__all__ = ["LoopSettings", "AsyncLoop"]
@@ -0,0 +1,205 @@
+"""Persistent registry of treated weed positions in the field frame.
+
+Positions are quantised to `cell_m` cells and kept in a fixed-size, memory-mapped,
+open-addressed hash table (one file per field), so a lookup touches a constant number
+of slots and opening a field is just an `mmap`. Marks older than `max_age_s` are
+ignored and their slots reused.
+"""
+from __future__ import annotations
+
+import json
+import math
+import mmap
+import struct
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+_MAGIC = b"PLVFLD01"
+_HEADER = struct.Struct("<8sIId")  # magic, capacity, max_probe, cell_m
+_HEADER_SIZE = 64
+_SLOT = np.dtype([("key", "<i8"), ("ts", "<f8")])  # ts == 0 marks a never-used slot
+_HASH_MULT = 0x9E3779B97F4A7C15
+_MASK64 = (1 << 64) - 1
+
+
+@dataclass
+class FieldPose:
+    """Robot pose in the field frame, used to turn camera-ground points into field points.
+
+    With no `path` the camera ground frame *is* the field frame (stationary robot). With a
+    path, an odometry process writes `{"x_m": .., "y_m": .., "heading_deg": ..}` there and
+    the file is re-read whenever its mtime changes.
+    """
+
+    path: Optional[Path] = None
+    x_m: float = 0.0
+    y_m: float = 0.0
+    heading_deg: float = 0.0
+    _mtime: float = field(default=-1.0, repr=False)
+
+    def refresh(self) -> None:
+        if self.path is None:
+            return
+        try:
+            mtime = self.path.stat().st_mtime
+            if mtime == self._mtime:
+                return
+            data = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return  # keep the last good pose while the writer is mid-update
+        self._mtime = mtime
+        self.x_m = float(data.get("x_m", 0.0))
+        self.y_m = float(data.get("y_m", 0.0))
+        self.heading_deg = float(data.get("heading_deg", 0.0))
+
+    def to_field(self, x_ground: float, y_ground: float) -> Tuple[float, float]:
+        theta = math.radians(self.heading_deg)
+        c, s = math.cos(theta), math.sin(theta)
+        return self.x_m + c * x_ground - s * y_ground, self.y_m + s * x_ground + c * y_ground
+
+
+class TreatedRegistry:
+    """Memory-mapped spatial hash of treated positions (`mark`, `is_treated`)."""
+
+    def __init__(
+        self,
+        path: Path,
+        cell_m: float = 0.02,
+        radius_m: float = 0.03,
+        max_age_s: float = 14 * 24 * 3600.0,
+        capacity: int = 1 << 20,
+        max_probe: int = 32,
+    ) -> None:
+        self.path = Path(path).expanduser()
+        self.radius_m = float(radius_m)
+        self.max_age_s = float(max_age_s)
+        self.stats: Dict[str, int] = {"lookups": 0, "hits": 0, "marks": 0, "evicted": 0}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.exists():
+            with self.path.open("rb") as fh:
+                magic, capacity, max_probe, cell_m = _HEADER.unpack(fh.read(_HEADER.size))
+            if magic != _MAGIC:
+                raise ValueError(f"{self.path} is not a treated-weed registry")
+            size = _HEADER_SIZE + capacity * _SLOT.itemsize
+            mode = "r+b"
+        else:
+            if capacity & (capacity - 1):
+                raise ValueError("capacity must be a power of two")
+            size = _HEADER_SIZE + capacity * _SLOT.itemsize
+            mode = "w+b"
+        with self.path.open(mode) as fh:
+            if mode == "w+b":
+                fh.truncate(size)
+                fh.write(_HEADER.pack(_MAGIC, capacity, max_probe, float(cell_m)))
+            self._mm = mmap.mmap(fh.fileno(), size)
+        self.capacity = int(capacity)
+        self.max_probe = int(max_probe)
+        self.cell_m = float(cell_m)  # fixed by the file; changing it would orphan existing marks
+        self._mask = self.capacity - 1
+        self._shift = 64 - (self.capacity.bit_length() - 1)  # top bits of the product pick the slot
+        table = np.ndarray((self.capacity,), dtype=_SLOT, buffer=self._mm, offset=_HEADER_SIZE)
+        self._keys = table["key"]
+        self._ts = table["ts"]
+        reach = int(math.ceil(self.radius_m / self.cell_m))
+        self._neighbourhood = [
+            (dx, dy)
+            for dx in range(-reach, reach + 1)
+            for dy in range(-reach, reach + 1)
+            if math.hypot(dx, dy) * self.cell_m <= self.radius_m + self.cell_m * 0.5
+        ]
+
+    @classmethod
+    def for_field(cls, directory: Path, field_name: str, **kwargs) -> "TreatedRegistry":
+        return cls(Path(directory).expanduser() / f"{field_name}.treated", **kwargs)
+
+    def _cell(self, x_m: float, y_m: float) -> Tuple[int, int]:
+        return int(math.floor(x_m / self.cell_m)), int(math.floor(y_m / self.cell_m))
+
+    @staticmethod
+    def _key(ix: int, iy: int) -> int:
+        packed = ((ix & 0xFFFFFFFF) << 32) | (iy & 0xFFFFFFFF)
+        return packed - (1 << 64) if packed >= (1 << 63) else packed  # as signed int64
+
+    def _home(self, key: int) -> int:
+        return ((key * _HASH_MULT) & _MASK64) >> self._shift
+
+    def _find(self, key: int) -> int:
+        slot = self._home(key)
+        for _ in range(self.max_probe):
+            ts = self._ts[slot]
+            if ts == 0.0:
+                return -1
+            if self._keys[slot] == key:
+                return slot
+            slot = (slot + 1) & self._mask
+        return -1
+
+    def last_treated(self, x_m: float, y_m: float, now: Optional[float] = None) -> Optional[float]:
+        """Most recent mark within `radius_m` of the field point, or None."""
+        now = time.time() if now is None else now
+        cutoff = now - self.max_age_s
+        ix, iy = self._cell(x_m, y_m)
+        newest: Optional[float] = None
+        for dx, dy in self._neighbourhood:
+            slot = self._find(self._key(ix + dx, iy + dy))
+            if slot >= 0:
+                ts = float(self._ts[slot])
+                if ts >= cutoff and (newest is None or ts > newest):
+                    newest = ts
+        return newest
+
+    def is_treated(self, x_m: float, y_m: float, now: Optional[float] = None) -> bool:
+        self.stats["lookups"] += 1
+        hit = self.last_treated(x_m, y_m, now) is not None
+        if hit:
+            self.stats["hits"] += 1
+        return hit
+
+    def mark(self, x_m: float, y_m: float, now: Optional[float] = None) -> None:
+        """Record a treatment at the field point (reuses expired slots, else the oldest in range)."""
+        now = time.time() if now is None else now
+        cutoff = now - self.max_age_s
+        key = self._key(*self._cell(x_m, y_m))
+        slot = self._home(key)
+        reusable = -1
+        oldest = slot
+        for _ in range(self.max_probe):
+            ts = self._ts[slot]
+            if ts == 0.0 or self._keys[slot] == key:
+                if ts == 0.0 and reusable >= 0:
+                    slot = reusable
+                break
+            if ts < cutoff and reusable < 0:
+                reusable = slot
+            if ts < self._ts[oldest]:
+                oldest = slot
+            slot = (slot + 1) & self._mask
+        else:
+            # probe window full of other live marks: reuse an expired slot or the oldest one
+            slot = reusable if reusable >= 0 else oldest
+            self.stats["evicted"] += 1
+        self._keys[slot] = key
+        self._ts[slot] = now
+        self.stats["marks"] += 1
+
+    def live_count(self, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        return int(np.count_nonzero(self._ts >= now - self.max_age_s))
+
+    def summary(self) -> Dict[str, object]:
+        out: Dict[str, object] = dict(self.stats)
+        out["path"] = str(self.path)
+        out["live"] = self.live_count()
+        return out
+
+    def close(self) -> None:
+        self._keys = self._ts = None  # drop buffer exports before closing the map
+        self._mm.flush()
+        self._mm.close()
+
+
+__all__ = ["FieldPose", "TreatedRegistry"]
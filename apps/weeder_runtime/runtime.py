@@ -5,21 +5,31 @@ import argparse
 import csv
 import json
 import math
+import threading
 import time
-from collections import deque
-from dataclasses import dataclass
+
+_LAUNCH_T0 = time.perf_counter()  # taken before the heavier imports below
+
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Deque, Dict, Iterable, Iterator, Optional
+from typing import Deque, Dict, Iterable, Iterator, List, Optional
 
 try:
     import yaml
 except ImportError as exc:  # pragma: no cover - user must install dependency
     raise SystemExit("PyYAML is required: pip install pyyaml") from exc
 
+from apps.weeder_runtime.field_registry import FieldPose, TreatedRegistry
+from common.startup import StartupTimer
+from control.host.command_shaper import HELD, SUPPRESSED, MoveShaper
+from control.host.trajectory import PATH_MAX_WAYPOINTS, Waypoint
 from control.host.serial_bridge import ArduinoBridge
 from kinematics.planar_arm import JointLimits
 from kinematics.pan_tilt import PanTiltRig
 from vision.calibration.homography import Homography
+from vision.detection.records import decode_line
 
 
 @dataclass
@@ -35,6 +45,10 @@ class Target:
     y_ground: float
     x_arm: float
     y_arm: float
+    x_field: float = 0.0  # ground point in the field frame (see field_registry.FieldPose)
+    y_field: float = 0.0
+    dispatched_at: Optional[float] = None  # set when planned onto a head (`Runtime.in_flight`)
+    tag: int = 0  # id of the move/waypoint that carries it; the controller echoes it on dispatch
 
     def age(self, now: float) -> float:
         return now - self.enqueued_at
@@ -91,7 +105,7 @@ def detection_stream(path: Path, follow: bool = True) -> Iterator[Dict]:
             if not line:
                 continue
             try:
-                yield json.loads(line)
+                yield decode_line(line)
             except json.JSONDecodeError:
                 continue
 def prioritized_detections(
@@ -123,10 +137,14 @@ def select_target(queue: Deque[Target]) -> Optional[Target]:
     return best
 
 
-def prune_queue(queue: Deque[Target], max_age_s: float, now: float) -> None:
+def prune_queue(queue: Deque[Target], max_age_s: float, now: float, in_flight: bool = False) -> None:
+    """Drop targets older than `max_age_s`: queued ones by enqueue time, in-flight ones by dispatch time."""
     if not queue or max_age_s <= 0:
         return
-    keep = [t for t in queue if now - t.enqueued_at <= max_age_s]
+    if in_flight:
+        keep = [t for t in queue if now - (t.dispatched_at if t.dispatched_at is not None else now) <= max_age_s]
+    else:
+        keep = [t for t in queue if now - t.enqueued_at <= max_age_s]
     if len(keep) != len(queue):
         queue.clear()
         queue.extend(keep)
@@ -141,156 +159,648 @@ def is_duplicate(queue: Deque[Target], candidate: Target, merge_dist_m: float) -
     return False
 
 
-def run(args: argparse.Namespace) -> None:
-    cfg = load_config(args.config)
-    homography = Homography.load(cfg.get("homography_path", None))
-    rig = build_rig(cfg)
+@dataclass
+class Head:
+    """One pan/tilt head: its geometry, mount offset and controller link."""
+
+    name: str
+    rig: PanTiltRig
+    extrinsics: Dict
+    port: Optional[str] = None
+    baudrate: int = 115200
+    pan_dps: float = 90.0  # firmware PAN_MAX_DPS
+    tilt_dps: float = 90.0  # firmware TILT_MAX_DPS
+    dwell_s: float = 0.5  # settle + laser pulse per target
+    link: Dict = field(default_factory=dict)  # merged `arduino:` settings for this head
+    joints: Dict[str, float] = field(default_factory=lambda: {"pan": 0.0, "tilt": 0.0})
+    busy_until: float = 0.0
+    max_batch: int = 1  # targets a free head may take per tick (>1 only when streaming paths)
+    lookahead_s: float = 0.0  # counts as free this long before busy_until (streaming keeps its queue fed)
+    sending: bool = False  # asyncio loop: a batch is on its way to the link, plan nothing else yet
+    held: Optional[Target] = None  # target of the move the shaper is holding for its rate limit
+    superseded: List[Target] = field(default_factory=list)  # held targets a newer move replaced
+    superseded_total: int = 0
+    bridge: Optional[ArduinoBridge] = None
+    shaper: Optional[MoveShaper] = None
 
-    extrinsics = cfg.get("camera_to_arm", {})
-    plane_z = float(cfg.get("target_plane_z_m", 0.0))
-    min_conf = float(cfg.get("min_confidence", args.min_conf))
-    min_area = float(cfg.get("min_bbox_area_px", args.min_area))
+    def aim(self, target: Target, plane_z: float) -> Dict[str, float]:
+        x_arm, y_arm = transform_camera_to_arm(target.x_ground, target.y_ground, self.extrinsics)
+        return self.rig.solve(x_arm, y_arm, plane_z)
 
-    queue_cfg = cfg.get("runtime_queue", {})
-    queue_len = int(queue_cfg.get("max_len", args.queue_len))
-    queue_len = max(queue_len, 1)
-    queue_stale = float(queue_cfg.get("stale_seconds", args.queue_stale_sec))
-    queue_merge = float(queue_cfg.get("merge_distance_m", args.queue_merge_dist))
+    def slew_time(self, joints: Dict[str, float]) -> float:
+        return self.slew_between(self.joints, joints)
 
-    telemetry_path = queue_cfg.get("telemetry_log")
-    if args.telemetry_log is not None:
-        telemetry_path = args.telemetry_log
-    telemetry_writer = None
-    telemetry_file = None
-    if telemetry_path:
-        telemetry_path = Path(telemetry_path)
-        telemetry_path.parent.mkdir(parents=True, exist_ok=True)
-        new_file = not telemetry_path.exists()
-        telemetry_file = telemetry_path.open("a", newline="")
-        telemetry_writer = csv.writer(telemetry_file)
-        if new_file:
-            telemetry_writer.writerow(
-                [
-                    "sent_ts",
-                    "det_ts",
-                    "confidence",
-                    "pan_deg",
-                    "tilt_deg",
-                    "ground_x",
-                    "ground_y",
-                    "image_v",
-                    "queue_after",
-                    "target_age_s",
-                ]
+    def slew_between(self, start: Dict[str, float], joints: Dict[str, float]) -> float:
+        pan = abs(joints["pan"] - start["pan"]) / self.pan_dps if self.pan_dps > 0 else 0.0
+        tilt = abs(joints["tilt"] - start["tilt"]) / self.tilt_dps if self.tilt_dps > 0 else 0.0
+        return max(pan, tilt)
+
+    def is_free(self, now: float) -> bool:
+        return not self.sending and self.busy_until <= now + self.lookahead_s
+
+    def commit(self, joints: Dict[str, float], now: float, arrive_at: Optional[float] = None) -> None:
+        if arrive_at is None:
+            arrive_at = now + self.slew_time(joints)
+        self.busy_until = arrive_at + self.dwell_s
+        self.joints = dict(joints)
+
+
+@dataclass
+class Assignment:
+    head: Head
+    target: Target
+    joints: Dict[str, float]
+    eta_s: float
+    arrive_at: float = 0.0  # planned arrival (same clock as `now`), after earlier targets in the batch
+
+
+def build_heads(cfg: Dict) -> List[Head]:
+    """Build one `Head` per `heads:` entry; per-head keys override the top-level ones."""
+    head_cfgs = cfg.get("heads") or [{}]
+    heads: List[Head] = []
+    for idx, head_cfg in enumerate(head_cfgs):
+        merged = {
+            key: {**(cfg.get(key) or {}), **(head_cfg.get(key) or {})}
+            for key in ("pan_tilt", "camera_to_arm", "arduino", "slew_dps")
+        }
+        if len(head_cfgs) > 1 and "port_glob" not in (head_cfg.get("arduino") or {}):
+            # a shared (or the default) glob would let one head grab another head's
+            # re-enumerated port; reconnect to the configured port only
+            merged["arduino"]["port_glob"] = ""
+        heads.append(
+            Head(
+                name=str(head_cfg.get("name", f"head{idx}")),
+                rig=build_rig(merged),
+                extrinsics=merged["camera_to_arm"],
+                port=merged["arduino"].get("port"),
+                baudrate=int(merged["arduino"].get("baudrate", 115200)),
+                pan_dps=float(merged["slew_dps"].get("pan", 90.0)),
+                tilt_dps=float(merged["slew_dps"].get("tilt", 90.0)),
+                dwell_s=float(head_cfg.get("dwell_s", cfg.get("dwell_s", 0.5))),
+                link=merged["arduino"],
             )
+        )
+    return heads
+
+
+def connect_heads(heads: List[Head], shaping_cfg: Dict, dry_run: bool, stale_after_s: float) -> None:
+    """Open every head's controller link in parallel (each handshake can take a while)."""
+
+    def connect(head: Head) -> ArduinoBridge:
+        bridge_cfg = head.link
+        bridge = ArduinoBridge(
+            port=head.port,
+            baudrate=head.baudrate,
+            dry_run=dry_run,
+            max_pending=int(bridge_cfg.get("max_pending", 32)),
+            stale_after_s=float(bridge_cfg.get("stale_after_s", stale_after_s)),
+            reconnect=bool(bridge_cfg.get("reconnect", True)),
+            rehome_on_reconnect=bridge_cfg.get("rehome_on_reconnect"),
+            port_glob=bridge_cfg.get("port_glob"),
+            usb_serial=bridge_cfg.get("usb_serial"),
+        )
+        bridge.add_state_listener(
+            lambda state, detail: print(f"[{head.name}] serial {state}" + (f" ({detail})" if detail else ""))
+        )
+        return bridge
+
+    with ThreadPoolExecutor(max_workers=len(heads), thread_name_prefix="head-connect") as pool:
+        futures = [pool.submit(connect, head) for head in heads]
+    errors = []
+    for head, future in zip(heads, futures):
+        try:
+            head.bridge = future.result()
+        except Exception as exc:
+            errors.append(exc)
+            continue
+        head.shaper = MoveShaper.from_config(head.bridge, shaping_cfg)
+        head.shaper.add_drop_listener(lambda metadata, head=head: _superseded(head))
+    if errors:
+        raise errors[0]
+
+
+def _superseded(head: Head) -> None:
+    """Shaper drop listener: the held move never went out, so its target goes back to the queue."""
+    if head.held is not None:
+        head.superseded.append(head.held)
+        head.held = None
+    head.superseded_total += 1
+
+
+def assign_targets(
+    heads: List[Head], queue: Deque[Target], now: float, plane_z: float
+) -> tuple[List[Assignment], List[tuple[Target, ValueError]]]:
+    """Hand queued targets to free heads; each target goes to at most one head.
+
+    Targets are taken in `select_target` priority order (lowest in image, then
+    confidence) and planned onto the head with the lowest cost: its remaining busy
+    time, the targets already planned onto it this tick, and the predicted slew
+    counted twice (slew is dead time). Only the first `max_batch` planned targets of
+    a currently free head are dispatched (one, unless it streams waypoint paths); the
+    rest stay queued, so a distant free head is not sent across the bed for a target
+    a nearby busy head will reach sooner. Targets no head can reach are removed from
+    the queue.
+    """
+    if not queue or not any(head.is_free(now) for head in heads):
+        return [], []
+    ready_at = {id(head): max(now, head.busy_until) for head in heads}
+    pose = {id(head): head.joints for head in heads}
+    free = {id(head) for head in heads if head.is_free(now)}
+    dispatched: Dict[int, int] = {}
+    assignments: List[Assignment] = []
+    unreachable: List[tuple[Target, ValueError]] = []
+    for target in sorted(queue, key=lambda t: (t.v, t.conf), reverse=True):
+        best: Optional[Assignment] = None
+        best_done = best_cost = float("inf")
+        error: Optional[ValueError] = None
+        for head in heads:
+            try:
+                joints = head.aim(target, plane_z)
+            except ValueError as err:
+                error = err
+                continue
+            eta = head.slew_between(pose[id(head)], joints)
+            done = ready_at[id(head)] + eta
+            # slew is dead time for that head, so weigh it twice against plain waiting
+            if done + eta < best_cost:
+                best = Assignment(head=head, target=target, joints=joints, eta_s=eta, arrive_at=done)
+                best_done, best_cost = done, done + eta
+        if best is None:
+            if error is not None:
+                unreachable.append((target, error))
+                queue.remove(target)
+            continue
+        key = id(best.head)
+        if key in free and dispatched.get(key, 0) < best.head.max_batch:
+            dispatched[key] = dispatched.get(key, 0) + 1
+            assignments.append(best)
+            queue.remove(target)
+        ready_at[key] = best_done + best.head.dwell_s
+        pose[key] = best.joints
+    return assignments, unreachable
+
+
+def stream_path(
+    head: Head, batch: List[Assignment], now: float, lead_s: float, late_ms: int, tag: int = 0
+) -> bool:
+    """Send one head's assignments (in planned order) as a single timed `path` command.
+
+    Arrivals are the planner's back-to-back times, continuing from the end of the
+    previous path when the head is still busy. An idle head's schedule is pushed back
+    so nothing is due sooner than `lead_s` (serial and dispatch latency). The firmware
+    paces each move to land on its time. Returns False if the link has no clock
+    estimate yet. Waypoint i carries `tag + i` (see `Runtime.send`).
+    """
+    assert head.bridge is not None and head.shaper is not None
+    shift = max(0.0, now + lead_s - max(now, head.busy_until))
+    mono_now = time.monotonic()  # planner times are wall clock, arrive-by times are monotonic
+    waypoints = [
+        Waypoint(a.joints["pan"], a.joints["tilt"], mono_now + (a.arrive_at - now) + shift, head.dwell_s)
+        for a in batch
+    ]
+    metadata = {"conf": min(a.target.conf for a in batch), "tag": tag}
+    if not head.bridge.send_path(waypoints, metadata=metadata, late_ms=late_ms):
+        return False
+    head.commit(batch[-1].joints, now, arrive_at=batch[-1].arrive_at + shift)
+    head.shaper.reset()  # the next plain move must not be deadbanded against a stale pose
+    return True
+
+
+def open_registry(cfg: Dict, args: argparse.Namespace) -> tuple[Optional[TreatedRegistry], FieldPose]:
+    reg_cfg = cfg.get("treated_registry") or {}
+    pose_path = reg_cfg.get("pose_path")
+    pose = FieldPose(path=Path(pose_path).expanduser() if pose_path else None)
+    pose.refresh()
+    if args.no_registry or not reg_cfg.get("enabled", False):
+        return None, pose
+    registry = TreatedRegistry.for_field(
+        Path(reg_cfg.get("dir", "~/plevelai/fields")),
+        args.field or reg_cfg.get("field", "default"),
+        cell_m=float(reg_cfg.get("cell_m", 0.02)),
+        radius_m=float(reg_cfg.get("radius_m", 0.03)),
+        max_age_s=float(reg_cfg.get("max_age_h", 336.0)) * 3600.0,
+        capacity=int(reg_cfg.get("capacity", 1 << 20)),
+    )
+    return registry, pose
+
+
+TELEMETRY_COLUMNS = [
+    "sent_ts",
+    "det_ts",
+    "confidence",
+    "pan_deg",
+    "tilt_deg",
+    "ground_x",
+    "ground_y",
+    "image_v",
+    "queue_after",
+    "target_age_s",
+    "head",
+]
+
+
+class TelemetryLog:
+    """CSV of dispatched commands, one row per target; new files get a header.
+
+    An existing file with a different header (older columns) is renamed aside rather
+    than appended to, so every file has one column layout.
+    """
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.exists() and path.stat().st_size > 0:
+            with path.open(newline="") as fh:
+                header = next(csv.reader(fh), None)
+            if header != TELEMETRY_COLUMNS:
+                old = path.with_name(f"{path.stem}.{time.strftime('%Y%m%d-%H%M%S')}{path.suffix}")
+                path.rename(old)
+                print(f"[telemetry] {path} has different columns; moved it to {old}")
+        new_file = not path.exists() or path.stat().st_size == 0
+        self._fh = path.open("a", newline="")
+        self._writer = csv.writer(self._fh)
+        if new_file:
+            self._writer.writerow(TELEMETRY_COLUMNS)
+
+    def write(self, rows: List[list]) -> None:
+        self._writer.writerows(rows)
+        self._fh.flush()
 
-    bridge_cfg = cfg.get("arduino", {})
-    serial_port = args.serial_port or bridge_cfg.get("port")
-    baudrate = int(args.baudrate or bridge_cfg.get("baudrate", 115200))
+    def close(self) -> None:
+        self._fh.close()
 
-    if not serial_port and not args.dry_run:
-        raise ValueError("Serial port not provided. Use --serial-port or configs/robot.yaml")
 
-    default_home = bool(queue_cfg.get("home_on_start", True))
+def open_telemetry(cfg: Dict, args: argparse.Namespace) -> Optional[TelemetryLog]:
+    path = (cfg.get("runtime_queue") or {}).get("telemetry_log")
+    if args.telemetry_log is not None:
+        path = args.telemetry_log
+    return TelemetryLog(Path(path)) if path else None
+
+
+def resolve_home_mode(cfg: Dict, args: argparse.Namespace) -> str:
+    """None in the config means "home only if the controller reports it is not homed" (it homes itself at boot)."""
+    default_home = (cfg.get("runtime_queue") or {}).get("home_on_start")
     if args.skip_home:
-        home_on_start = False
-    else:
-        home_on_start = default_home or args.home_once
-    target_queue: Deque[Target] = deque(maxlen=queue_len)
+        return "never"
+    if args.home_once or default_home:
+        return "always"
+    if default_home is None:
+        return "auto"
+    return "never"
 
-    bridge: Optional[ArduinoBridge] = None
-    try:
-        bridge = ArduinoBridge(port=serial_port, baudrate=baudrate, dry_run=args.dry_run)
-        if home_on_start:
-            bridge.send_home()
-
-        for entry in detection_stream(args.log, follow=not args.once):
-            now = time.time()
-            prune_queue(target_queue, queue_stale, now)
-
-            entry_ts = float(entry.get("ts", now))
-            for det in prioritized_detections(entry.get("detections", []), min_conf, min_area):
-                u = float(det.get("u", 0.0))
-                v = float(det.get("v", 0.0))
-                w = float(det.get("w", 0.0))
-                h = float(det.get("h", 0.0))
-                x_ground, y_ground = homography.image_to_ground(u, v)
-                x_arm, y_arm = transform_camera_to_arm(x_ground, y_ground, extrinsics)
-                candidate = Target(
-                    timestamp=entry_ts,
-                    enqueued_at=now,
-                    conf=float(det.get("conf", 0.0)),
-                    u=u,
-                    v=v,
-                    w=w,
-                    h=h,
-                    x_ground=x_ground,
-                    y_ground=y_ground,
-                    x_arm=x_arm,
-                    y_arm=y_arm,
-                )
-                if is_duplicate(target_queue, candidate, queue_merge):
-                    continue
-                target_queue.append(candidate)
 
-            target = select_target(target_queue)
-            if target is None:
+@dataclass
+class Runtime:
+    """Detections in, head commands out; driven by `run_sync` or by `async_loop.AsyncLoop`.
+
+    `ingest` projects one log entry into `target_queue`, `plan` hands queued targets to
+    free heads, `send` issues one head's batch over its link, and `record` returns the
+    telemetry rows of what was sent. `send` only touches its own head, so the asyncio
+    loop can run it off the event loop; the other methods must stay on one thread.
+
+    Every move or waypoint carries a `tag` that the controller echoes in its `dispatch`
+    ack. A target goes into the treated registry only when that ack arrives, so moves the
+    shaper or the bridge dropped, and waypoints the controller skipped, are never
+    marked (dry runs have no acks and mark on send).
+    """
+
+    heads: List[Head]
+    homography: Homography
+    pose: FieldPose
+    registry: Optional[TreatedRegistry] = None
+    extrinsics: Dict = field(default_factory=dict)
+    plane_z: float = 0.0
+    min_conf: float = 0.5
+    min_area: float = 20.0
+    queue_len: int = 5
+    queue_stale_s: float = 1.0
+    queue_merge_m: float = 0.05
+    streaming: bool = False
+    stream_batch: int = PATH_MAX_WAYPOINTS
+    stream_lead_s: float = 0.05
+    stream_late_ms: int = 150
+    stream_lookahead_s: float = 0.3
+    verbose: bool = False
+    timer: Optional[StartupTimer] = None
+
+    def __post_init__(self) -> None:
+        self.target_queue: Deque[Target] = deque(maxlen=max(self.queue_len, 1))
+        # Targets already handed to a head; keeps other heads (and later frames) off the same weed.
+        self.in_flight: Deque[Target] = deque(maxlen=64)
+        self.dispatched_once = False
+        self._tag_lock = threading.Lock()
+        self._next_tag = 1
+        self._awaiting: "OrderedDict[int, Target]" = OrderedDict()  # sent, no dispatch ack yet
+        self._started: Deque[int] = deque()  # tags from dispatch acks (bridge I/O threads)
+
+    @classmethod
+    def from_config(cls, cfg: Dict, args: argparse.Namespace, timer: Optional[StartupTimer] = None) -> "Runtime":
+        homography = Homography.load(cfg.get("homography_path", None))
+        registry, pose = open_registry(cfg, args)
+        if timer is not None:
+            timer.mark("config")
+
+        queue_cfg = cfg.get("runtime_queue", {})
+        trajectory_cfg = cfg.get("trajectory") or {}
+        heads = build_heads(cfg)
+        if args.serial_port:
+            heads[0].port = args.serial_port
+        if args.baudrate:
+            for head in heads:
+                head.baudrate = int(args.baudrate)
+        missing = [head.name for head in heads if not head.port]
+        if missing and not args.dry_run:
+            raise ValueError(
+                f"Serial port not provided for {', '.join(missing)}. Use --serial-port or configs/robot.yaml"
+            )
+        return cls(
+            heads=heads,
+            homography=homography,
+            pose=pose,
+            registry=registry,
+            extrinsics=cfg.get("camera_to_arm", {}),
+            plane_z=float(cfg.get("target_plane_z_m", 0.0)),
+            min_conf=float(cfg.get("min_confidence", args.min_conf)),
+            min_area=float(cfg.get("min_bbox_area_px", args.min_area)),
+            queue_len=int(queue_cfg.get("max_len", args.queue_len)),
+            queue_stale_s=float(queue_cfg.get("stale_seconds", args.queue_stale_sec)),
+            queue_merge_m=float(queue_cfg.get("merge_distance_m", args.queue_merge_dist)),
+            streaming=args.stream_waypoints or bool(trajectory_cfg.get("enabled", False)),
+            stream_batch=min(max(int(trajectory_cfg.get("batch", 4)), 1), PATH_MAX_WAYPOINTS),
+            stream_lead_s=float(trajectory_cfg.get("lead_s", 0.05)),
+            stream_late_ms=int(trajectory_cfg.get("late_ms", 150)),
+            stream_lookahead_s=float(trajectory_cfg.get("lookahead_s", 0.3)),
+            verbose=bool(args.verbose),
+            timer=timer,
+        )
+
+    def start(self, shaping_cfg: Dict, home_mode: str, dry_run: bool) -> None:
+        """Connect every head and home the ones that need it."""
+        connect_heads(self.heads, shaping_cfg, dry_run, self.queue_stale_s)
+        for head in self.heads:
+            assert head.bridge is not None
+            head.bridge.add_message_listener(self._on_reply)
+        self._mark("serial_ready")
+        homed_any = False
+        for head in self.heads:
+            assert head.bridge is not None and head.shaper is not None
+            if home_mode == "auto" and head.bridge.controller_homing:
+                continue  # boot homing is still running; a second home would only restart it
+            if home_mode == "always" or (home_mode == "auto" and not head.bridge.controller_homed):
+                head.bridge.send_home()
+                head.shaper.reset()
+                homed_any = True
+        if homed_any:
+            self._mark("home")
+        if self.verbose and self.timer is not None:
+            print(self.timer.report())
+
+    def prune(self, now: float) -> None:
+        self.mark_started(now)
+        prune_queue(self.target_queue, self.queue_stale_s, now)
+        prune_queue(self.in_flight, self.queue_stale_s, now, in_flight=True)
+
+    def mark_started(self, now: float) -> None:
+        """Put targets whose move the controller started into the treated registry."""
+        while self._started:
+            tag = self._started.popleft()
+            with self._tag_lock:
+                target = self._awaiting.pop(tag, None)
+            if target is not None and self.registry is not None:
+                self.registry.mark(target.x_field, target.y_field, now)
+
+    def _on_reply(self, reply: Dict) -> None:
+        """Bridge I/O thread: note which tagged move started; a skipped one is forgotten."""
+        status = reply.get("status")
+        tag = reply.get("tag")
+        if tag is None:
+            return
+        if status == "dispatch":
+            self._started.append(int(tag))
+        elif status == "skipped":
+            with self._tag_lock:
+                self._awaiting.pop(int(tag), None)
+
+    def _await_dispatch(self, targets: List[Target]) -> int:
+        """Tag `targets` with consecutive ids and remember them until their dispatch ack."""
+        with self._tag_lock:
+            base = self._next_tag
+            self._next_tag += len(targets)
+            for offset, target in enumerate(targets):
+                target.tag = base + offset
+                self._awaiting[target.tag] = target
+            while len(self._awaiting) > 256:  # acks lost (link reset, errors): forget the oldest
+                self._awaiting.popitem(last=False)
+        return base
+
+    def _forget(self, targets: List[Target]) -> None:
+        with self._tag_lock:
+            for target in targets:
+                self._awaiting.pop(target.tag, None)
+
+    def ingest(self, entry: Dict, now: float) -> None:
+        self.prune(now)
+        entry_ts = float(entry.get("ts", now))
+        self.pose.refresh()
+        for det in prioritized_detections(entry.get("detections", []), self.min_conf, self.min_area):
+            u = float(det.get("u", 0.0))
+            v = float(det.get("v", 0.0))
+            w = float(det.get("w", 0.0))
+            h = float(det.get("h", 0.0))
+            x_ground, y_ground = self.homography.image_to_ground(u, v)
+            x_arm, y_arm = transform_camera_to_arm(x_ground, y_ground, self.extrinsics)
+            x_field, y_field = self.pose.to_field(x_ground, y_ground)
+            if self.registry is not None and self.registry.is_treated(x_field, y_field, now):
+                continue  # already lasered on an earlier pass
+            candidate = Target(
+                timestamp=entry_ts,
+                enqueued_at=now,
+                conf=float(det.get("conf", 0.0)),
+                u=u,
+                v=v,
+                w=w,
+                h=h,
+                x_ground=x_ground,
+                y_ground=y_ground,
+                x_arm=x_arm,
+                y_arm=y_arm,
+                x_field=x_field,
+                y_field=y_field,
+            )
+            if is_duplicate(self.target_queue, candidate, self.queue_merge_m):
                 continue
-
-            try:
-                joint_angles = rig.solve(target.x_arm, target.y_arm, plane_z)
-            except ValueError as err:
-                try:
-                    target_queue.remove(target)
-                except ValueError:
-                    pass
-                if args.verbose:
-                    print(f"Skipping target {(target.x_arm, target.y_arm)}: {err}")
+            if is_duplicate(self.in_flight, candidate, self.queue_merge_m):
                 continue
+            self.target_queue.append(candidate)
+
+    def plan(self, now: float) -> tuple[List[List[Assignment]], int, int]:
+        """Assign queued targets to free heads; returns per-head batches and the queue depth before/after."""
+        self.prune(now)
+        if self.streaming:
+            for head in self.heads:
+                # batches need arrive-by times; until the clock is synced, one move at a time
+                ready = head.bridge is not None and head.bridge.clock.ready
+                head.max_batch = self.stream_batch if ready else 1
+                head.lookahead_s = self.stream_lookahead_s if ready else 0.0
+        depth_before = len(self.target_queue)
+        assignments, unreachable = assign_targets(self.heads, self.target_queue, now, self.plane_z)
+        if self.verbose:
+            for target, err in unreachable:
+                print(f"Skipping target {(target.x_arm, target.y_arm)}: {err}")
+        per_head: Dict[int, List[Assignment]] = {}
+        for assignment in assignments:
+            per_head.setdefault(id(assignment.head), []).append(assignment)
+        for batch in per_head.values():
+            for assignment in batch:
+                assignment.target.dispatched_at = now
+            self.in_flight.extend(a.target for a in batch)
+        return list(per_head.values()), depth_before, len(self.target_queue)
+
+    def send(
+        self, batch: List[Assignment], now: float, depth_before: int, depth_after: int
+    ) -> tuple[List[Assignment], List[Target]]:
+        """Send one head's batch; returns what went out and the targets to put back in the queue."""
+        head = batch[0].head
+        assert head.shaper is not None
+        requeue: List[Target] = []
+        if head.max_batch > 1:
+            targets = [a.target for a in batch]
+            tag = self._await_dispatch(targets)
+            if stream_path(head, batch, now, self.stream_lead_s, self.stream_late_ms, tag):
+                self._sent_without_acks(head, targets)
+                return batch, requeue
+            self._forget(targets)
+            # clock lost (controller restarted): send the first as a plain move, requeue the rest
+            requeue = [extra.target for extra in batch[1:]]
+        assignment = batch[0]
+        target, joint_angles = assignment.target, assignment.joints
+        metadata = {
+            "conf": target.conf,
+            "target_ground": [target.x_ground, target.y_ground, self.plane_z],
+            "timestamp": target.timestamp,
+            "queue_depth": depth_before,
+            "queue_depth_after": depth_after,
+            "queue_age_s": target.age(now),
+            "tag": self._await_dispatch([target]),
+        }
+        outcome = head.shaper.submit(joint_angles, metadata=metadata)
+        requeue.extend(head.superseded)
+        self._forget(head.superseded)
+        head.superseded.clear()
+        if outcome == SUPPRESSED:
+            self._forget([target])
+            if self.verbose:
+                print(f"[{head.name}] suppressed move inside deadband: {joint_angles}")
+            return [], requeue
+        # a held move goes out at the next rate-limit slot; if a newer move replaces it first,
+        # the drop listener hands its target back through `requeue` on that later send
+        head.held = target if outcome == HELD else None
+        head.commit(joint_angles, now, arrive_at=assignment.arrive_at)
+        self._sent_without_acks(head, [target])
+        return [assignment], requeue
+
+    def _sent_without_acks(self, head: Head, targets: List[Target]) -> None:
+        if head.bridge is not None and head.bridge.dry_run:
+            self._started.extend(target.tag for target in targets)
+
+    def requeue(self, targets: List[Target]) -> None:
+        for target in targets:
+            if target in self.in_flight:
+                self.in_flight.remove(target)
+            target.dispatched_at = None
+            self.target_queue.append(target)
+
+    def record(self, sent: List[Assignment], now: float, depth_after: int) -> List[list]:
+        """Telemetry rows for sent targets (the registry is marked on dispatch, see `mark_started`)."""
+        self.mark_started(now)
+        rows = []
+        for assignment in sent:
+            head, target, joint_angles = assignment.head, assignment.target, assignment.joints
+            if not self.dispatched_once:
+                self.dispatched_once = True
+                self._mark("first_dispatch")
+                if self.timer is not None:
+                    print(self.timer.report())
+            rows.append(
+                [
+                    now,
+                    target.timestamp,
+                    target.conf,
+                    joint_angles.get("pan"),
+                    joint_angles.get("tilt"),
+                    target.x_ground,
+                    target.y_ground,
+                    target.v,
+                    depth_after,
+                    target.age(now),
+                    head.name,
+                ]
+            )
+        return rows
+
+    def close(self) -> None:
+        for head in self.heads:
+            if head.shaper:
+                head.shaper.close()
+                print(f"[{head.name}] shaper {head.shaper.summary()}")
+            if head.bridge:
+                if self.streaming:
+                    print(f"[{head.name}] clock {head.bridge.clock.summary()}")
+                head.bridge.close()
+        if self.registry is not None:
+            self.mark_started(time.time())  # dispatch acks that arrived while the links drained
+            print(f"[registry] {self.registry.summary()}")
+            self.registry.close()
+
+    def _mark(self, name: str) -> None:
+        if self.timer is not None:
+            self.timer.mark(name)
+
+
+def run_sync(runtime: Runtime, args: argparse.Namespace, telemetry: Optional[TelemetryLog]) -> None:
+    """One pass per log entry: ingest, plan and send before reading the next line."""
+    for entry in detection_stream(args.log, follow=not args.once):
+        now = time.time()
+        runtime.ingest(entry, now)
+        batches, depth_before, depth_after = runtime.plan(now)
+        sent: List[Assignment] = []
+        for batch in batches:
+            done, requeue = runtime.send(batch, now, depth_before, depth_after)
+            runtime.requeue(requeue)
+            sent.extend(done)
+        rows = runtime.record(sent, now, depth_after)
+        if telemetry is not None and rows:
+            telemetry.write(rows)
+        if args.once and batches:
+            break
 
-            queue_depth_before = len(target_queue)
-            target_age = target.age(now)
-            try:
-                target_queue.remove(target)
-            except ValueError:
-                queue_depth_after = len(target_queue)
-            else:
-                queue_depth_after = len(target_queue)
-
-            metadata = {
-                "conf": target.conf,
-                "target_ground": [target.x_ground, target.y_ground, plane_z],
-                "timestamp": target.timestamp,
-                "queue_depth": queue_depth_before,
-                "queue_depth_after": queue_depth_after,
-                "queue_age_s": target_age,
-            }
-            bridge.send_move(joint_angles, metadata=metadata)
-
-            if telemetry_writer:
-                telemetry_writer.writerow(
-                    [
-                        now,
-                        target.timestamp,
-                        target.conf,
-                        joint_angles.get("pan"),
-                        joint_angles.get("tilt"),
-                        target.x_ground,
-                        target.y_ground,
-                        target.v,
-                        queue_depth_after,
-                        target_age,
-                    ]
-                )
-                telemetry_file.flush()
-
-            if args.once:
-                break
+
+def run(args: argparse.Namespace) -> None:
+    timer = StartupTimer(label="runtime", t0=_LAUNCH_T0)
+    timer.mark("imports")
+    cfg = load_config(args.config)
+    runtime = Runtime.from_config(cfg, args, timer)
+    telemetry = open_telemetry(cfg, args)
+
+    shaping_cfg = dict(cfg.get("command_shaping") or {})
+    if args.deadband_deg is not None:
+        shaping_cfg["deadband_deg"] = args.deadband_deg
+    if args.max_cmd_rate is not None:
+        shaping_cfg["max_rate_hz"] = args.max_cmd_rate
+
+    loop_cfg = cfg.get("event_loop") or {}
+    use_asyncio = args.asyncio or bool(loop_cfg.get("enabled", False))
+    try:
+        runtime.start(shaping_cfg, resolve_home_mode(cfg, args), args.dry_run)
+        if use_asyncio:
+            from apps.weeder_runtime.async_loop import AsyncLoop, LoopSettings
+
+            AsyncLoop(runtime, LoopSettings.from_config(loop_cfg), args.log, telemetry, once=args.once).run()
+        else:
+            run_sync(runtime, args, telemetry)
     finally:
-        if telemetry_file:
-            telemetry_file.close()
-        if bridge:
-            bridge.close()
+        if telemetry is not None:
+            telemetry.close()
+        runtime.close()
 
 
 def build_argparser() -> argparse.ArgumentParser:
@@ -323,10 +833,43 @@ def build_argparser() -> argparse.ArgumentParser:
         default=None,
         help="Optional CSV log for dispatched commands",
     )
+    p.add_argument(
+        "--deadband-deg",
+        type=float,
+        default=None,
+        help="Suppress moves within this many degrees (pan and tilt) of the last sent move",
+    )
+    p.add_argument(
+        "--max-cmd-rate",
+        type=float,
+        default=None,
+        help="Maximum move commands per second; bursts collapse to the latest target",
+    )
+    p.add_argument(
+        "--stream-waypoints",
+        action="store_true",
+        help="Send each head a timed batch of targets per command (overrides trajectory.enabled)",
+    )
+    p.add_argument(
+        "--asyncio",
+        action="store_true",
+        help="Run ingest, scheduling, serial acks and telemetry as asyncio tasks (overrides event_loop.enabled)",
+    )
+    p.add_argument(
+        "--field",
+        type=str,
+        default=None,
+        help="Field name for the treated-weed registry (overrides treated_registry.field)",
+    )
+    p.add_argument(
+        "--no-registry",
+        action="store_true",
+        help="Do not skip or record treated positions for this run",
+    )
     p.add_argument(
         "--home-once",
         action="store_true",
-        help="Send a home command when the controller starts",
+        help="Always send a home command at startup, even if the controller reports homed",
     )
     p.add_argument(
         "--skip-home",
@@ -0,0 +1,421 @@
+"""Microbenchmarks for the per-detection hot paths, with JSON baselines.
+
+Times the IK solvers, the pixel->ground homography and the runtime queue helpers at
+the sizes the runtime actually sees (a handful to a few hundred detections per frame,
+queues of 5..64 targets), using only `timeit`. Each case is run `--repeat` times and
+the fastest run is kept, which is the least noisy estimate on a shared machine.
+
+    python -m benchmarks.micro                 # compare against this machine's baseline
+    python -m benchmarks.micro --save          # record / refresh the baseline
+    python -m benchmarks.micro --only homography --threshold 0.15
+
+Baselines live in `benchmarks/baselines/<host>.json` (one per machine, since absolute
+timings do not transfer). The run exits non-zero when a hot case is slower than its
+baseline by more than `--threshold`; other cases are reported but never fail. A case
+over the threshold is re-timed `--confirm` times first, so one noisy run does not fail
+the suite. Each case is compared relative to a fixed pure-Python reference workload
+timed right before it, so a machine that is throttled or busy (Jetson clocks change
+with the power mode and temperature) is not mistaken for a slower code path.
+"""
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import json
+import platform
+import random
+import re
+import sys
+import time
+import timeit
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Deque, Dict, List, Optional
+
+BASELINE_DIR = Path(__file__).resolve().parent / "baselines"
+
+
+@dataclass
+class Case:
+    name: str
+    setup: Callable[[], Callable[[], object]]  # builds the data once, returns the timed callable
+    items: int = 1  # work items per call, for the per-item column
+    hot: bool = False  # only hot cases fail the run on regression
+
+
+# ---------------------------------------------------------------------- fixtures
+
+
+def _rig():
+    from kinematics.pan_tilt import PanTiltRig
+    from kinematics.planar_arm import JointLimits
+
+    # configs/robot.yaml defaults
+    return PanTiltRig(
+        axis_height=0.30,
+        pan_limits=JointLimits(-180.0, 180.0),
+        tilt_limits=JointLimits(0.0, 180.0),
+        tilt_offset_deg=90.0,
+    )
+
+
+def _ground_points(n: int, seed: int = 0) -> List[tuple]:
+    rng = random.Random(seed)
+    return [(rng.uniform(0.25, 0.85), rng.uniform(-0.35, 0.35)) for _ in range(n)]
+
+
+def _homography():
+    import numpy as np
+
+    from vision.calibration.homography import Homography
+
+    # a mildly tilted 1280x720 camera looking ~0.5 m ahead, same shape as a calibrated H
+    return Homography(
+        matrix=np.array(
+            [[8.0e-4, 1.2e-5, -0.512], [2.0e-6, -9.5e-4, 0.842], [1.0e-6, 4.0e-5, 1.0]], dtype=float
+        )
+    )
+
+
+def _pixels(n: int, seed: int = 0) -> List[tuple]:
+    rng = random.Random(seed)
+    return [(rng.uniform(0.0, 1280.0), rng.uniform(0.0, 720.0)) for _ in range(n)]
+
+
+def _detections(n: int, seed: int = 0) -> List[Dict]:
+    """Per-frame detection dicts as decoded from the log; about half pass the filters."""
+    rng = random.Random(seed)
+    return [
+        {
+            "cls": 0,
+            "conf": rng.uniform(0.2, 1.0),
+            "u": rng.uniform(0.0, 1280.0),
+            "v": rng.uniform(0.0, 720.0),
+            "w": rng.uniform(4.0, 60.0),
+            "h": rng.uniform(4.0, 60.0),
+        }
+        for _ in range(n)
+    ]
+
+
+def _queue(n: int, now: float, seed: int = 0, stale_fraction: float = 0.0) -> Deque:
+    from apps.weeder_runtime.runtime import Target
+
+    rng = random.Random(seed)
+    out: Deque = deque(maxlen=max(n, 1))
+    for idx in range(n):
+        x, y = rng.uniform(0.25, 0.85), rng.uniform(-0.35, 0.35)
+        age = 5.0 if idx < n * stale_fraction else rng.uniform(0.0, 0.5)
+        out.append(
+            Target(
+                timestamp=now - age,
+                enqueued_at=now - age,
+                conf=rng.uniform(0.5, 1.0),
+                u=rng.uniform(0.0, 1280.0),
+                v=rng.uniform(0.0, 720.0),
+                w=20.0,
+                h=20.0,
+                x_ground=x,
+                y_ground=y,
+                x_arm=x,
+                y_arm=y,
+            )
+        )
+    return out
+
+
+# ---------------------------------------------------------------------- cases
+
+
+def _pan_tilt_scalar():
+    rig, (x, y) = _rig(), _ground_points(1)[0]
+    return lambda: rig.solve(x, y, 0.0)
+
+
+def _pan_tilt_batch(n: int):
+    def setup():
+        rig, points = _rig(), _ground_points(n)
+        return lambda: [rig.solve(x, y, 0.0) for x, y in points]
+
+    return setup
+
+
+def _planar_arm():
+    from kinematics.planar_arm import JointLimits, PlanarTwoLinkArm
+
+    return PlanarTwoLinkArm(
+        link_1=0.35,
+        link_2=0.30,
+        joint_1_limits=JointLimits(-180.0, 180.0),
+        joint_2_limits=JointLimits(-180.0, 180.0),
+    )
+
+
+def _planar_scalar():
+    arm, (x, y) = _planar_arm(), _ground_points(1)[0]
+    return lambda: arm.solve(x, y)
+
+
+def _planar_batch(n: int):
+    def setup():
+        arm, points = _planar_arm(), _ground_points(n)
+        return lambda: [arm.solve(x, y) for x, y in points]
+
+    return setup
+
+
+def _h_scalar():
+    h, (u, v) = _homography(), _pixels(1)[0]
+    return lambda: h.image_to_ground(u, v)
+
+
+def _h_loop(n: int):
+    def setup():
+        h, pixels = _homography(), _pixels(n)
+        return lambda: [h.image_to_ground(u, v) for u, v in pixels]
+
+    return setup
+
+
+def _h_batch(n: int):
+    def setup():
+        h, pixels = _homography(), _pixels(n)
+        return lambda: h.batch_image_to_ground(pixels)
+
+    return setup
+
+
+def _prioritized(n: int):
+    def setup():
+        from apps.weeder_runtime.runtime import prioritized_detections
+
+        dets = _detections(n)
+        return lambda: prioritized_detections(dets, 0.5, 400.0)
+
+    return setup
+
+
+def _duplicate(n: int):
+    def setup():
+        from apps.weeder_runtime.runtime import Target, is_duplicate
+
+        now = time.time()
+        queue = _queue(n, now)
+        # a fresh weed: no match, so the whole queue is scanned (the common, worst case)
+        candidate = Target(now, now, 0.9, 640.0, 700.0, 20.0, 20.0, 5.0, 5.0, 5.0, 5.0)
+        return lambda: is_duplicate(queue, candidate, 0.05)
+
+    return setup
+
+
+def _prune_keep(n: int):
+    def setup():
+        from apps.weeder_runtime.runtime import prune_queue
+
+        now = time.time()
+        queue = _queue(n, now)
+        return lambda: prune_queue(queue, 1.0, now)
+
+    return setup
+
+
+def _prune_evict(n: int):
+    def setup():
+        from apps.weeder_runtime.runtime import prune_queue
+
+        now = time.time()
+        template = list(_queue(n, now, stale_fraction=0.5))
+
+        def run():
+            queue = deque(template, maxlen=max(n, 1))  # includes rebuilding the queue each call
+            prune_queue(queue, 1.0, now)
+
+        return run
+
+    return setup
+
+
+def _select(n: int):
+    def setup():
+        from apps.weeder_runtime.runtime import select_target
+
+        queue = _queue(n, time.time())
+        return lambda: select_target(queue)
+
+    return setup
+
+
+CASES: List[Case] = [
+    Case("pan_tilt.solve/scalar", _pan_tilt_scalar, hot=True),
+    *[Case(f"pan_tilt.solve/batch{n}", _pan_tilt_batch(n), items=n, hot=n == 32) for n in (8, 32, 128)],
+    Case("planar_arm.solve/scalar", _planar_scalar, hot=True),
+    *[Case(f"planar_arm.solve/batch{n}", _planar_batch(n), items=n) for n in (8, 32, 128)],
+    Case("homography.image_to_ground/scalar", _h_scalar, hot=True),
+    *[Case(f"homography.image_to_ground/loop{n}", _h_loop(n), items=n) for n in (10, 100)],
+    *[
+        Case(f"homography.batch_image_to_ground/{n}", _h_batch(n), items=n, hot=n == 100)
+        for n in (1, 10, 100, 1000)
+    ],
+    *[Case(f"prioritized_detections/{n}", _prioritized(n), items=n, hot=n == 50) for n in (1, 10, 50, 200)],
+    *[Case(f"is_duplicate/{n}", _duplicate(n), items=n, hot=n == 32) for n in (5, 32, 64)],
+    *[Case(f"prune_queue/keep{n}", _prune_keep(n), items=n, hot=n == 32) for n in (5, 32, 64)],
+    *[Case(f"prune_queue/evict_half{n}", _prune_evict(n), items=n) for n in (5, 32, 64)],
+    *[Case(f"select_target/{n}", _select(n), items=n, hot=n == 32) for n in (5, 32, 64)],
+]
+
+
+# ---------------------------------------------------------------------- runner
+
+
+def _reference_workload() -> Callable[[], object]:
+    """Interpreter-bound work that none of the benchmarked code affects."""
+    import math
+
+    values = [(i * 0.37, i * 0.11) for i in range(64)]
+    return lambda: sum(math.hypot(a, b) for a, b in values)
+
+
+REFERENCE = Case("reference", _reference_workload)
+
+
+def time_case(case: Case, repeat: int, min_time_s: float) -> float:
+    """Seconds per call: fastest of `repeat` runs, each long enough to swamp timer overhead."""
+    fn = case.setup()
+    timer = timeit.Timer(fn)
+    number = 1
+    while True:
+        if timer.timeit(number) >= min_time_s:
+            break
+        number *= 2 if number < 1000 else 10
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def default_baseline_path() -> Path:
+    host = re.sub(r"[^A-Za-z0-9_.-]+", "_", platform.node() or "unknown")
+    return BASELINE_DIR / f"{host}.json"
+
+
+def environment() -> Dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "node": platform.node(),
+    }
+
+
+def load_baseline(path: Path) -> Optional[Dict]:
+    if not path.exists():
+        return None
+    with path.open() as fh:
+        return json.load(fh)
+
+
+def save_baseline(path: Path, results: Dict[str, Dict[str, float]], previous: Optional[Dict]) -> None:
+    cases = dict((previous or {}).get("cases", {}))  # a filtered run only refreshes what it ran
+    cases.update({name: {k: round(v, 1) for k, v in row.items()} for name, row in results.items()})
+    payload = {"env": environment(), "saved_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "cases": cases}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w") as fh:
+        json.dump(payload, fh, indent=2, sort_keys=True)
+        fh.write("\n")
+
+
+def _fmt_ns(ns: float) -> str:
+    if ns >= 1e6:
+        return f"{ns / 1e6:.2f} ms"
+    if ns >= 1e3:
+        return f"{ns / 1e3:.2f} us"
+    return f"{ns:.0f} ns"
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--only", action="append", default=[], help="Glob or substring of case names (repeatable)")
+    p.add_argument("--list", action="store_true", help="List cases and exit")
+    p.add_argument("--baseline", type=Path, default=None, help="Baseline JSON (default: per-host file)")
+    p.add_argument("--save", action="store_true", help="Write this run's timings to the baseline")
+    p.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown of hot cases (0.25 = 25%%)")
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--min-time", type=float, default=0.05, help="Seconds per timed run")
+    p.add_argument("--confirm", type=int, default=2, help="Re-time a case this often before calling it a regression")
+    p.add_argument("--json", type=Path, default=None, help="Also write this run's results here")
+    args = p.parse_args()
+
+    def selected(case: Case) -> bool:
+        return not args.only or any(pat in case.name or fnmatch.fnmatch(case.name, pat) for pat in args.only)
+
+    cases = [case for case in CASES if selected(case)]
+    if args.list:
+        for case in cases:
+            print(f"{case.name}{'  [hot]' if case.hot else ''}")
+        return
+    if not cases:
+        raise SystemExit("no benchmark matches --only")
+
+    baseline_path = args.baseline or default_baseline_path()
+    baseline = load_baseline(baseline_path)
+    base_cases = (baseline or {}).get("cases", {})
+    if baseline and baseline.get("env", {}).get("python") != platform.python_version():
+        print(f"note: baseline was recorded on Python {baseline['env'].get('python')}", file=sys.stderr)
+
+    def measure(case: Case) -> Dict[str, float]:
+        ref = time_case(REFERENCE, args.repeat, args.min_time / 2)
+        return {"ns_per_call": time_case(case, args.repeat, args.min_time) * 1e9, "reference_ns": ref * 1e9}
+
+    def expected_ns(row: Dict[str, float], base_row: Dict[str, float]) -> Optional[float]:
+        """Baseline time scaled by how fast the reference ran now versus then."""
+        base = base_row.get("ns_per_call")
+        if not base:
+            return None
+        if base_row.get("reference_ns"):
+            base *= row["reference_ns"] / base_row["reference_ns"]
+        return base
+
+    results: Dict[str, Dict[str, float]] = {}
+    regressions: List[str] = []
+    print(f"{'case':<40} {'per call':>11} {'per item':>11} {'expected':>11} {'change':>8}")
+    for case in cases:
+        base_row = base_cases.get(case.name, {})
+        row = measure(case)
+        base = expected_ns(row, base_row)
+        if base and case.hot:
+            for _ in range(args.confirm):
+                if row["ns_per_call"] / base - 1.0 <= args.threshold:
+                    break
+                retry = measure(case)
+                retry_base = expected_ns(retry, base_row)
+                if retry_base and retry["ns_per_call"] / retry_base < row["ns_per_call"] / base:
+                    row, base = retry, retry_base
+        results[case.name] = row
+        ns = row["ns_per_call"]
+        change = ""
+        if base:
+            ratio = ns / base - 1.0
+            change = f"{ratio:+.0%}"
+            if case.hot and ratio > args.threshold:
+                regressions.append(f"{case.name} {ratio:+.0%}")
+                change += " !"
+        print(
+            f"{case.name + ('*' if case.hot else ''):<40} {_fmt_ns(ns):>11} {_fmt_ns(ns / case.items):>11} "
+            f"{_fmt_ns(base) if base else '-':>11} {change:>8}"
+        )
+    print("* hot case: fails the run if slower than baseline by more than the threshold")
+
+    if args.json:
+        with args.json.open("w") as fh:
+            json.dump({"env": environment(), "cases": results}, fh, indent=2)
+    if args.save:
+        save_baseline(baseline_path, results, baseline)
+        print(f"baseline saved to {baseline_path}")
+        return
+    if baseline is None:
+        print(f"no baseline at {baseline_path}; record one with --save")
+        return
+    if regressions:
+        raise SystemExit(f"hot-path regressions over {args.threshold:.0%}: " + ", ".join(regressions))
+
+
+if __name__ == "__main__":
+    main()
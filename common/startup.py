@@ -0,0 +1,43 @@
+"""Startup phase timer used to keep cold starts honest."""
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+
+@dataclass
+class StartupTimer:
+    """Record named phases from launch and render a one-line breakdown."""
+
+    label: str = "startup"
+    t0: float = field(default_factory=time.perf_counter)
+    marks: List[Tuple[str, float]] = field(default_factory=list)
+
+    def mark(self, name: str, at: Optional[float] = None) -> float:
+        """Close the current phase as `name`; returns its duration in seconds."""
+        now = time.perf_counter() if at is None else at
+        prev = self.marks[-1][1] if self.marks else self.t0
+        self.marks.append((name, now))
+        return now - prev
+
+    def total(self) -> float:
+        if not self.marks:
+            return 0.0
+        return self.marks[-1][1] - self.t0
+
+    def as_dict(self) -> Dict[str, float]:
+        phases: Dict[str, float] = {}
+        prev = self.t0
+        for name, at in self.marks:
+            phases[name] = round(at - prev, 4)
+            prev = at
+        phases["total"] = round(self.total(), 4)
+        return phases
+
+    def report(self) -> str:
+        parts = [f"{name}={dt * 1000:.0f}ms" for name, dt in self.as_dict().items() if name != "total"]
+        return f"[{self.label}] {' '.join(parts)} | total={self.total() * 1000:.0f}ms"
+
+
+__all__ = ["StartupTimer"]
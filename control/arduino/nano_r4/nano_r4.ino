@@ -30,6 +30,13 @@ constexpr long TILT_HOME_BACKOFF_STEPS = 160;
 
 constexpr uint32_t TELEMETRY_PERIOD_MS = 250;
 constexpr size_t   COMMAND_QUEUE_CAP   = 8;
+constexpr size_t   SERIAL_LINE_MAX     = 768;
+
+/* "path" commands: up to PATH_MAX_WAYPOINTS rows of [pan, tilt, arrive_ms, dwell_ms],
+   with arrive_ms on this board's millis() clock (the host keeps a clock estimate).
+   A waypoint dispatched more than late_ms after its arrive time is skipped. */
+constexpr size_t   PATH_MAX_WAYPOINTS        = 4;  // two full paths fit the command queue
+constexpr uint16_t PATH_DEFAULT_LATE_MS      = 150;
 
 // Pulse timing tuned for DM556 (minimum 2.5 microseconds) with comfortable margin.
 constexpr uint16_t STEP_PULSE_HIGH_US = 15;
@@ -81,6 +88,10 @@ struct TargetCommand {
   uint16_t pulseMs;
   uint16_t settleMs;
   bool fireLaser;
+  bool timed;                // from "path": pace the move to land at arriveByMs
+  uint32_t arriveByMs;
+  uint16_t lateToleranceMs;
+  uint32_t tag;              // host id echoed in the dispatch/skipped ack; 0 = none
 };
 
 struct CommandQueue {
@@ -182,6 +193,8 @@ struct LaserState {
   uint16_t settleMs = 0;
   unsigned long settleDeadlineMs = 0;
   unsigned long offDeadlineMs    = 0;
+  bool timed                     = false;
+  unsigned long notBeforeMs      = 0;
   float commandConfidence        = 0.0f;
   unsigned long lastFireMs       = 0;
 };
@@ -210,6 +223,8 @@ void laserDisarm() {
   g_laserState.settleMs = 0;
   g_laserState.settleDeadlineMs = 0;
   g_laserState.offDeadlineMs    = 0;
+  g_laserState.timed            = false;
+  g_laserState.notBeforeMs      = 0;
   g_laserState.commandConfidence = 0.0f;
   laserSetFiring(false);
 }
@@ -226,6 +241,8 @@ void laserArmForCommand(const TargetCommand &cmd) {
   g_laserState.settleMs = cmd.settleMs;
   g_laserState.settleDeadlineMs = 0;
   g_laserState.offDeadlineMs    = 0;
+  g_laserState.timed            = cmd.timed;
+  g_laserState.notBeforeMs      = cmd.arriveByMs;
   g_laserState.commandConfidence = cmd.confidence;
   laserSetFiring(false);
 }
@@ -266,6 +283,11 @@ void updateLaserState(unsigned long nowMs) {
     return;
   }
 
+  // step rounding can land a paced move early; never fire before the arrive-by time
+  if (g_laserState.timed && static_cast<long>(nowMs - g_laserState.notBeforeMs) < 0) {
+    return;
+  }
+
   laserSetFiring(true);
   g_laserState.active  = true;
   g_laserState.pending = false;
@@ -418,15 +440,30 @@ void beginHome() {
   setEnable(tiltAxis, true);
 }
 
-void emitAck(const char *status, const char *detail = nullptr) {
-  StaticJsonDocument<256> doc;
+bool homingInProgress() {
+  auto homing = [](const Axis &axis) {
+    return axis.state == MotionState::HomingSeek || axis.state == MotionState::HomingRelease;
+  };
+  return g_homeRequested || homing(panAxis) || homing(tiltAxis);
+}
+
+void emitAck(const char *status, const char *detail = nullptr, long seq = -1, uint32_t tag = 0) {
+  StaticJsonDocument<384> doc;
   doc["status"] = status;
   if (detail) {
     doc["detail"] = detail;
   }
+  if (seq >= 0) {
+    doc["seq"] = seq;
+  }
+  if (tag) {
+    doc["tag"] = tag;
+  }
+  doc["time_ms"]           = millis();
   doc["queue"]             = g_queue.size();
   doc["pan_homed"]         = panAxis.homed;
   doc["tilt_homed"]        = tiltAxis.homed;
+  doc["homing"]            = homingInProgress();
   doc["laser_pending"]     = g_laserState.pending;
   doc["laser_active"]      = g_laserState.active;
   doc["laser_active_low"]  = g_laserConfig.activeLow;
@@ -540,6 +577,7 @@ bool handleMoveCommand(JsonVariant root) {
   cmd.groundY = root["target_ground"][1] | NAN;
   cmd.groundZ = root["target_ground"][2] | NAN;
   cmd.queuedMs = millis();
+  cmd.tag = root["tag"] | 0UL;
 
   uint16_t pulseMs = g_laserConfig.defaultPulseMs;
   uint16_t settleMs = g_laserConfig.defaultSettleMs;
@@ -601,6 +639,53 @@ bool handleMoveCommand(JsonVariant root) {
   return true;
 }
 
+bool handlePathCommand(JsonVariant root) {
+  if (!panAxis.homed || !tiltAxis.homed) {
+    emitAck("error", "home_required");
+    return false;
+  }
+
+  JsonArray rows = root["wp"].as<JsonArray>();
+  if (rows.isNull() || rows.size() == 0) {
+    emitAck("error", "missing_wp");
+    return false;
+  }
+  if (rows.size() > PATH_MAX_WAYPOINTS) {
+    emitAck("error", "path_too_long");
+    return false;
+  }
+
+  const float confidence = root["conf"] | 1.0f;
+  const uint16_t lateMs  = root["late_ms"] | PATH_DEFAULT_LATE_MS;
+  uint32_t tag           = root["tag"] | 0UL;  // waypoint i gets tag + i
+  bool droppedAny = false;
+
+  for (JsonArray row : rows) {
+    uint16_t dwellMs = row[3].as<uint16_t>();
+    if (dwellMs > LASER_MAX_PULSE_MS) {
+      dwellMs = LASER_MAX_PULSE_MS;
+    }
+    // dwell 0 passes through the waypoint without firing
+    const bool fire = dwellMs > 0 && confidence >= g_laserConfig.minConfidence;
+    TargetCommand cmd = buildCommand(row[0].as<float>(), row[1].as<float>(), confidence,
+                                     dwellMs, g_laserConfig.defaultSettleMs, fire);
+    cmd.timed           = true;
+    cmd.arriveByMs      = row[2].as<uint32_t>();
+    cmd.lateToleranceMs = lateMs;
+    cmd.tag             = tag;
+    if (tag) {
+      ++tag;
+    }
+
+    bool dropped = false;
+    g_queue.push(cmd, &dropped);
+    droppedAny = droppedAny || dropped;
+  }
+
+  emitAck("queued", droppedAny ? "path_dropped_oldest" : "path");
+  return true;
+}
+
 void handleHomeCommand() {
   g_homeRequested = true;
   emitAck("homing");
@@ -655,7 +740,7 @@ void handleConfigCommand(JsonVariant root) {
       }
       if (minConf != g_laserConfig.minConfidence) {
         g_laserConfig.minConfidence = minConf;
-        changed = true
+        changed = true;
       }
     }
   }
@@ -718,7 +803,7 @@ void handleConfigCommand(JsonVariant root) {
 }
 
 void processLine(const String &line) {
-  StaticJsonDocument<256> doc;
+  StaticJsonDocument<1024> doc;  // a full "path" is ~25 values
   auto err = deserializeJson(doc, line);
   if (err) {
     emitAck("error", "json_parse");
@@ -732,10 +817,11 @@ void processLine(const String &line) {
   }
 
   if      (strcmp(cmd, "move")         == 0) handleMoveCommand(doc);
+  else if (strcmp(cmd, "path")         == 0) handlePathCommand(doc);
   else if (strcmp(cmd, "home")         == 0) handleHomeCommand();
   else if (strcmp(cmd, "config")       == 0) handleConfigCommand(doc);
   else if (strcmp(cmd, "motors_check") == 0) queueMotorsCheck();
-  else if (strcmp(cmd, "ping")         == 0) emitAck("pong");
+  else if (strcmp(cmd, "ping")         == 0) emitAck("pong", nullptr, doc["seq"] | -1L);
   else                                        emitAck("error", "unknown_cmd");
 }
 
@@ -750,7 +836,7 @@ void serviceSerial() {
     } else if (c == '\r') {
       // ignore carriage return
     } else {
-      if (g_serialBuffer.length() < 500) {
+      if (g_serialBuffer.length() < SERIAL_LINE_MAX) {
         g_serialBuffer += c;
       }
     }
@@ -773,13 +859,37 @@ void tryDispatchCommand() {
     return;
   }
 
+  const unsigned long nowMs = millis();
+  if (cmd.timed && static_cast<long>(nowMs - cmd.arriveByMs) > static_cast<long>(cmd.lateToleranceMs)) {
+    emitAck("skipped", "late", -1, cmd.tag);
+    return;
+  }
+
   panAxis.targetSteps  = roundToLong(degToSteps(cmd.panDeg,  panAxis.stepsPerDeg));
   tiltAxis.targetSteps = roundToLong(degToSteps(cmd.tiltDeg, tiltAxis.stepsPerDeg));
+
+  refreshAxisSpeeds();
+  if (cmd.timed) {
+    // slow each axis so both land at arriveByMs instead of stopping early and waiting
+    const long travelMs = static_cast<long>(cmd.arriveByMs - nowMs);
+    if (travelMs > 0) {
+      const float travelS   = travelMs / 1000.0f;
+      const float panRate   = labs(panAxis.targetSteps  - panAxis.currentSteps)  / travelS;
+      const float tiltRate  = labs(tiltAxis.targetSteps - tiltAxis.currentSteps) / travelS;
+      if (panRate > 0.0f && panRate < panAxis.moveStepsPerSec) {
+        panAxis.moveStepsPerSec = panRate;
+      }
+      if (tiltRate > 0.0f && tiltRate < tiltAxis.moveStepsPerSec) {
+        tiltAxis.moveStepsPerSec = tiltRate;
+      }
+    }
+  }
+
   panAxis.state  = MotionState::Moving;
   tiltAxis.state = MotionState::Moving;
   g_lastCommandConfidence = cmd.confidence;
   laserArmForCommand(cmd);
-  emitAck("dispatch");
+  emitAck("dispatch", nullptr, -1, cmd.tag);
 }
 
 void setup() {
@@ -0,0 +1,134 @@
+"""Host <-> firmware clock estimate from `ping`/`pong` exchanges and telemetry."""
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Optional, Tuple
+
+_WRAP_MS = 1 << 32  # millis() is a uint32
+
+
+@dataclass
+class ClockSync:
+    """Model firmware `millis()` as a linear function of host `time.monotonic()`.
+
+    - `add_exchange(send, fw_ms, recv)`: a `ping` sent at `send` answered by a `pong`
+      stamped `fw_ms`, received at `recv`. The firmware stamp is assumed to sit at the
+      round-trip midpoint, so its error is at most half the round trip.
+    - `add_one_way(fw_ms, recv)`: a telemetry line. It only says the firmware stamped
+      it before the host read it. If the model predicts otherwise, the offset is raised
+      to honour that bound.
+
+    Exchanges in the window are fitted by least squares weighted by 1/rtt^2, after
+    discarding round trips over `rtt_outlier_factor` times the best one. Once they span
+    `min_drift_span_s` the fit includes drift; before that it is offset only.
+    """
+
+    window: int = 32
+    rtt_outlier_factor: float = 3.0
+    min_drift_span_s: float = 5.0
+    stats: Dict[str, int] = field(
+        default_factory=lambda: {"exchanges": 0, "one_way": 0, "causality_bumps": 0, "resets": 0}
+    )
+
+    def __post_init__(self) -> None:
+        self._samples: Deque[Tuple[float, float, float]] = deque(maxlen=self.window)  # host_mid, fw_s, rtt
+        self._last_fw_ms: Optional[int] = None
+        self._wrap_s = 0.0
+        # (t_ref, offset at t_ref, drift): swapped as one tuple so readers on other threads
+        # never see half an update. offset is fw_s - host_s; drift is d(offset)/dt.
+        self._model: Optional[Tuple[float, float, float]] = None
+        self._bump_s = 0.0
+        self._best_rtt_s: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._model is not None
+
+    @property
+    def drift_ppm(self) -> float:
+        return 0.0 if self._model is None else self._model[2] * 1e6
+
+    @property
+    def uncertainty_s(self) -> Optional[float]:
+        return None if self._best_rtt_s is None else self._best_rtt_s / 2.0
+
+    def reset(self) -> None:
+        """Forget everything (controller rebooted or link re-opened)."""
+        self.__post_init__()
+        self.stats["resets"] += 1
+
+    def add_exchange(self, host_send: float, fw_ms: int, host_recv: float) -> None:
+        fw_s = self._unwrap(fw_ms)
+        rtt = max(host_recv - host_send, 0.0)
+        self._samples.append(((host_send + host_recv) / 2.0, fw_s, rtt))
+        self.stats["exchanges"] += 1
+        self._fit()
+
+    def add_one_way(self, fw_ms: int, host_recv: float) -> None:
+        fw_s = self._unwrap(fw_ms)
+        self.stats["one_way"] += 1
+        if not self.ready:
+            return
+        floor = fw_s - host_recv  # emitted no later than received
+        predicted = self.offset_s(host_recv)
+        if predicted < floor:
+            self._bump_s += floor - predicted
+            self.stats["causality_bumps"] += 1
+
+    def offset_s(self, host_t: float) -> float:
+        """Firmware seconds minus host seconds at host time `host_t`."""
+        model = self._model
+        if model is None:
+            raise RuntimeError("clock not synchronised yet")
+        t_ref, offset, drift = model
+        return offset + drift * (host_t - t_ref) + self._bump_s
+
+    def to_firmware_ms(self, host_t: float) -> int:
+        """Firmware `millis()` value at host monotonic time `host_t` (wrapped to uint32)."""
+        fw_s = host_t + self.offset_s(host_t) - self._wrap_s
+        return int(round(fw_s * 1000.0)) % _WRAP_MS
+
+    def to_host(self, fw_ms: int) -> float:
+        """Host monotonic time at which the firmware read `fw_ms` (same wrap epoch as the last sample)."""
+        fw_s = fw_ms / 1000.0 + self._wrap_s
+        host = fw_s - self.offset_s(fw_s)
+        return fw_s - self.offset_s(host)
+
+    def summary(self) -> Dict[str, object]:
+        out: Dict[str, object] = dict(self.stats)
+        out["ready"] = self.ready
+        out["drift_ppm"] = round(self.drift_ppm, 1)
+        out["uncertainty_ms"] = None if self._best_rtt_s is None else round(self._best_rtt_s * 500.0, 2)
+        return out
+
+    def _unwrap(self, fw_ms: int) -> float:
+        fw_ms = int(fw_ms) % _WRAP_MS
+        if self._last_fw_ms is not None and fw_ms < self._last_fw_ms:
+            if self._last_fw_ms - fw_ms > _WRAP_MS // 2:
+                self._wrap_s += _WRAP_MS / 1000.0
+            else:
+                # went backwards without wrapping: the controller restarted
+                self.reset()
+        self._last_fw_ms = fw_ms
+        return fw_ms / 1000.0 + self._wrap_s
+
+    def _fit(self) -> None:
+        best = min(rtt for _, _, rtt in self._samples)
+        self._best_rtt_s = best
+        limit = max(best * self.rtt_outlier_factor, 1e-3)
+        pts = [(t, fw - t, 1.0 / max(rtt / 2.0, 1e-4) ** 2) for t, fw, rtt in self._samples if rtt <= limit]
+        sw = sum(w for _, _, w in pts)
+        t_mean = sum(t * w for t, _, w in pts) / sw
+        o_mean = sum(o * w for _, o, w in pts) / sw
+        span = max(t for t, _, _ in pts) - min(t for t, _, _ in pts)
+        drift = 0.0
+        if span >= self.min_drift_span_s:
+            var = sum(w * (t - t_mean) ** 2 for t, _, w in pts)
+            if var > 0:
+                drift = sum(w * (t - t_mean) * (o - o_mean) for t, o, w in pts) / var
+        self._bump_s = 0.0
+        self._model = (t_mean, o_mean, drift)
+
+
+__all__ = ["ClockSync"]
@@ -0,0 +1,147 @@
+"""Deadband, coalescing and rate limiting in front of `ArduinoBridge.send_move`."""
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .serial_bridge import CONNECTED, ArduinoBridge
+
+# `MoveShaper.submit` outcomes
+SENT = "sent"  # handed to the bridge now
+HELD = "held"  # waiting for the rate limit; goes out later unless a newer move replaces it
+SUPPRESSED = "suppressed"  # inside the deadband, never sent
+
+DropListener = Callable[[Optional[Dict]], None]
+
+
+@dataclass
+class MoveShaper:
+    """Shape the move stream so the 115200-baud link only carries meaningful commands.
+
+    - Moves within the pan/tilt deadband of the last sent move are suppressed.
+    - Moves arriving faster than `max_rate_hz` are held; a newer move replaces the
+      held one, so each time slice sends only the latest target. Drop listeners hear
+      about every held move that was replaced, so callers can requeue its target.
+    """
+
+    bridge: ArduinoBridge
+    deadband_pan_deg: float = 0.5
+    deadband_tilt_deg: float = 0.5
+    max_rate_hz: float = 10.0  # <= 0 disables rate limiting
+    refresh_s: float = 0.0  # resend an unchanged target after this long; 0 never does
+    stats: Dict[str, int] = field(
+        default_factory=lambda: {"submitted": 0, "sent": 0, "suppressed_deadband": 0, "coalesced": 0}
+    )
+
+    def __post_init__(self) -> None:
+        self._lock = threading.Lock()
+        self._last_joints: Optional[Dict[str, float]] = None
+        self._last_sent_at = float("-inf")
+        self._pending: Optional[Tuple[Dict[str, float], Optional[Dict]]] = None
+        self._timer: Optional[threading.Timer] = None
+        self._drop_listeners: List[DropListener] = []
+        self.bridge.add_state_listener(self._on_link_state)
+
+    @classmethod
+    def from_config(cls, bridge: ArduinoBridge, cfg: Dict) -> "MoveShaper":
+        deadband = cfg.get("deadband_deg", {})
+        if not isinstance(deadband, dict):
+            deadband = {"pan": deadband, "tilt": deadband}
+        return cls(
+            bridge=bridge,
+            deadband_pan_deg=float(deadband.get("pan", 0.5)),
+            deadband_tilt_deg=float(deadband.get("tilt", 0.5)),
+            max_rate_hz=float(cfg.get("max_rate_hz", 10.0)),
+            refresh_s=float(cfg.get("refresh_s", 0.0)),
+        )
+
+    @property
+    def min_interval_s(self) -> float:
+        return 1.0 / self.max_rate_hz if self.max_rate_hz > 0 else 0.0
+
+    def add_drop_listener(self, listener: DropListener) -> None:
+        """Call `listener(metadata)` when a held move is replaced by a newer one (on the submitting thread)."""
+        self._drop_listeners.append(listener)
+
+    def submit(self, joint_angles_deg: Dict[str, float], metadata: Optional[Dict] = None) -> str:
+        """Offer a move; returns `SENT`, `HELD` or `SUPPRESSED`."""
+        now = time.monotonic()
+        dropped = None
+        with self._lock:
+            self.stats["submitted"] += 1
+            if self._within_deadband(joint_angles_deg, now):
+                self.stats["suppressed_deadband"] += 1
+                return SUPPRESSED
+            if self._pending is not None:
+                self.stats["coalesced"] += 1
+                dropped = self._pending
+            self._pending = (joint_angles_deg, metadata)
+            wait = self._last_sent_at + self.min_interval_s - now
+            if wait <= 0:
+                self._flush_locked(now)
+                outcome = SENT
+            else:
+                outcome = HELD
+                if self._timer is None:
+                    self._timer = threading.Timer(wait, self._flush_due)
+                    self._timer.daemon = True
+                    self._timer.start()
+        if dropped is not None:
+            for listener in self._drop_listeners:
+                listener(dropped[1])
+        return outcome
+
+    def reset(self) -> None:
+        """Forget the last sent pose (e.g. after homing) so the next move always goes out."""
+        with self._lock:
+            self._last_joints = None
+
+    def summary(self) -> Dict[str, int]:
+        with self._lock:
+            out = dict(self.stats)
+        out["saved"] = out["suppressed_deadband"] + out["coalesced"]
+        return out
+
+    def close(self) -> None:
+        """Send any held move immediately and stop the timer."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._pending is not None:
+                self._flush_locked(time.monotonic())
+
+    def _within_deadband(self, joints: Dict[str, float], now: float) -> bool:
+        ref = self._pending[0] if self._pending is not None else self._last_joints
+        if ref is None:
+            return False
+        if self._pending is None and self.refresh_s > 0 and now - self._last_sent_at >= self.refresh_s:
+            return False
+        return (
+            abs(float(joints.get("pan", 0.0)) - float(ref.get("pan", 0.0))) <= self.deadband_pan_deg
+            and abs(float(joints.get("tilt", 0.0)) - float(ref.get("tilt", 0.0))) <= self.deadband_tilt_deg
+        )
+
+    def _flush_due(self) -> None:
+        with self._lock:
+            self._timer = None
+            if self._pending is not None:
+                self._flush_locked(time.monotonic())
+
+    def _flush_locked(self, now: float) -> None:
+        assert self._pending is not None
+        joints, metadata = self._pending
+        self._pending = None
+        self._last_joints = joints
+        self._last_sent_at = now
+        self.stats["sent"] += 1
+        self.bridge.send_move(joints, metadata=metadata)
+
+    def _on_link_state(self, state: str, detail: Optional[str]) -> None:
+        if state == CONNECTED:
+            self.reset()  # controller may have reset and re-homed
+
+
+__all__ = ["MoveShaper", "SENT", "HELD", "SUPPRESSED"]
@@ -1,10 +1,15 @@
 """Serial link helper for the Arduino stepper controller."""
 from __future__ import annotations
 
+import glob
 import json
+import os
+import re
+import threading
 import time
-from dataclasses import dataclass
-from typing import Dict, Optional
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Tuple
 
 try:
     import serial  # type: ignore
@@ -14,17 +19,89 @@ except ImportError as exc:  # pragma: no cover - handled at runtime
 else:
     _IMPORT_ERROR = None
 
+from .clock_sync import ClockSync
+from .trajectory import PATH_LATE_TOLERANCE_MS, Waypoint, encode_path
+
+# Connection states reported to listeners and the dashboard.
+CONNECTING = "connecting"
+CONNECTED = "connected"
+DISCONNECTED = "disconnected"
+CLOSED = "closed"
+
+StateListener = Callable[[str, Optional[str]], None]
+MessageListener = Callable[[Dict], None]
+
+
+@dataclass
+class _Outbound:
+    line: bytes
+    queued_at: float
+    stale_after: Optional[float]  # None means never stale (home/config)
+
 
 @dataclass
 class ArduinoBridge:
+    """JSON-lines link to the controller with a background I/O thread.
+
+    Commands are queued (bounded, drop-oldest) and written by a dedicated thread.
+    If the port disappears the thread reconnects with exponential backoff, also
+    trying re-enumerated device names, and drops only moves that went stale
+    while the link was down.
+
+    The same thread keeps `clock` (host monotonic -> firmware `millis()`) fitted from
+    `ping`/`pong` round trips on connect and every `clock_sync_interval_s`, plus the
+    `time_ms` stamp on every reply, so `send_path` can send arrive-by times.
+    """
+
     port: Optional[str]
     baudrate: int = 115200
     timeout: float = 0.1
     dry_run: bool = False
+    ready_timeout: float = 5.0  # seconds to wait for the firmware to answer `ping`
+    ping_interval: float = 0.1
+    max_pending: int = 32
+    stale_after_s: float = 1.0  # queued moves older than this are dropped instead of sent
+    reconnect: bool = True
+    reconnect_min_s: float = 0.2
+    reconnect_max_s: float = 5.0
+    rehome_on_reconnect: Optional[bool] = None  # None: home only if the controller reports unhomed
+    port_glob: Optional[str] = None  # None: the port with its trailing index wildcarded; "": no search
+    usb_serial: Optional[str] = None  # expected USB serial number; learnt on the first connect if unset
+    lazy_connect: bool = False  # connect from the I/O thread instead of blocking construction
+    drain_timeout: float = 1.0
+    clock_sync_samples: int = 8  # round trips right after connecting
+    clock_sync_interval_s: float = 2.0  # one more round trip this often while connected
+    clock_sync_timeout_s: float = 0.25
+    clock: ClockSync = field(default_factory=ClockSync, init=False)
+    last_pong: Optional[Dict] = field(default=None, init=False)
+    last_status: Optional[Dict] = field(default=None, init=False)
+    ready_after_s: Optional[float] = field(default=None, init=False)
+    active_port: Optional[str] = field(default=None, init=False)
+    last_error: Optional[str] = field(default=None, init=False)
 
     def __post_init__(self) -> None:
+        self._ser = None
+        self._state = CONNECTING
+        self._pending: Deque[_Outbound] = deque()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._io_thread: Optional[threading.Thread] = None
+        self._state_listeners: List[StateListener] = []
+        self._message_listeners: List[MessageListener] = []
+        self.state_log: Deque[Tuple[float, str, Optional[str]]] = deque(maxlen=64)
+        self._next_clock_sync = 0.0
+        self._ping_seq = 0
+        self._stats = {
+            "sent": 0,
+            "dropped_stale": 0,
+            "dropped_overflow": 0,
+            "write_errors": 0,
+            "reconnects": 0,
+            "clock_sync_timeouts": 0,
+        }
         if self.dry_run:
-            self._ser = None
+            self.wait_ready(0.0)
+            self._set_state(CONNECTED, "dry-run")
             return
         if not self.port:
             raise ValueError("Serial port required unless dry_run=True")
@@ -32,29 +109,362 @@ class ArduinoBridge:
             raise RuntimeError(
                 "pyserial not installed. Install with `pip install pyserial` or set dry_run=True"
             ) from _IMPORT_ERROR
-        self._ser = serial.Serial(self.port, self.baudrate, timeout=self.timeout)
-        time.sleep(2.0)
+        if not self.lazy_connect:
+            self._connect(self.port)
+        self._io_thread = threading.Thread(target=self._io_loop, name="serial-io", daemon=True)
+        self._io_thread.start()
+
+    # ------------------------------------------------------------------ public API
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    @property
+    def connected(self) -> bool:
+        return self._state == CONNECTED
+
+    @property
+    def controller_homed(self) -> bool:
+        """Homed state reported by the last `pong` (False if unknown)."""
+        if not self.last_pong:
+            return False
+        return bool(self.last_pong.get("pan_homed")) and bool(self.last_pong.get("tilt_homed"))
+
+    @property
+    def controller_homing(self) -> bool:
+        """True while the last `pong` reported a homing cycle in progress (boot homing included).
+
+        A home sent now would restart the cycle, so callers treat this as homed-pending.
+        """
+        return bool(self.last_pong and self.last_pong.get("homing"))
+
+    def add_state_listener(self, listener: StateListener) -> None:
+        """Call `listener(state, detail)` on every connection-state transition."""
+        self._state_listeners.append(listener)
+
+    def add_message_listener(self, listener: MessageListener) -> None:
+        """Call `listener(reply)` for every JSON line received from the controller."""
+        self._message_listeners.append(listener)
+
+    def stats(self) -> Dict:
+        with self._cond:
+            pending = len(self._pending)
+        out: Dict = dict(self._stats)
+        out.update(
+            {
+                "state": self._state,
+                "port": self.active_port or self.port,
+                "pending": pending,
+                "last_error": self.last_error,
+                "clock": self.clock.summary(),
+            }
+        )
+        return out
+
+    def wait_ready(self, timeout: float) -> Dict:
+        """Ping the controller until it answers `pong` (it may still be in its bootloader)."""
+        if self.dry_run:
+            self.last_pong = {"status": "pong", "pan_homed": True, "tilt_homed": True}
+            self.ready_after_s = 0.0
+            now = time.monotonic()
+            self.clock.add_exchange(now, int(now * 1000.0), now)  # host clock stands in for millis()
+            return self.last_pong
+        assert self._ser is not None
+        start = time.monotonic()
+        deadline = start + timeout
+        next_ping = start
+        self._ser.reset_input_buffer()
+        while True:
+            now = time.monotonic()
+            if now >= deadline:
+                raise RuntimeError(
+                    f"Controller on {self.active_port or self.port} did not answer ping within {timeout:.1f}s"
+                )
+            if now >= next_ping:
+                self._ser.write(b'{"cmd":"ping"}\n')
+                next_ping = now + self.ping_interval
+            reply = self._read_status()
+            if reply is not None and reply.get("status") == "pong":
+                self.last_pong = reply
+                self.ready_after_s = time.monotonic() - start
+                return reply
+
+    def flush(self, timeout: float) -> bool:
+        """Block until the outbound queue is empty; False if it did not drain in time."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._state != CONNECTED:
+                    return False
+                self._cond.wait(remaining)
+        return True
 
     def close(self) -> None:
-        if getattr(self, "_ser", None):
-            self._ser.close()
+        if self._io_thread is not None:
+            self.flush(self.drain_timeout)
+            self._stop.set()
+            with self._cond:
+                self._cond.notify_all()
+            self._io_thread.join(timeout=2.0)
+            self._io_thread = None
+        self._close_port()
+        self._set_state(CLOSED, None)
 
-    def send_move(self, joint_angles_deg: Dict[str, float], metadata: Optional[Dict] = None) -> None:
+    def send_move(self, joint_angles_deg: Dict[str, float], metadata: Optional[Dict] = None) -> bool:
         payload = {"cmd": "move", "joints": joint_angles_deg}
         if metadata:
             payload.update(metadata)
-        self._send(payload)
+        return self._send(payload, stale_after=self.stale_after_s)
+
+    def send_path(
+        self,
+        waypoints: Sequence[Waypoint],
+        metadata: Optional[Dict] = None,
+        late_ms: int = PATH_LATE_TOLERANCE_MS,
+    ) -> bool:
+        """Queue one `path` command (arrive-by times converted to firmware `millis()`).
 
-    def send_home(self) -> None:
-        self._send({"cmd": "home"})
+        Returns False without queueing if the clock is not synchronised (no `pong` with
+        `time_ms` yet, or the controller just restarted); callers fall back to `send_move`.
+        """
+        try:
+            payload = encode_path(waypoints, self.clock, late_ms, metadata)
+        except RuntimeError:
+            return False
+        # useless once the last waypoint is past the firmware's lateness tolerance
+        stale_after = max(wp.arrive_by for wp in waypoints) - time.monotonic() + late_ms / 1000.0
+        return self._send(payload, stale_after=max(stale_after, 0.0))
 
-    def _send(self, payload: Dict) -> None:
+    def send_home(self) -> bool:
+        return self._send({"cmd": "home"})
+
+    # ------------------------------------------------------------------ internals
+
+    def _send(self, payload: Dict, stale_after: Optional[float] = None) -> bool:
         line = json.dumps(payload) + "\n"
         if self.dry_run:
             print(f"[dry-run] {line.strip()}")
-            return
+            return True
+        if self._state == CLOSED:
+            return False
+        item = _Outbound(line.encode("utf-8"), time.monotonic(), stale_after)
+        with self._cond:
+            if len(self._pending) >= self.max_pending:
+                self._pending.popleft()
+                self._stats["dropped_overflow"] += 1
+            self._pending.append(item)
+            self._cond.notify_all()
+        return True
+
+    def _next_outbound(self, wait: float) -> Optional[_Outbound]:
+        with self._cond:
+            if not self._pending:
+                self._cond.wait(wait)
+            now = time.monotonic()
+            while self._pending:
+                item = self._pending.popleft()
+                if item.stale_after is not None and now - item.queued_at > item.stale_after:
+                    self._stats["dropped_stale"] += 1
+                    continue
+                if not self._pending:
+                    self._cond.notify_all()  # wake flush()
+                return item
+            self._cond.notify_all()
+            return None
+
+    def _requeue_front(self, item: _Outbound) -> None:
+        with self._cond:
+            self._pending.appendleft(item)
+
+    def _io_loop(self) -> None:
+        backoff = self.reconnect_min_s
+        was_connected = self._ser is not None
+        while not self._stop.is_set():
+            if self._ser is None:
+                if was_connected and not self.reconnect:
+                    self._stop.wait(self.timeout)
+                    continue
+                if self._try_connect(rehome=was_connected):
+                    if was_connected:
+                        self._stats["reconnects"] += 1
+                    was_connected = True
+                    backoff = self.reconnect_min_s
+                else:
+                    self._stop.wait(backoff)
+                    backoff = min(backoff * 2.0, self.reconnect_max_s)
+                continue
+
+            item: Optional[_Outbound] = None
+            try:
+                item = self._next_outbound(self.timeout)
+                if item is not None:
+                    self._ser.write(item.line)
+                    self._stats["sent"] += 1
+                    item = None
+                self._drain_input()
+                if time.monotonic() >= self._next_clock_sync:
+                    self._sync_clock(1 if self.clock.ready else self.clock_sync_samples)
+            except OSError as exc:  # SerialException derives from IOError
+                if item is not None:
+                    self._requeue_front(item)
+                self._stats["write_errors"] += 1
+                self._close_port()
+                self.last_error = str(exc)
+                self._set_state(DISCONNECTED, str(exc))
+
+    def _candidate_ports(self) -> List[str]:
+        assert self.port is not None
+        if self.port_glob is not None:
+            pattern = self.port_glob
+        elif self.port.startswith("/dev/serial/"):
+            pattern = ""  # by-id/by-path names are stable; a wildcard would match other boards
+        else:
+            pattern = re.sub(r"\d+$", "*", self.port)
+        candidates = [self.port]
+        if self.active_port and self.active_port not in candidates:
+            candidates.append(self.active_port)
+        for path in sorted(glob.glob(pattern)) if pattern else ():
+            if path not in candidates:
+                candidates.append(path)
+        return candidates
+
+    def _try_connect(self, rehome: bool) -> bool:
+        for port in self._candidate_ports():
+            try:
+                self._connect(port)
+            except (OSError, RuntimeError) as exc:
+                self._close_port()
+                self.last_error = f"{port}: {exc}"
+                continue
+            if rehome and not self.controller_homing and (
+                self.rehome_on_reconnect or (self.rehome_on_reconnect is None and not self.controller_homed)
+            ):
+                assert self._ser is not None
+                try:
+                    self._ser.write(b'{"cmd":"home"}\n')
+                except OSError as exc:
+                    self._close_port()
+                    self._set_state(DISCONNECTED, f"{port}: {exc}")
+                    continue
+            return True
+        return False
+
+    def _connect(self, port: str) -> None:
+        assert serial is not None
+        # exclusive: another head (or process) must not share a re-enumerated port
+        self._ser = serial.Serial(port, self.baudrate, timeout=self.timeout, exclusive=True)
+        found = usb_serial_number(port)
+        if self.usb_serial and found and found != self.usb_serial:
+            # a glob match that is some other head's board
+            self._close_port()
+            raise RuntimeError(f"USB serial {found}, expected {self.usb_serial}")
+        self.usb_serial = self.usb_serial or found
+        self.active_port = port
+        try:
+            self.wait_ready(self.ready_timeout)
+            self.clock.reset()  # possibly a different (or rebooted) controller
+            self._sync_clock(self.clock_sync_samples)
+        except Exception:
+            self._close_port()
+            raise
+        self._set_state(CONNECTED, port)
+
+    def _sync_clock(self, samples: int) -> None:
+        """Blocking `ping` round trips; other replies read meanwhile go to the listeners.
+
+        Each ping carries a `seq` the firmware echoes, so a late pong is never paired with
+        the wrong send time. Firmware without `time_ms` on its pong leaves the clock unready.
+        """
+        assert self._ser is not None
+        for _ in range(samples):
+            self._ping_seq += 1
+            sent = time.monotonic()
+            self._ser.write(b'{"cmd":"ping","seq":%d}\n' % self._ping_seq)
+            while True:
+                reply = self._read_status()
+                received = time.monotonic()
+                if reply is not None and reply.get("status") == "pong":
+                    self.last_pong = reply
+                    if "time_ms" not in reply:
+                        self._next_clock_sync = float("inf")  # older firmware: no clock to sync
+                        return
+                    if reply.get("seq") == self._ping_seq:
+                        self.clock.add_exchange(sent, reply["time_ms"], received)
+                        break
+                    # otherwise the answer to an earlier ping (e.g. from wait_ready): keep reading
+                elif reply is not None:
+                    self._dispatch(reply, received)
+                if received - sent > self.clock_sync_timeout_s:
+                    # a late pong would pair with the next ping; stop and retry next interval
+                    self._stats["clock_sync_timeouts"] += 1
+                    self._next_clock_sync = received + self.clock_sync_interval_s
+                    return
+        self._next_clock_sync = time.monotonic() + self.clock_sync_interval_s
+
+    def _close_port(self) -> None:
+        ser, self._ser = self._ser, None
+        if ser is not None:
+            try:
+                ser.close()
+            except Exception:
+                pass
+
+    def _drain_input(self) -> None:
         assert self._ser is not None
-        self._ser.write(line.encode("utf-8"))
+        while self._ser.in_waiting:
+            reply = self._read_status()
+            if reply is not None:
+                self._dispatch(reply, time.monotonic())
+
+    def _dispatch(self, reply: Dict, received: float) -> None:
+        if "time_ms" in reply:
+            was_ready = self.clock.ready
+            self.clock.add_one_way(reply["time_ms"], received)
+            if was_ready and not self.clock.ready:
+                self._next_clock_sync = 0.0  # millis() went backwards: controller restarted, resync now
+        self.last_status = reply
+        for listener in self._message_listeners:
+            try:
+                listener(reply)
+            except Exception:
+                pass
+
+    def _read_status(self) -> Optional[Dict]:
+        assert self._ser is not None
+        raw = self._ser.readline()
+        if not raw:
+            return None
+        try:
+            reply = json.loads(raw.decode("utf-8", errors="replace"))
+        except json.JSONDecodeError:
+            return None
+        return reply if isinstance(reply, dict) else None
+
+    def _set_state(self, state: str, detail: Optional[str]) -> None:
+        if state == self._state:
+            return
+        self._state = state
+        self.state_log.append((time.time(), state, detail))
+        for listener in self._state_listeners:
+            try:
+                listener(state, detail)
+            except Exception:
+                pass
+
+
+def usb_serial_number(port: str) -> Optional[str]:
+    """USB serial number of the device behind `port` (symlinks resolved), or None if unknown."""
+    try:
+        from serial.tools import list_ports  # type: ignore
+    except ImportError:
+        return None
+    real = os.path.realpath(port)
+    for info in list_ports.comports():
+        if os.path.realpath(info.device) == real:
+            return info.serial_number
+    return None
 
 
-__all__ = ["ArduinoBridge"]
+__all__ = ["ArduinoBridge", "CONNECTING", "CONNECTED", "DISCONNECTED", "CLOSED"]
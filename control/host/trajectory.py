@@ -0,0 +1,206 @@
+"""Time-stamped waypoint batches and a reference model of how the firmware executes them.
+
+A waypoint is a pan/tilt target with an arrive-by time and a laser dwell. The host
+converts arrive-by times to firmware `millis()` with `ClockSync` and sends a short batch
+as one `path` command. The firmware then paces each move to land on its time instead
+of stopping between weeds. `ReferenceExecutor` mirrors the firmware rules, so schedules
+can be checked without hardware.
+"""
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .clock_sync import ClockSync
+
+# keep in sync with control/arduino/nano_r4/nano_r4.ino; two full paths fit the command
+# queue, so the next batch can be sent while the current one is still running
+PATH_MAX_WAYPOINTS = 4
+PATH_LATE_TOLERANCE_MS = 150
+COMMAND_QUEUE_CAP = 8
+
+
+@dataclass
+class Waypoint:
+    pan: float
+    tilt: float
+    arrive_by: float  # host time.monotonic()
+    dwell_s: float = 0.5  # laser pulse at the target; 0 just passes through
+
+
+def encode_path(
+    waypoints: Sequence[Waypoint],
+    clock: ClockSync,
+    late_ms: int = PATH_LATE_TOLERANCE_MS,
+    metadata: Optional[Dict] = None,
+) -> Dict:
+    """Build the firmware `path` command: `wp` rows are `[pan, tilt, arrive_ms, dwell_ms]`."""
+    if not waypoints:
+        raise ValueError("empty path")
+    if len(waypoints) > PATH_MAX_WAYPOINTS:
+        raise ValueError(f"at most {PATH_MAX_WAYPOINTS} waypoints per path")
+    payload: Dict = {
+        "cmd": "path",
+        "wp": [
+            [round(wp.pan, 2), round(wp.tilt, 2), clock.to_firmware_ms(wp.arrive_by), int(round(wp.dwell_s * 1000))]
+            for wp in waypoints
+        ],
+        "late_ms": int(late_ms),
+    }
+    if metadata:
+        payload.update(metadata)
+    return payload
+
+
+def slew_s(start: Tuple[float, float], end: Tuple[float, float], pan_dps: float, tilt_dps: float) -> float:
+    return max(abs(end[0] - start[0]) / pan_dps, abs(end[1] - start[1]) / tilt_dps)
+
+
+def plan_arrivals(
+    start: Tuple[float, float],
+    targets: Iterable[Tuple[float, float]],
+    ready_at: float,
+    pan_dps: float = 90.0,
+    tilt_dps: float = 90.0,
+    dwell_s: float = 0.5,
+) -> List[Waypoint]:
+    """Back-to-back schedule: each target is reached at full slew right after the previous dwell."""
+    out: List[Waypoint] = []
+    pose, t = start, ready_at
+    for pan, tilt in targets:
+        t += slew_s(pose, (pan, tilt), pan_dps, tilt_dps)
+        out.append(Waypoint(pan, tilt, t, dwell_s))
+        t += dwell_s
+        pose = (pan, tilt)
+    return out
+
+
+@dataclass
+class FirmwareWaypoint:
+    """One queued waypoint in firmware time (ms). `arrive_ms=None` is a plain `move`."""
+
+    pan: float
+    tilt: float
+    arrive_ms: Optional[float]
+    dwell_ms: float
+    received_ms: float
+    late_ms: float = PATH_LATE_TOLERANCE_MS
+    tag: object = None
+
+
+@dataclass
+class WaypointResult:
+    tag: object
+    received_ms: float
+    dispatch_ms: float
+    arrive_ms: float
+    fire_ms: float
+    end_ms: float
+    skipped: bool = False
+
+    def lateness_ms(self, wanted_ms: Optional[float]) -> float:
+        return 0.0 if wanted_ms is None else self.fire_ms - wanted_ms
+
+
+def execute_waypoint(
+    pose: Tuple[float, float],
+    wp: FirmwareWaypoint,
+    now_ms: float,
+    pan_dps: float = 90.0,
+    tilt_dps: float = 90.0,
+    settle_ms: float = 0.0,
+) -> WaypointResult:
+    """Firmware `tryDispatchCommand` + laser timing for one waypoint dispatched at `now_ms`.
+
+    - Late by more than its tolerance: skipped.
+    - Otherwise each axis is slowed so the move lands on `arrive_ms` (never faster than
+      max slew).
+    - The laser fires after settle, but not before `arrive_ms`; with no dwell the next
+      waypoint is dispatched as soon as the axes stop.
+    """
+    if wp.arrive_ms is not None and now_ms - wp.arrive_ms > wp.late_ms:
+        return WaypointResult(wp.tag, wp.received_ms, now_ms, now_ms, now_ms, now_ms, skipped=True)
+    travel = slew_s(pose, (wp.pan, wp.tilt), pan_dps, tilt_dps) * 1000.0
+    if wp.arrive_ms is not None:
+        travel = max(travel, wp.arrive_ms - now_ms)
+    arrive = now_ms + travel
+    if wp.dwell_ms <= 0:
+        return WaypointResult(wp.tag, wp.received_ms, now_ms, arrive, arrive, arrive)
+    fire = arrive + settle_ms
+    if wp.arrive_ms is not None:
+        fire = max(fire, wp.arrive_ms)
+    return WaypointResult(wp.tag, wp.received_ms, now_ms, arrive, fire, fire + wp.dwell_ms)
+
+
+@dataclass
+class ReferenceExecutor:
+    """Discrete-event model of the controller: drop-oldest queue, one waypoint at a time."""
+
+    pan_dps: float = 90.0
+    tilt_dps: float = 90.0
+    settle_ms: float = 0.0
+    queue_cap: int = COMMAND_QUEUE_CAP
+    dropped: int = field(default=0, init=False)
+
+    def run(
+        self,
+        submissions: Sequence[Tuple[float, Sequence[FirmwareWaypoint]]],
+        start_pose: Tuple[float, float] = (0.0, 0.0),
+    ) -> List[WaypointResult]:
+        """`submissions` are `(received_ms, waypoints)` in arrival order; returns executed results."""
+        pending = sorted(submissions, key=lambda s: s[0])
+        queue: Deque[FirmwareWaypoint] = deque()
+        results: List[WaypointResult] = []
+        pose, free_at, i = start_pose, float("-inf"), 0
+        while i < len(pending) or queue:
+            if queue:
+                dispatch_at = max(free_at, queue[0].received_ms)
+                if i < len(pending) and pending[i][0] <= dispatch_at:
+                    self._push(queue, pending[i][1])
+                    i += 1
+                    continue
+                wp = queue.popleft()
+                result = execute_waypoint(pose, wp, dispatch_at, self.pan_dps, self.tilt_dps, self.settle_ms)
+                results.append(result)
+                free_at = result.end_ms
+                if not result.skipped:
+                    pose = (wp.pan, wp.tilt)
+            else:
+                self._push(queue, pending[i][1])
+                i += 1
+        return results
+
+    def _push(self, queue: Deque[FirmwareWaypoint], waypoints: Sequence[FirmwareWaypoint]) -> None:
+        for wp in waypoints:
+            if len(queue) >= self.queue_cap:
+                queue.popleft()
+                self.dropped += 1
+            queue.append(wp)
+
+
+def utilisation(results: Sequence[WaypointResult]) -> float:
+    """Fraction of wall time from first dispatch to last finish that the head spent moving or firing."""
+    done = [r for r in results if not r.skipped]
+    if not done:
+        return 0.0
+    span = max(r.end_ms for r in done) - min(r.dispatch_ms for r in done)
+    idle = sum(
+        max(0.0, b.dispatch_ms - a.end_ms) for a, b in zip(done, done[1:])
+    )
+    return 1.0 - idle / span if span > 0 else 1.0
+
+
+__all__ = [
+    "PATH_MAX_WAYPOINTS",
+    "PATH_LATE_TOLERANCE_MS",
+    "Waypoint",
+    "encode_path",
+    "slew_s",
+    "plan_arrivals",
+    "FirmwareWaypoint",
+    "WaypointResult",
+    "execute_waypoint",
+    "ReferenceExecutor",
+    "utilisation",
+]
@@ -1,9 +1,7 @@
 from __future__ import annotations
 
-import itertools
-import time
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Optional
 
 from fastapi import FastAPI, HTTPException
 from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
@@ -21,25 +19,45 @@ def api_status() -> Dict:
 
 
 @app.get("/api/events")
-def api_events(limit: int = 50) -> Dict:
-    limit = max(1, min(limit, 200))
-    return {"events": service.events(limit)}
+def api_events(limit: int = 50, since_id: Optional[int] = None, types: Optional[str] = None) -> Dict:
+    """Events oldest-first. Poll with `since_id=<last_id from the previous reply>` to get only
+    new ones; `types` is a comma list of messages (`serial_*` matches by prefix).
+
+    `epoch` changes when ids restart (new process without a ring, or a recreated ring);
+    clients drop their cursor and cache when it does."""
+    limit = max(1, min(limit, 500))
+    type_list = [t.strip() for t in types.split(",") if t.strip()] if types else None
+    head = service.last_event_id()  # read first: everything up to here is covered by a short page
+    if since_id is not None and since_id > head:
+        since_id = None  # stale cursor from before a reset; the store answers it as a first poll
+    events = service.events(limit, since_id=since_id, types=type_list)
+    newest = events[-1]["id"] if events else (since_id or 0)
+    cursor = newest if len(events) >= limit else max(newest, head)
+    return {"events": events, "last_id": cursor, "epoch": service.events_epoch()}
+
+
+@app.post("/api/record")
+def api_record(post_s: Optional[float] = None) -> Dict:
+    """Save the last `pre_s` seconds of frames plus `post_s` more as a clip."""
+    clip = service.record("manual", post_s=post_s)
+    if clip is None:
+        raise HTTPException(409, detail="Recording disabled (camera.yaml recording.enabled)")
+    return {"clip": clip, "recording": service.status().get("recording")}
 
 
 @app.get("/video")
-def video_stream() -> StreamingResponse:
+def video_stream(fps: Optional[float] = None, scale: Optional[float] = None) -> StreamingResponse:
+    """MJPEG stream; `fps` and `scale` (0-1] ask for a lower rate/resolution than the defaults."""
     boundary = "frame"
 
     def frame_generator():
-        for _ in itertools.count():
-            jpeg = service.latest_jpeg()
-            if jpeg is None:
-                time.sleep(0.05)
-                continue
-            yield (
-                b"--" + boundary.encode() + b"\r\n"
-                b"Content-Type: image/jpeg\r\n\r\n" + jpeg + b"\r\n"
-            )
+        # unsubscribes when the client disconnects and the generator is closed
+        with service.subscribe_video(fps=fps, scale=scale) as sub:
+            for jpeg in sub:
+                yield (
+                    b"--" + boundary.encode() + b"\r\n"
+                    b"Content-Type: image/jpeg\r\n\r\n" + jpeg + b"\r\n"
+                )
 
     return StreamingResponse(
         frame_generator(),
@@ -0,0 +1,292 @@
+"""Dashboard event store: monotonic IDs, cursor reads, run collapsing, mmap ring on disk."""
+from __future__ import annotations
+
+import json
+import mmap
+import struct
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+try:
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover - stdlib json fallback
+    orjson = None
+
+COLLAPSE_DEFAULT = ("no_target",)
+
+_MAGIC = b"PLVEVT02"  # 02: slots in arrival order (01 used slot = id % capacity)
+_HEADER = struct.Struct("<8sIIQ")  # magic, slot_bytes, capacity, epoch (0 in files from before epochs)
+_HEADER_SIZE = 64
+_SLOT_HEAD = struct.Struct("<QI")  # event id (0 = empty), payload length
+
+
+def _dumps(event: Dict[str, Any]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(event)
+    return json.dumps(event, separators=(",", ":")).encode()
+
+
+def _loads(raw: bytes) -> Dict[str, Any]:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+class EventRing:
+    """Fixed-size memory-mapped ring of JSON events, stored in arrival order.
+
+    `append` takes the slot after the newest one; `replace` rewrites the newest slot in
+    place (a collapsed run that grew), so only new events use up history. Ids increase
+    along the ring, so the first event after a cursor is found by binary search. Memory
+    use is the page cache only. `epoch` is fixed when the file is (re)created, so ids
+    from a wiped ring are never mistaken for the same sequence.
+    """
+
+    def __init__(self, path: Path, capacity: int = 131072, slot_bytes: int = 512) -> None:
+        self.path = Path(path).expanduser()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        size = _HEADER_SIZE + capacity * slot_bytes
+        fresh = not self.path.exists() or self.path.stat().st_size != size
+        epoch = 0
+        if not fresh:
+            with self.path.open("rb") as fh:
+                magic, stored_slot, stored_cap, epoch = _HEADER.unpack(fh.read(_HEADER.size))
+            fresh = magic != _MAGIC or stored_slot != slot_bytes or stored_cap != capacity
+        with self.path.open("r+b" if not fresh else "w+b") as fh:
+            if fresh or not epoch:
+                epoch = int(time.time() * 1000)  # ms: stays exact as a JavaScript number
+                if fresh:
+                    fh.truncate(size)
+                fh.seek(0)
+                fh.write(_HEADER.pack(_MAGIC, slot_bytes, capacity, epoch))
+                fh.flush()
+            self._mm = mmap.mmap(fh.fileno(), size)
+        self.epoch = epoch
+        self.capacity = capacity
+        self.slot_bytes = slot_bytes
+        self.max_payload = slot_bytes - _SLOT_HEAD.size
+        # strided view over every slot's id field, for the start-up scan and cursor searches
+        self._ids = np.ndarray((capacity,), dtype="<u8", buffer=self._mm, offset=_HEADER_SIZE, strides=(slot_bytes,))
+        self._head = int(self._ids.argmax()) if self._ids.max() else -1  # newest slot, -1 while empty
+
+    def last_id(self) -> int:
+        return int(self._ids[self._head]) if self._head >= 0 else 0
+
+    def append(self, event: Dict[str, Any]) -> None:
+        """Store a new event in the slot after the newest one (overwriting the oldest once full)."""
+        self._head = (self._head + 1) % self.capacity
+        self._write(self._head, event)
+
+    def replace(self, event: Dict[str, Any]) -> None:
+        """Rewrite the newest slot with `event` (its id may have moved on)."""
+        if self._head < 0:
+            self.append(event)
+        else:
+            self._write(self._head, event)
+
+    def scan(self, since_id: int, before_id: int) -> Iterator[Dict[str, Any]]:
+        """Events with `since_id < id < before_id`, oldest first."""
+        if self._head < 0:
+            return
+        start = self._head + 1  # oldest slot once the ring has wrapped
+        older = self._ids[start:]  # both halves are sorted; empty slots (0) come first
+        pos = int(np.searchsorted(older, since_id, side="right"))
+        if pos == len(older):
+            pos += int(np.searchsorted(self._ids[:start], since_id, side="right"))
+        for logical in range(pos, self.capacity):
+            slot = (start + logical) % self.capacity
+            if int(self._ids[slot]) >= before_id:
+                return
+            event = self._read(slot)
+            if event is not None:
+                yield event
+
+    def tail(self, count: int) -> List[Dict[str, Any]]:
+        """The newest `count` events, oldest first."""
+        out: List[Dict[str, Any]] = []
+        for back in range(min(count, self.capacity) if self._head >= 0 else 0):
+            event = self._read((self._head - back) % self.capacity)
+            if event is None:
+                break  # an empty slot: the ring has not wrapped yet
+            out.append(event)
+        out.reverse()
+        return out
+
+    def _offset(self, slot: int) -> int:
+        return _HEADER_SIZE + slot * self.slot_bytes
+
+    def _write(self, slot: int, event: Dict[str, Any]) -> None:
+        event_id = int(event["id"])
+        payload = _dumps(event)
+        if len(payload) > self.max_payload:
+            brief = {k: event.get(k) for k in ("id", "timestamp", "message", "has_target", "serial_sent")}
+            brief["truncated"] = True
+            payload = _dumps(brief)
+        offset = self._offset(slot)
+        # payload first, id last, so a torn write never looks like a valid slot
+        _SLOT_HEAD.pack_into(self._mm, offset, 0, len(payload))
+        self._mm[offset + _SLOT_HEAD.size : offset + _SLOT_HEAD.size + len(payload)] = payload
+        _SLOT_HEAD.pack_into(self._mm, offset, event_id, len(payload))
+
+    def _read(self, slot: int) -> Optional[Dict[str, Any]]:
+        offset = self._offset(slot)
+        stored, length = _SLOT_HEAD.unpack_from(self._mm, offset)
+        if not stored or length > self.max_payload:
+            return None
+        start = offset + _SLOT_HEAD.size
+        try:
+            return _loads(self._mm[start : start + length])
+        except ValueError:
+            return None
+
+    def close(self) -> None:
+        self._ids = None  # release the buffer export before closing the map
+        self._mm.flush()
+        self._mm.close()
+
+
+class EventStore:
+    """Append-only event log with monotonically increasing `id`s.
+
+    - `since(since_id)` returns only newer events, oldest first, in O(delta).
+    - Consecutive events whose message is in `collapse` merge into one event carrying
+      `count`, `first_timestamp` and a stable `run_id`; each merge re-issues the event
+      under a fresh id so cursor clients pick up the update. The run keeps its ring slot,
+      so an idle stretch costs one slot however long it lasts.
+    - Recent events live in a bounded deque; with `path` set, every event is also
+      written to an `EventRing` so older history survives in constant memory and
+      across restarts.
+    - Ids restart at 1 when there is no ring or the ring was recreated; `epoch` changes
+      then, and a `since_id` beyond `last_id` is answered like a first poll, so cursor
+      clients resynchronise instead of waiting for ids to catch up.
+    """
+
+    def __init__(
+        self,
+        memory_size: int = 512,
+        path: Optional[Path] = None,
+        capacity: int = 131072,
+        slot_bytes: int = 512,
+        collapse: Iterable[str] = COLLAPSE_DEFAULT,
+    ) -> None:
+        self._lock = threading.Lock()
+        self._recent: Deque[Dict[str, Any]] = deque(maxlen=max(memory_size, 1))
+        self._collapse = frozenset(collapse)
+        self._ring = EventRing(path, capacity, slot_bytes) if path else None
+        self._last_id = self._ring.last_id() if self._ring is not None else 0
+        self.epoch = self._ring.epoch if self._ring is not None else int(time.time() * 1000)
+        if self._ring is not None:  # warm the in-memory tail from the previous run
+            self._recent.extend(self._ring.tail(self._recent.maxlen or 0))
+
+    @property
+    def last_id(self) -> int:
+        return self._last_id
+
+    def append(self, event: Dict[str, Any]) -> int:
+        """Store `event` (a new dict is kept; the caller's is not modified). Returns its id."""
+        with self._lock:
+            event = dict(event)
+            last = self._recent[-1] if self._recent else None
+            message = event.get("message")
+            merged = last is not None and message in self._collapse and last.get("message") == message
+            if merged:
+                assert last is not None
+                self._recent.pop()
+                event["run_id"] = last.get("run_id", last["id"])
+                event["count"] = last.get("count", 1) + 1
+                event["first_timestamp"] = last.get("first_timestamp", last.get("timestamp"))
+            self._last_id += 1
+            event["id"] = self._last_id
+            self._recent.append(event)
+            if self._ring is not None:
+                if merged:
+                    self._ring.replace(event)
+                else:
+                    self._ring.append(event)
+            return self._last_id
+
+    def since(
+        self,
+        since_id: Optional[int] = None,
+        limit: int = 50,
+        types: Optional[Iterable[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Events oldest-first. With `since_id`, the first `limit` newer ones; else the latest `limit`.
+
+        `types` filters on `message`; an entry ending in `*` matches by prefix (e.g. `serial_*`).
+        """
+        match = _type_matcher(types)
+        with self._lock:
+            if since_id is not None and since_id > self._last_id:
+                since_id = None  # a cursor from before a restart or ring reset
+            if since_id is None:
+                out: List[Dict[str, Any]] = []
+                for event in reversed(self._recent):
+                    if match(event):
+                        out.append(event)
+                        if len(out) >= limit:
+                            break
+                out.reverse()
+                return out
+            oldest_recent = self._recent[0]["id"] if self._recent else self._last_id + 1
+            if since_id + 1 < oldest_recent and self._ring is not None:
+                return self._from_ring(since_id, oldest_recent, limit, match)
+            newer: List[Dict[str, Any]] = []
+            for event in reversed(self._recent):
+                if event["id"] <= since_id:
+                    break
+                newer.append(event)
+            newer.reverse()
+            return [event for event in newer if match(event)][:limit]
+
+    def _from_ring(self, since_id: int, oldest_recent: int, limit: int, match) -> List[Dict[str, Any]]:
+        assert self._ring is not None
+        out: List[Dict[str, Any]] = []
+        for event in self._ring.scan(since_id, oldest_recent):
+            if match(event):
+                out.append(event)
+                if len(out) >= limit:
+                    return out
+        for event in self._recent:
+            if match(event):
+                out.append(event)
+                if len(out) >= limit:
+                    break
+        return out
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "last_id": self._last_id,
+                "epoch": self.epoch,
+                "in_memory": len(self._recent),
+                "ring_capacity": self._ring.capacity if self._ring is not None else 0,
+                "ring_path": str(self._ring.path) if self._ring is not None else None,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._ring is not None:
+                self._ring.close()
+                self._ring = None
+
+
+def _type_matcher(types: Optional[Iterable[str]]):
+    if not types:
+        return lambda event: True
+    exact = {t for t in types if not t.endswith("*")}
+    prefixes = tuple(t[:-1] for t in types if t.endswith("*"))
+
+    def match(event: Dict[str, Any]) -> bool:
+        message = event.get("message") or ""
+        return message in exact or (bool(prefixes) and message.startswith(prefixes))
+
+    return match
+
+
+__all__ = ["EventRing", "EventStore", "COLLAPSE_DEFAULT"]
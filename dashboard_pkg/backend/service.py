@@ -1,30 +1,48 @@
 from __future__ import annotations
 
-import json
 import threading
 import time
-from collections import deque
 from pathlib import Path
-from typing import Any, Deque, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional
 
 import cv2
 import numpy as np
-from ultralytics import YOLO
 
 import yolo_launch as yl
+from common.startup import StartupTimer
+from control.host.command_shaper import SENT, MoveShaper
+from control.host.serial_bridge import ArduinoBridge
+from vision.capture.gate import ChangeGate
+from vision.capture.pipeline import load_camera_config
+from vision.capture.recorder import FrameRecorder
+from vision.detection.backends import create_backend
+from vision.detection.overlay import OverlayRenderer, Subscription, draw_detections
+from vision.detection.postprocess import best_detection
+
+from .events import COLLAPSE_DEFAULT, EventStore
 
 
 class DetectionService:
     """Background worker that runs YOLO, projects targets, and exposes live state."""
 
     def __init__(self, config: Optional[Dict[str, Any]] = None) -> None:
+        timer = StartupTimer(label="dashboard")
         args = yl.parse_args([])  # reuse CLI defaults/env parsing
         resolved = yl.resolve_settings(args)
         if config:
             resolved.update(config)
 
         self._settings = resolved
-        self._model = yl.load_model(resolved["model"])
+        self._model = create_backend(
+            resolved.get("backend") or "ultralytics",
+            resolved["model"],
+            imgsz=resolved["imgsz"],
+            conf=resolved["conf"],
+            threads=int(resolved.get("threads") or 0),
+            device=resolved.get("device"),
+            names=resolved.get("names"),
+        )
+        timer.mark("model")
         self._cap = yl.open_capture(
             resolved["cam"],
             resolved["usb_index"],
@@ -32,7 +50,10 @@ class DetectionService:
             resolved["height"],
             resolved["fps"],
         )
-        self._names = getattr(self._model, "names", {}) or {}
+        timer.mark("camera")
+        self._model.warm_up(resolved["width"], resolved["height"])
+        timer.mark("warmup")
+        self._names = self._model.names
 
         robot_cfg = yl.load_robot_config()
         self._projector = yl.PixelProjector(robot_cfg.get("projection", {}))
@@ -40,52 +61,85 @@ class DetectionService:
         self._extrinsics = robot_cfg.get("camera_to_arm", {})
         self._plane_z = float(robot_cfg.get("target_plane_z_m", 0.0))
 
-        # serial connection is optional
-        self._serial = yl.open_serial_connection(resolved["serial_port"], resolved["serial_baud"])
-        self._last_serial_payload: Optional[str] = None
-
         self._frame_lock = threading.Lock()
         self._status_lock = threading.Lock()
+        events_cfg = resolved.get("events") or {}
+        events_path = events_cfg.get("path", "~/plevelai/dashboard_events.ring")
+        self._events = EventStore(
+            memory_size=int(events_cfg.get("memory_size", 512)),
+            path=Path(events_path).expanduser() if events_path else None,
+            capacity=int(events_cfg.get("capacity", 131072)),
+            slot_bytes=int(events_cfg.get("slot_bytes", 512)),
+            collapse=events_cfg.get("collapse", COLLAPSE_DEFAULT),
+        )
+
+        # serial connection is optional; the bridge reconnects on its own after a USB glitch
+        self._bridge: Optional[ArduinoBridge] = None
+        self._shaper: Optional[MoveShaper] = None
+        if resolved["serial_port"]:
+            self._bridge = ArduinoBridge(
+                port=resolved["serial_port"],
+                baudrate=int(resolved["serial_baud"]),
+                lazy_connect=True,
+            )
+            self._bridge.add_state_listener(self._on_serial_state)
+            self._shaper = MoveShaper.from_config(self._bridge, robot_cfg.get("command_shaping") or {})
+        timer.mark("serial")
+        self._startup = timer.as_dict()
+        print(timer.report())
+
+        # overlays are drawn on the renderer's thread, and only while /video has viewers
+        stream_cfg = resolved.get("stream") or {}
+        self._overlay = OverlayRenderer(
+            draw=self._draw_overlay,
+            names=self._names,
+            default_fps=float(stream_cfg.get("fps", 15.0)),
+            jpeg_quality=int(stream_cfg.get("jpeg_quality", 75)),
+        )
+        self._stream_scale = float(stream_cfg.get("scale", 1.0))
+        # field clips: the loop only copies frames into the recorder's pool; its thread writes them
+        camera_cfg = load_camera_config()
+        recording_cfg = resolved.get("recording") or camera_cfg.get("recording") or {}
+        self._recorder = FrameRecorder.from_config(recording_cfg)
+        # unchanged scene (parked vehicle): skip inference and reuse the last detections
+        self._gate = ChangeGate.from_config(resolved.get("change_gate") or camera_cfg.get("change_gate") or {})
         self._latest_frame: Optional[np.ndarray] = None
         self._status: Dict[str, Any] = {
             "last_update": None,
             "has_target": False,
             "target": None,
             "fps": 0.0,
-            "serial_connected": bool(self._serial),
-            "serial_port": resolved["serial_port"],
+            "startup": self._startup,
+            "stream": self._overlay.summary(),
+            "recording": self._recording_status(),
+            "change_gate": None,
+            **self._serial_status(),
         }
-        self._events: Deque[Dict[str, Any]] = deque(maxlen=256)
 
         self._stop = threading.Event()
         self._worker = threading.Thread(target=self._loop, daemon=True)
         self._worker.start()
 
     def _loop(self) -> None:
-        conf = self._settings["conf"]
-        imgsz = self._settings["imgsz"]
         target_name = self._settings["target_name"]
         conf_min = self._settings["conf_min"]
 
         frame_count = 0
         start_time = time.time()
+        dets = None
         while not self._stop.is_set():
             ok, frame = self._cap.read()
             if not ok:
                 time.sleep(0.02)
                 continue
 
-            result = self._model.predict(
-                source=frame,
-                device=0,
-                imgsz=imgsz,
-                conf=conf,
-                verbose=False,
-            )[0]
+            if self._gate is None or self._gate.check(frame):
+                dets = self._model.predict(frame)
+            if self._recorder is not None:
+                self._recorder.push(frame, dets)
 
-            target = yl.pick_target(result, self._names, target_name, conf_min, conf)
+            target = best_detection(dets, self._names, target_name, conf_min)
             event: Dict[str, Any]
-            payload = "NO_TARGET\n"
             serial_sent = False
             x_ground = y_ground = None
             angles: Optional[Dict[str, float]] = None
@@ -98,6 +152,8 @@ class DetectionService:
                     if self._rig is not None:
                         angles = self._rig.solve(x_rig, y_rig, self._plane_z)
                 except Exception as exc:  # pragma: no cover - depends on calibration/hardware
+                    if self._recorder is not None:
+                        self._recorder.trigger("ik_failure", manual=False)
                     event = {
                         "timestamp": time.time(),
                         "message": f"IK failure: {exc}",
@@ -107,24 +163,17 @@ class DetectionService:
                     }
                 else:
                     if angles:
-                        payload_dict = {
-                            "cmd": "move",
-                            "joints": {joint: float(value) for joint, value in angles.items()},
+                        joints = {joint: float(value) for joint, value in angles.items()}
+                        metadata = {
                             "conf": float(score),
                             "pixel": {"u": float(u), "v": float(v)},
                             "target_ground": [float(x_ground), float(y_ground), self._plane_z],
                             "timestamp": time.time(),
                         }
-                        payload = json.dumps(payload_dict) + "\n"
-                        if self._serial and payload != self._last_serial_payload:
-                            try:
-                                self._serial.write(payload.encode("ascii"))
-                                self._serial.flush()
-                                self._last_serial_payload = payload
-                                serial_sent = True
-                            except Exception:
-                                serial_sent = False
-                                self._serial = None
+                        if self._shaper is not None:
+                            # deadband/rate limiting replaces whole-payload dedup (timestamps always differ)
+                            # held moves may still be replaced by a newer one, so only SENT counts
+                            serial_sent = self._shaper.submit(joints, metadata=metadata) == SENT
                         event = {
                             "timestamp": time.time(),
                             "message": "target",
@@ -151,11 +200,9 @@ class DetectionService:
                     "serial_sent": False,
                 }
 
-            output = result.plot()
-            yl.annotate_output(output, target, target_name)
-
+            self._overlay.publish(frame, dets, {"target": target})
             with self._frame_lock:
-                self._latest_frame = output
+                self._latest_frame = frame
 
             with self._status_lock:
                 fps = 0.0
@@ -171,19 +218,64 @@ class DetectionService:
                     "score": event.get("score"),
                     "joints": event.get("joints"),
                     "serial_sent": event.get("serial_sent", False),
-                    "serial_connected": bool(self._serial),
-                    "serial_port": self._settings["serial_port"],
                     "fps": fps,
+                    "startup": self._startup,
+                    "stream": self._overlay.summary(),
+                    "recording": self._recording_status(),
+                    "change_gate": self._gate.summary() if self._gate is not None else None,
+                    **self._serial_status(),
                 }
                 self._status = status
-                self._events.appendleft(event)
+            self._events.append(event)  # consecutive no_target frames collapse into one event
 
         self._cap.release()
-        if self._serial:
-            try:
-                self._serial.close()
-            except Exception:
-                pass
+        self._overlay.close()
+        if self._recorder is not None:
+            self._recorder.close()
+        self._events.close()
+        if self._shaper is not None:
+            self._shaper.close()
+        if self._bridge is not None:
+            self._bridge.close()
+
+    def _serial_status(self) -> Dict[str, Any]:
+        if self._bridge is None:
+            return {
+                "serial_connected": False,
+                "serial_state": None,
+                "serial_port": None,
+                "serial": None,
+                "command_shaping": None,
+            }
+        stats = self._bridge.stats()
+        return {
+            "serial_connected": self._bridge.connected,
+            "serial_state": stats["state"],
+            "serial_port": stats["port"],
+            "serial": stats,
+            "command_shaping": self._shaper.summary() if self._shaper is not None else None,
+        }
+
+    def _recording_status(self) -> Optional[Dict[str, Any]]:
+        return self._recorder.summary() if self._recorder is not None else None
+
+    def record(self, reason: str = "manual", post_s: Optional[float] = None) -> Optional[str]:
+        """Save the pre-trigger ring plus `post_s` seconds; None when recording is disabled."""
+        if self._recorder is None:
+            return None
+        return self._recorder.trigger(reason, post_s=post_s)
+
+    def _on_serial_state(self, state: str, detail: Optional[str]) -> None:
+        event = {
+            "timestamp": time.time(),
+            "message": f"serial_{state}",
+            "detail": detail,
+            "has_target": False,
+            "serial_sent": False,
+        }
+        self._events.append(event)
+        with self._status_lock:
+            self._status.update(self._serial_status())
 
     def stop(self) -> None:
         self._stop.set()
@@ -196,19 +288,42 @@ class DetectionService:
             return self._latest_frame.copy()
 
     def latest_jpeg(self) -> Optional[bytes]:
-        frame = self.latest_frame()
+        """One annotated JPEG of the latest frame, rendered on the caller's thread."""
+        frame = self._overlay.snapshot()
         if frame is None:
             return None
-        ok, buf = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), 75])
+        ok, buf = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), self._overlay.jpeg_quality])
         if not ok:
             return None
         return buf.tobytes()
 
+    def subscribe_video(self, fps: Optional[float] = None, scale: Optional[float] = None) -> Subscription:
+        """Register a stream viewer; rendering runs only while at least one is subscribed."""
+        return self._overlay.subscribe(fps=fps, scale=self._stream_scale if scale is None else scale)
+
+    def _draw_overlay(self, image: np.ndarray, dets: np.ndarray, meta: Dict[str, Any], scale: float) -> None:
+        draw_detections(image, dets, self._names)
+        target = meta.get("target")
+        if target is not None and scale != 1.0:
+            u, v, score = target
+            target = (u * scale, v * scale, score)
+        yl.annotate_output(image, target, self._settings["target_name"])
+
     def status(self) -> Dict[str, Any]:
         with self._status_lock:
             return dict(self._status)
 
-    def events(self, limit: int = 50) -> List[Dict[str, Any]]:
-        with self._status_lock:
-            snapshot = list(self._events)
-        return list(reversed(snapshot[:limit]))
+    def events(
+        self,
+        limit: int = 50,
+        since_id: Optional[int] = None,
+        types: Optional[Iterable[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Oldest-first; with `since_id` only events newer than that id (cursor polling)."""
+        return self._events.since(since_id=since_id, limit=limit, types=types)
+
+    def last_event_id(self) -> int:
+        return self._events.last_id
+
+    def events_epoch(self) -> int:
+        return self._events.epoch
@@ -3,6 +3,12 @@ const eventsList = document.getElementById('events-list');
 const serialPill = document.getElementById('serial-pill');
 const heartbeat = document.getElementById('heartbeat');
 
+const MAX_EVENTS = 30;
+let eventCursor = null;
+let eventEpoch = null;
+// keyed by run_id (collapsed runs) or id, in arrival order
+const eventCache = new Map();
+
 const fmt = new Intl.DateTimeFormat([], {
   hour: '2-digit',
   minute: '2-digit',
@@ -80,9 +86,11 @@ function renderEvents(events) {
       const v = fmtNumber(event.pixel?.v, 0);
       title.textContent = `Target @ ${u}, ${v}`;
     } else if (event.message === 'no_target') {
-      title.textContent = 'No target';
+      title.textContent = event.count > 1 ? `No target ×${event.count}` : 'No target';
     } else if (event.message === 'ik_unavailable') {
       title.textContent = 'IK unavailable';
+    } else if (event.message?.startsWith('serial_')) {
+      title.textContent = `Serial ${event.message.slice(7)}${event.detail ? ` · ${event.detail}` : ''}`;
     } else {
       title.textContent = event.message || 'event';
     }
@@ -123,10 +131,19 @@ async function refreshLoop() {
     renderStats(status);
 
     const connected = status.serial_connected;
-    serialPill.textContent = connected ? `Serial: ${status.serial_port || 'connected'}` : 'Serial: offline';
+    const state = status.serial_state;
+    if (connected) {
+      serialPill.textContent = `Serial: ${status.serial_port || 'connected'}`;
+    } else if (state === 'disconnected' || state === 'connecting') {
+      serialPill.textContent = `Serial: reconnecting (${status.serial_port || '?'})`;
+    } else {
+      serialPill.textContent = 'Serial: offline';
+    }
     serialPill.className = 'status-pill';
     if (connected) {
       serialPill.classList.add('success');
+    } else if (state === 'disconnected' || state === 'connecting') {
+      serialPill.classList.add('warning');
     } else {
       serialPill.classList.add('danger');
     }
@@ -140,9 +157,30 @@ async function refreshLoop() {
   }
 
   try {
-    const eventsRes = await fetch('/api/events?limit=30');
-    const events = await eventsRes.json();
-    renderEvents(events.events || []);
+    const query = eventCursor == null ? `limit=${MAX_EVENTS}` : `since_id=${eventCursor}&limit=200`;
+    const eventsRes = await fetch(`/api/events?${query}`);
+    const payload = await eventsRes.json();
+    if (payload.epoch != null && payload.epoch !== eventEpoch) {
+      const restarted = eventEpoch != null && eventCursor != null;
+      eventEpoch = payload.epoch;
+      if (restarted) {
+        // ids restarted on the server: drop the old cursor and cache, reload the tail next tick
+        eventCursor = null;
+        eventCache.clear();
+        return;
+      }
+    }
+    const fresh = payload.events || [];
+    for (const event of fresh) {
+      const key = event.run_id ?? event.id;
+      eventCache.delete(key); // a collapsed run moves to the end with its new count
+      eventCache.set(key, event);
+    }
+    while (eventCache.size > MAX_EVENTS) {
+      eventCache.delete(eventCache.keys().next().value);
+    }
+    if (payload.last_id != null) eventCursor = payload.last_id;
+    if (fresh.length || eventCache.size === 0) renderEvents([...eventCache.values()]);
   } catch (err) {
     console.error('events poll failed', err);
   }
@@ -29,6 +29,12 @@ YOLO_ENV=(
     CONF="${CONF:-0.25}"
     LOG="${LOG_PATH}"
     PORT="${PORT:-8080}"
+    WARMUP="${WARMUP:-1}"
+    BACKEND="${BACKEND:-ultralytics}"
+    DEVICE="${DEVICE:-}"
+    THREADS="${THREADS:-0}"
+    STREAM_FPS="${STREAM_FPS:-15}"
+    STREAM_SCALE="${STREAM_SCALE:-1.0}"
 )
 
 ( export "${YOLO_ENV[@]}"; python3 "${ROOT_DIR}/yolo_log_and_stream.py" ) &
@@ -62,5 +68,8 @@ fi
 if [[ "${SKIP_HOME:-0}" == "1" ]]; then
     RUNTIME_CMD+=(--skip-home)
 fi
+if [[ "${ASYNCIO:-0}" == "1" ]]; then
+    RUNTIME_CMD+=(--asyncio)
+fi
 
 "${RUNTIME_CMD[@]}"
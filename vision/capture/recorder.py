@@ -0,0 +1,300 @@
+"""Field recording off the inference loop: a pre-trigger ring of frames plus a background writer.
+
+`push(image, dets)` is the only call on the hot path. It samples at most `ring_fps`
+frames a second into preallocated slots (one `np.copyto`, no allocation, no encoding)
+and keeps the last `pre_s` seconds. `trigger(reason)` turns that history plus the next
+`post_s` seconds into a clip. `continuous_fps` also streams frames into rotating
+segments. A writer thread encodes and saves clips, and each slot goes back to the pool
+once it is written. The `low_conf` trigger looks at every pushed frame, sampled or not.
+
+Backpressure sheds frames: if the writer falls behind and no slot is free, `push`
+skips the frame and counts it, so the caller never waits on the disk.
+"""
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from vision.detection.records import encode_frame
+
+FORMATS = ("jpg", "mp4")
+
+
+@dataclass
+class _Item:
+    slot: int
+    ts: float  # wall clock, like the detection log
+    mono: float
+    dets: np.ndarray
+
+
+@dataclass
+class _Clip:
+    path: Path
+    reason: str
+    fps: float
+    until: float  # monotonic; the clip closes once a pushed frame is past this
+    frames: int = 0
+    writer: Any = None
+    sidecar: Any = None
+    closed: bool = False
+    last_mono: float = field(default=float("-inf"))
+
+
+class FrameRecorder:
+    """Bounded in-memory ring of recent frames with asynchronous clip writing.
+
+    Clips go to `output_dir/<time>_<reason>/` as `frames.mp4` or numbered JPEGs, plus
+    `detections.jsonl` with one detection-log record per frame, in frame order.
+    """
+
+    def __init__(
+        self,
+        output_dir: Path,
+        fmt: str = "jpg",
+        ring_fps: float = 10.0,
+        pre_s: float = 2.0,
+        post_s: float = 2.0,
+        continuous_fps: float = 0.0,
+        segment_s: float = 60.0,
+        pool_frames: int = 48,
+        low_conf: float = 0.0,
+        min_trigger_gap_s: float = 10.0,
+        jpeg_quality: int = 90,
+    ) -> None:
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown recording format {fmt!r}; expected one of {', '.join(FORMATS)}")
+        self.output_dir = Path(output_dir).expanduser()
+        self.fmt = fmt
+        self.ring_fps = float(ring_fps)
+        self.pre_s = float(pre_s)
+        self.post_s = float(post_s)
+        self.continuous_fps = float(continuous_fps)
+        self.segment_s = float(segment_s)
+        self.pool_frames = max(int(pool_frames), 2)
+        self.low_conf = float(low_conf)
+        self.min_trigger_gap_s = float(min_trigger_gap_s)
+        self.jpeg_quality = int(jpeg_quality)
+        # updated from push, trigger and the writer thread; only touched under _lock
+        self.stats: Dict[str, int] = {"sampled": 0, "shed": 0, "clips": 0, "written": 0, "write_errors": 0}
+
+        self._lock = threading.Lock()
+        self._slots: Optional[np.ndarray] = None  # (pool_frames, H, W, 3), allocated on the first frame
+        self._refs: List[int] = [0] * self.pool_frames
+        self._free: Deque[int] = deque(range(self.pool_frames))
+        self._ring: Deque[_Item] = deque()
+        self._clip: Optional[_Clip] = None  # triggered clip still collecting post-trigger frames
+        self._segment: Optional[_Clip] = None  # continuous recording
+        self._last_sample = float("-inf")
+        self._last_auto_trigger = float("-inf")
+        self._jobs: "queue.Queue[Optional[Tuple[_Clip, Optional[_Item]]]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._writer_loop, name="recorder", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_config(cls, cfg: Dict[str, Any]) -> Optional["FrameRecorder"]:
+        """Build from the `recording:` block of `configs/camera.yaml`; None when recording is off."""
+        save_output = bool(cfg.get("save_output", False))
+        if not (cfg.get("enabled", False) or save_output):
+            return None
+        return cls(
+            output_dir=Path(cfg.get("output_path", "/tmp/plevelai_recordings")),
+            fmt=str(cfg.get("format", "jpg")),
+            ring_fps=float(cfg.get("ring_fps", 10.0)) if cfg.get("enabled", False) else 0.0,
+            pre_s=float(cfg.get("pre_s", 2.0)),
+            post_s=float(cfg.get("post_s", 2.0)),
+            continuous_fps=float(cfg.get("continuous_fps", 2.0)) if save_output else 0.0,
+            segment_s=float(cfg.get("segment_s", 60.0)),
+            pool_frames=int(cfg.get("pool_frames", 48)),
+            low_conf=float(cfg.get("low_conf", 0.0)),
+            min_trigger_gap_s=float(cfg.get("min_trigger_gap_s", 10.0)),
+            jpeg_quality=int(cfg.get("jpeg_quality", 90)),
+        )
+
+    # ------------------------------------------------------------------ hot path
+
+    def push(self, image: np.ndarray, dets: Optional[np.ndarray] = None, ts: Optional[float] = None) -> None:
+        """Offer one frame and its `(N, 6)` detections; returns immediately."""
+        mono = time.monotonic()
+        # every frame may trigger a clip; only the copy into the pool is rate limited
+        if self.low_conf > 0 and dets is not None and len(dets) and float(np.min(dets[:, 4])) < self.low_conf:
+            self.trigger("low_conf", manual=False)
+        sample_fps = max(self.ring_fps, self.continuous_fps)
+        if sample_fps <= 0 or mono - self._last_sample < 1.0 / sample_fps:
+            return
+        self._last_sample = mono
+        dets = np.zeros((0, 6), dtype=np.float32) if dets is None else np.array(dets, dtype=np.float32)
+        with self._lock:
+            slot = self._acquire(image)
+            if slot is None:
+                self.stats["shed"] += 1
+                self._expire(mono, locked=True)
+                return
+        assert self._slots is not None
+        np.copyto(self._slots[slot], image)  # the only per-frame cost: one copy, no encoding
+        item = _Item(slot, time.time() if ts is None else ts, mono, dets)
+        with self._lock:
+            self.stats["sampled"] += 1
+            self._ring.append(item)
+            if self._clip is not None:
+                self._enqueue(self._clip, item)
+            if self.continuous_fps > 0:
+                self._continuous(item)
+            self._expire(mono, locked=True)
+
+    def trigger(self, reason: str, post_s: Optional[float] = None, manual: bool = True) -> Optional[str]:
+        """Save the ring plus the next `post_s` seconds; thread-safe. Returns the clip path.
+
+        Automatic triggers (`manual=False`) are limited to one per `min_trigger_gap_s`.
+        A trigger during a clip extends it.
+        """
+        mono = time.monotonic()
+        with self._lock:
+            if not manual and mono - self._last_auto_trigger < self.min_trigger_gap_s:
+                return None
+            if not manual:
+                self._last_auto_trigger = mono
+            until = mono + (self.post_s if post_s is None else float(post_s))
+            if self._clip is not None:
+                self._clip.until = max(self._clip.until, until)
+                return str(self._clip.path)
+            self._clip = self._new_clip(reason, self.ring_fps or self.continuous_fps, until)
+            for item in self._ring:
+                self._enqueue(self._clip, item)
+            return str(self._clip.path)
+
+    # ------------------------------------------------------------------ lifecycle
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(self.stats)
+            out["free_slots"] = len(self._free)
+            out["recording"] = self._clip is not None
+        out["writer_queue"] = self._jobs.qsize()
+        return out
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Finish open clips and stop the writer (frames still queued after `timeout` are lost)."""
+        with self._lock:
+            for clip in (self._clip, self._segment):
+                if clip is not None:
+                    self._jobs.put((clip, None))
+            self._clip = self._segment = None
+            while self._ring:
+                self._release(self._ring.popleft().slot)
+        self._jobs.put(None)
+        self._thread.join(timeout)
+
+    # ------------------------------------------------------------------ internals (caller holds the lock)
+
+    def _acquire(self, image: np.ndarray) -> Optional[int]:
+        if self._slots is None:
+            self._slots = np.empty((self.pool_frames,) + image.shape, dtype=image.dtype)
+        elif self._slots.shape[1:] != image.shape:
+            return None  # resolution changed mid-run; shed rather than reallocate on the hot path
+        if not self._free:
+            # reclaim the oldest ring frame unless a clip still needs it
+            if self._ring and self._refs[self._ring[0].slot] == 1:
+                self._release(self._ring.popleft().slot)
+            else:
+                return None
+        slot = self._free.popleft()
+        self._refs[slot] = 1
+        return slot
+
+    def _release(self, slot: int) -> None:
+        self._refs[slot] -= 1
+        if self._refs[slot] == 0:
+            self._free.append(slot)
+
+    def _enqueue(self, clip: _Clip, item: _Item) -> None:
+        self._refs[item.slot] += 1
+        self._jobs.put((clip, item))
+
+    def _continuous(self, item: _Item) -> None:
+        seg = self._segment
+        if seg is not None and item.mono >= seg.until:
+            self._jobs.put((seg, None))
+            seg = None
+        if seg is None:
+            seg = self._segment = self._new_clip("continuous", self.continuous_fps, item.mono + self.segment_s)
+        if item.mono - seg.last_mono >= 1.0 / self.continuous_fps - 1e-3:
+            seg.last_mono = item.mono
+            self._enqueue(seg, item)
+
+    def _expire(self, mono: float, locked: bool = False) -> None:
+        if not locked:
+            with self._lock:
+                self._expire(mono, locked=True)
+            return
+        keep_s = self.pre_s if self.ring_fps > 0 else 0.0
+        while self._ring and mono - self._ring[0].mono > keep_s:
+            self._release(self._ring.popleft().slot)
+        if self._clip is not None and mono >= self._clip.until:
+            self._jobs.put((self._clip, None))
+            self._clip = None
+
+    def _new_clip(self, reason: str, fps: float, until: float) -> _Clip:
+        stamp = time.strftime("%Y%m%d-%H%M%S") + f"-{int(time.time() * 1000) % 1000:03d}"
+        self.stats["clips"] += 1
+        return _Clip(self.output_dir / f"{stamp}_{reason}", reason, fps, until)
+
+    # ------------------------------------------------------------------ writer thread
+
+    def _writer_loop(self) -> None:
+        import cv2
+
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            clip, item = job
+            written = failed = 0
+            try:
+                if item is None:
+                    self._finish(clip)
+                elif not clip.closed:
+                    self._write(cv2, clip, item)
+                    written = 1
+            except Exception:
+                failed = 1
+            finally:
+                with self._lock:
+                    self.stats["written"] += written
+                    self.stats["write_errors"] += failed
+                    if item is not None:
+                        self._release(item.slot)
+
+    def _write(self, cv2: Any, clip: _Clip, item: _Item) -> None:
+        assert self._slots is not None
+        frame = self._slots[item.slot]
+        if clip.sidecar is None:
+            clip.path.mkdir(parents=True, exist_ok=True)
+            clip.sidecar = (clip.path / "detections.jsonl").open("wb")
+        if self.fmt == "mp4":
+            if clip.writer is None:
+                height, width = frame.shape[:2]
+                fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+                clip.writer = cv2.VideoWriter(str(clip.path / "frames.mp4"), fourcc, max(clip.fps, 1.0), (width, height))
+            clip.writer.write(frame)
+        else:
+            cv2.imwrite(str(clip.path / f"{clip.frames:06d}.jpg"), frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        clip.sidecar.write(encode_frame(item.ts, item.dets))
+        clip.frames += 1
+
+    def _finish(self, clip: _Clip) -> None:
+        clip.closed = True
+        if clip.writer is not None:
+            clip.writer.release()
+        if clip.sidecar is not None:
+            clip.sidecar.close()
+
+
+__all__ = ["FORMATS", "FrameRecorder"]
@@ -0,0 +1,309 @@
+"""Frame sources that read into reusable buffers and stamp each frame with its capture time.
+
+`read()` returns a `Frame` whose `image` is a BGR view into one of `buffers`
+preallocated arrays. The arrays are reused round-robin, so a frame stays valid for
+`buffers - 1` further reads. Copy it if it must live longer (e.g. a recorder queue).
+`captured_at` is on the `time.monotonic()` clock, so `frame.age()` is how stale the
+pixels are when the caller gets to them.
+"""
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from .pipeline import gst_pipeline, load_camera_config
+
+
+class CaptureError(RuntimeError):
+    """The camera or file could not be opened."""
+
+
+@dataclass
+class Frame:
+    image: np.ndarray  # BGR, HxWx3; may be a strided view of a BGRx buffer
+    seq: int
+    captured_at: float  # time.monotonic() when the pixels were captured
+    read_at: float  # time.monotonic() when read() handed the frame out
+
+    def age(self, now: Optional[float] = None) -> float:
+        return (time.monotonic() if now is None else now) - self.captured_at
+
+
+class FrameSource:
+    """Base class; subclasses implement `read`."""
+
+    name = "base"
+
+    def __init__(self, width: int, height: int, fps: float, buffers: int = 3, channels: int = 3) -> None:
+        self.width = int(width)
+        self.height = int(height)
+        self.fps = float(fps)
+        self._ring: List[np.ndarray] = [
+            np.empty((self.height, self.width, channels), dtype=np.uint8) for _ in range(max(int(buffers), 2))
+        ]
+        self._slot = 0
+        self._t0: Optional[float] = None
+        self._index = 0  # next frame index for paced sources
+        self.frames = 0
+        self.dropped = 0
+
+    def read(self) -> Optional[Frame]:
+        raise NotImplementedError
+
+    def release(self) -> None:
+        pass
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "source": self.name,
+            "resolution": f"{self.width}x{self.height}",
+            "fps": self.fps,
+            "buffers": len(self._ring),
+            "channels": self._ring[0].shape[2],  # 4 = BGRx handed over without conversion
+            "frames": self.frames,
+            "dropped": self.dropped,
+        }
+
+    def __iter__(self) -> Iterator[Frame]:
+        while True:
+            frame = self.read()
+            if frame is None:
+                return
+            yield frame
+
+    def __enter__(self) -> "FrameSource":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.release()
+
+    def _emit(self, filled: np.ndarray, captured_at: float) -> Frame:
+        """Hand out the buffer in the current slot; adopt `filled` if the backend had to reallocate."""
+        self._ring[self._slot] = filled
+        self._slot = (self._slot + 1) % len(self._ring)
+        image = filled[..., :3] if filled.shape[2] == 4 else filled
+        frame = Frame(image, self.frames, captured_at, time.monotonic())
+        self.frames += 1
+        return frame
+
+    def _pace(self, latest_only: bool) -> int:
+        """Emulate a live camera at `fps` for sources that could run faster than real time.
+
+        Sleeps until the next frame is due. If the reader fell behind and `latest_only` is
+        set, returns the newest due index, and the frames in between count as dropped.
+        """
+        now = time.monotonic()
+        if self._t0 is None:
+            self._t0 = now
+        due = int((now - self._t0) * self.fps)
+        if due < self._index:
+            time.sleep(max(self._t0 + self._index / self.fps - now, 0.0))
+            due = self._index
+        if latest_only and due > self._index:
+            self.dropped += due - self._index
+            self._index = due
+        return self._index
+
+    def _due_at(self, index: int) -> float:
+        assert self._t0 is not None
+        return self._t0 + index / self.fps
+
+
+class OpenCVSource(FrameSource):
+    """`cv2.VideoCapture` (GStreamer pipeline or V4L2 device) read straight into the ring.
+
+    Buffer timestamps (`CAP_PROP_POS_MSEC`) are mapped onto the monotonic clock through the
+    smallest offset seen so far. A frame that sat in a queue then shows its real age instead
+    of the time it was dequeued. The fixed sensor-to-host delay of the fastest frame is not
+    included.
+    """
+
+    name = "opencv"
+
+    def __init__(self, cap: Any, name: str, fps: float, buffers: int = 3, channels: int = 3) -> None:
+        import cv2
+
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) or 1280
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) or 720
+        super().__init__(width, height, fps, buffers, channels)
+        self.cap = cap
+        self.name = name
+        self._pos_prop = cv2.CAP_PROP_POS_MSEC
+        self._offset: Optional[float] = None
+        self._last_pts = -1.0
+
+    def read(self) -> Optional[Frame]:
+        ok, img = self.cap.read(self._ring[self._slot])
+        if not ok or img is None:
+            return None
+        return self._emit(img, self._stamp(time.monotonic()))
+
+    def release(self) -> None:
+        self.cap.release()
+
+    def _stamp(self, now: float) -> float:
+        pts = self.cap.get(self._pos_prop) / 1000.0
+        if pts <= self._last_pts:
+            return now  # backend has no usable buffer timestamps
+        self._last_pts = pts
+        offset = now - pts
+        if self._offset is None or offset < self._offset:
+            self._offset = offset
+        return pts + self._offset
+
+
+class FileSource(OpenCVSource):
+    """A recorded video. With `realtime` it plays at `fps` like a live camera."""
+
+    def __init__(
+        self, cap: Any, fps: float, buffers: int = 3, realtime: bool = True, latest_only: bool = True, loop: bool = False
+    ) -> None:
+        super().__init__(cap, "file", fps, buffers)
+        self.realtime = realtime
+        self.latest_only = latest_only
+        self.loop = loop
+        self._position = 0  # frames consumed from the file, including skipped ones
+
+    def read(self) -> Optional[Frame]:
+        if not self.realtime:
+            img = self._next(decode=True)
+            return None if img is None else self._emit(img, time.monotonic())
+        index = self._pace(self.latest_only)
+        while self._position < index:  # frames the reader missed; grab() skips the colour conversion
+            if self._next(decode=False) is None:
+                return None
+        img = self._next(decode=True)
+        if img is None:
+            return None
+        self._index = index + 1
+        return self._emit(img, self._due_at(index))
+
+    def _next(self, decode: bool) -> Optional[np.ndarray]:
+        for attempt in range(2 if self.loop else 1):
+            if attempt:
+                import cv2
+
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            if decode:
+                ok, img = self.cap.read(self._ring[self._slot])
+            else:
+                ok, img = self.cap.grab(), self._ring[self._slot]
+            if ok:
+                self._position += 1
+                return img
+        return None
+
+
+class SyntheticSource(FrameSource):
+    """Generated frames at `fps` with no camera or codec: a textured strip scrolling past.
+
+    Producing a frame is one copy into a ring buffer, like a DMA'd camera frame, so the
+    reader's costs can be measured on any machine.
+    """
+
+    name = "synthetic"
+
+    def __init__(
+        self,
+        width: int = 1280,
+        height: int = 720,
+        fps: float = 30.0,
+        buffers: int = 3,
+        realtime: bool = True,
+        latest_only: bool = True,
+        scroll_px: int = 8,
+        seed: int = 0,
+    ) -> None:
+        super().__init__(width, height, fps, buffers)
+        self.realtime = realtime
+        self.latest_only = latest_only
+        self.scroll_px = int(scroll_px)
+        self._period = max(self.width // 4, 1)
+        rng = np.random.default_rng(seed)
+        strip = rng.integers(40, 120, size=(self.height, self.width + self._period, 3), dtype=np.uint8)
+        strip[..., 1] += 30  # greenish soil, not pure noise
+        self._strip = strip
+
+    def read(self) -> Optional[Frame]:
+        if self.realtime:
+            index = self._pace(self.latest_only)
+            self._index = index + 1
+        else:
+            index = self.frames
+        offset = (index * self.scroll_px) % self._period
+        buf = self._ring[self._slot]
+        np.copyto(buf, self._strip[:, offset : offset + self.width])
+        return self._emit(buf, self._due_at(index) if self.realtime else time.monotonic())
+
+
+def open_source(cfg: Dict[str, Any]) -> FrameSource:
+    """Open the source described by a `load_camera_config` dict; raises `CaptureError`."""
+    source = cfg["source"]
+    buffers = int(cfg.get("buffers", 3))
+    fps = float(cfg["fps"])
+    latest_only = bool(cfg.get("latest_only", True))
+    if source == "synthetic":
+        return SyntheticSource(
+            int(cfg["width"]),
+            int(cfg["height"]),
+            fps,
+            buffers,
+            bool(cfg.get("realtime", True)),
+            latest_only,
+            scroll_px=int(cfg.get("scroll_px", 8)),
+        )
+
+    import cv2
+
+    if source in ("csi", "test"):
+        # BGRx first (no CPU conversion); some OpenCV builds only accept BGR from appsink
+        for bgrx in ((True, False) if cfg.get("zero_copy", True) else (False,)):
+            cap = cv2.VideoCapture(gst_pipeline(cfg, bgrx=bgrx), cv2.CAP_GSTREAMER)
+            ok, probe = cap.read() if cap.isOpened() else (False, None)
+            if ok and probe is not None:
+                return OpenCVSource(cap, source, fps, buffers, channels=probe.shape[2])
+            cap.release()
+        raise CaptureError(f"GStreamer pipeline failed to start: {gst_pipeline(cfg, bgrx=False)}")
+    if source == "usb":
+        cap = cv2.VideoCapture(int(cfg.get("usb_index", 0)))
+        if not cap.isOpened():
+            raise CaptureError(f"USB camera {cfg.get('usb_index', 0)} failed to open")
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, int(cfg["width"]))
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, int(cfg["height"]))
+        cap.set(cv2.CAP_PROP_FPS, fps)
+        if latest_only:
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # V4L2 otherwise queues several frames
+        return OpenCVSource(cap, source, fps, buffers)
+    if source == "file":
+        path = cfg.get("file")
+        if not path or not Path(path).exists():
+            raise CaptureError(f"video file not found: {path}")
+        cap = cv2.VideoCapture(str(path))
+        if not cap.isOpened():
+            raise CaptureError(f"video file failed to open: {path}")
+        file_fps = cap.get(cv2.CAP_PROP_FPS) or fps
+        return FileSource(
+            cap, file_fps, buffers, bool(cfg.get("realtime", True)), latest_only, bool(cfg.get("loop", False))
+        )
+    raise CaptureError(f"unknown camera source {source!r}")
+
+
+def open_camera(path: Optional[Path] = None, **overrides: Any) -> FrameSource:
+    """`open_source(load_camera_config(path, **overrides))`; `None` overrides are ignored."""
+    return open_source(load_camera_config(path, **overrides))
+
+
+__all__ = [
+    "CaptureError",
+    "Frame",
+    "FrameSource",
+    "OpenCVSource",
+    "FileSource",
+    "SyntheticSource",
+    "open_source",
+    "open_camera",
+]
@@ -0,0 +1,261 @@
+"""Inference backends behind one interface: ultralytics (CUDA or CPU), ONNX Runtime CPU, stub.
+
+Every backend takes a BGR frame and returns a single `(N, 6)` float32 array of
+`[x1, y1, x2, y2, conf, cls]` in frame pixels (see `postprocess.DET_COLUMNS`).
+Heavy imports (ultralytics/torch, onnxruntime) happen inside the backend that
+needs them.
+"""
+from __future__ import annotations
+
+import ast
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Sequence, Union
+
+import numpy as np
+
+from .postprocess import decode_yolov8, empty_detections
+from .preprocess import Letterbox
+
+
+Names = Union[Dict[int, str], Sequence[str], str]
+
+
+def parse_names(names: Optional[Names]) -> Dict[int, str]:
+    """Class names as `{id: name}` from a dict, a list, or a comma-separated / repr'd string."""
+    if not names:
+        return {}
+    if isinstance(names, str):
+        text = names.strip()
+        if text[:1] in "{[":
+            try:
+                names = ast.literal_eval(text)
+            except (ValueError, SyntaxError):
+                return {}
+        else:
+            names = [part.strip() for part in text.split(",")]
+    if isinstance(names, dict):
+        return {int(k): str(v) for k, v in names.items()}
+    return {idx: str(name) for idx, name in enumerate(names)}
+
+
+def load_names(path: Optional[str]) -> Dict[int, str]:
+    """Class names from a dataset yaml (`names:`) or an ONNX export's metadata; {} if unavailable."""
+    if not path or not Path(path).is_file():
+        return {}
+    suffix = Path(path).suffix.lower()
+    try:
+        if suffix in (".yaml", ".yml"):
+            import yaml
+
+            with open(path) as fh:
+                return parse_names((yaml.safe_load(fh) or {}).get("names"))
+        if suffix == ".onnx":
+            import onnxruntime as ort
+
+            session = ort.InferenceSession(path, providers=["CPUExecutionProvider"])
+            return parse_names(session.get_modelmeta().custom_metadata_map.get("names"))
+    except ImportError:
+        pass
+    return {}
+
+
+class InferenceBackend:
+    """Base class; subclasses implement `predict`."""
+
+    name = "base"
+
+    def __init__(self, imgsz: int = 640, conf: float = 0.25, iou: float = 0.45, threads: int = 0) -> None:
+        self.imgsz = int(imgsz)
+        self.conf = float(conf)
+        self.iou = float(iou)
+        self.threads = int(threads)  # 0 leaves the library default
+        self.names: Dict[int, str] = {}
+        self.timings: Dict[str, float] = {}
+
+    def predict(self, frame: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def warm_up(self, width: int, height: int, runs: int = 1) -> float:
+        """Run on blank frames so lazy init (CUDA context, JIT, arena allocs) happens up front."""
+        dummy = np.zeros((height, width, 3), dtype=np.uint8)
+        start = time.perf_counter()
+        for _ in range(max(runs, 1)):
+            self.predict(dummy)
+        return time.perf_counter() - start
+
+
+class UltralyticsBackend(InferenceBackend):
+    """`ultralytics.YOLO` (.pt / .engine); `device=None` picks CUDA when available."""
+
+    name = "ultralytics"
+
+    def __init__(self, model_path: str, device: Optional[Any] = None, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        import torch
+        from ultralytics import YOLO
+
+        if self.threads > 0:
+            torch.set_num_threads(self.threads)
+        if device is None or device == "":
+            device = 0 if torch.cuda.is_available() else "cpu"
+        self.device = device
+        self.model = YOLO(model_path)
+        self.names = dict(getattr(self.model, "names", {}) or {})
+
+    def predict(self, frame: np.ndarray) -> np.ndarray:
+        t0 = time.perf_counter()
+        result = self.model.predict(
+            source=frame, device=self.device, imgsz=self.imgsz, conf=self.conf, iou=self.iou, verbose=False
+        )[0]
+        # boxes.data is already (N, 6) xyxy/conf/cls; one device->host copy for the whole frame
+        dets = result.boxes.data.cpu().numpy().astype(np.float32, copy=False)
+        self.timings = {"total_ms": (time.perf_counter() - t0) * 1000.0}
+        return dets
+
+
+class OnnxCpuBackend(InferenceBackend):
+    """ONNX Runtime on the CPU execution provider (e.g. `yolo export format=onnx`)."""
+
+    name = "onnx"
+
+    def __init__(self, model_path: str, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        import onnxruntime as ort
+
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.threads > 0:
+            opts.intra_op_num_threads = self.threads
+            opts.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(model_path, sess_options=opts, providers=["CPUExecutionProvider"])
+        inp = self.session.get_inputs()[0]
+        self.input_name = inp.name
+        if isinstance(inp.shape[-1], int):
+            self.imgsz = int(inp.shape[-1])  # static exports fix the input size
+        self.letterbox = Letterbox(self.imgsz)
+        meta = self.session.get_modelmeta().custom_metadata_map
+        self.names = parse_names(meta.get("names"))
+
+    def predict(self, frame: np.ndarray) -> np.ndarray:
+        t0 = time.perf_counter()
+        blob = self.letterbox(frame)
+        t1 = time.perf_counter()
+        output = self.session.run(None, {self.input_name: blob})[0]
+        t2 = time.perf_counter()
+        dets = self.letterbox.unscale(decode_yolov8(output, self.conf, self.iou, num_classes=len(self.names) or None))
+        t3 = time.perf_counter()
+        self.timings = {
+            "preprocess_ms": (t1 - t0) * 1000.0,
+            "inference_ms": (t2 - t1) * 1000.0,
+            "postprocess_ms": (t3 - t2) * 1000.0,
+            "total_ms": (t3 - t0) * 1000.0,
+        }
+        return dets
+
+
+class StubBackend(InferenceBackend):
+    """No model: returns fixed detections, or decodes a synthetic YOLOv8 head.
+
+    With `detections=None` it still runs the real letterbox and decode/NMS path on a
+    random `(1, 4 + nc, anchors)` tensor, so the non-model CPU cost can be measured on
+    any box. `latency_s` stands in for model time. Class names come from `names`, else
+    from `model_path` (a dataset yaml or an ONNX export), else `class0`, `class1`, ...
+    """
+
+    name = "stub"
+
+    def __init__(
+        self,
+        detections: Optional[np.ndarray] = None,
+        num_classes: Optional[int] = None,
+        latency_s: float = 0.0,
+        seed: int = 0,
+        names: Optional[Names] = None,
+        model_path: Optional[str] = None,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(**kwargs)
+        self.names = parse_names(names) or load_names(model_path)
+        if num_classes is None:
+            num_classes = max(len(self.names), 1)
+        for idx in range(num_classes):
+            self.names.setdefault(idx, f"class{idx}")
+        self.num_classes = num_classes
+        self.latency_s = latency_s
+        self.detections = None if detections is None else np.asarray(detections, dtype=np.float32).reshape(-1, 6)
+        self.letterbox = Letterbox(self.imgsz)
+        anchors = sum((self.imgsz // stride) ** 2 for stride in (8, 16, 32))
+        rng = np.random.default_rng(seed)
+        raw = np.empty((1, 4 + num_classes, anchors), dtype=np.float32)
+        raw[0, 0:2] = rng.uniform(0, self.imgsz, size=(2, anchors))
+        raw[0, 2:4] = rng.uniform(8, 96, size=(2, anchors))
+        raw[0, 4:] = rng.beta(0.3, 12.0, size=(num_classes, anchors))  # mostly low scores, a few hits
+        self._raw = raw
+
+    def predict(self, frame: np.ndarray) -> np.ndarray:
+        t0 = time.perf_counter()
+        self.letterbox(frame)
+        t1 = time.perf_counter()
+        if self.latency_s > 0:
+            time.sleep(self.latency_s)
+        t2 = time.perf_counter()
+        if self.detections is not None:
+            dets = self.detections.copy()
+        else:
+            dets = self.letterbox.unscale(decode_yolov8(self._raw, self.conf, self.iou, num_classes=self.num_classes))
+        t3 = time.perf_counter()
+        self.timings = {
+            "preprocess_ms": (t1 - t0) * 1000.0,
+            "inference_ms": (t2 - t1) * 1000.0,
+            "postprocess_ms": (t3 - t2) * 1000.0,
+            "total_ms": (t3 - t0) * 1000.0,
+        }
+        return dets
+
+
+BACKENDS: Dict[str, Callable[..., InferenceBackend]] = {
+    "ultralytics": UltralyticsBackend,
+    "onnx": OnnxCpuBackend,
+    "stub": StubBackend,
+}
+
+
+def create_backend(name: str, model_path: Optional[str] = None, **kwargs: Any) -> InferenceBackend:
+    """Instantiate a backend by name (`ultralytics`, `onnx`, `stub`)."""
+    try:
+        factory = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown inference backend {name!r}; choose from {', '.join(BACKENDS)}") from None
+    names = kwargs.pop("names", None)  # only the stub takes names; real models carry their own
+    if name == "stub":
+        kwargs.pop("device", None)
+        return factory(names=names, model_path=model_path, **kwargs)
+    if name == "onnx":
+        kwargs.pop("device", None)
+    if not model_path:
+        raise ValueError(f"Backend {name!r} needs a model path")
+    return factory(model_path, **kwargs)
+
+
+def create_backend_async(name: str, model_path: Optional[str] = None, **kwargs: Any) -> "Future[InferenceBackend]":
+    """Build the backend on a worker thread so camera/serial setup can overlap the model load."""
+    pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="backend-load")
+    future = pool.submit(create_backend, name, model_path, **kwargs)
+    pool.shutdown(wait=False)
+    return future
+
+
+__all__ = [
+    "InferenceBackend",
+    "UltralyticsBackend",
+    "OnnxCpuBackend",
+    "StubBackend",
+    "BACKENDS",
+    "create_backend",
+    "create_backend_async",
+    "empty_detections",
+    "load_names",
+    "parse_names",
+]
@@ -0,0 +1,81 @@
+"""CPU frames-per-second benchmark for the inference backends.
+
+    python -m vision.detection.bench --backend stub
+    python -m vision.detection.bench --backend onnx --model vision/models/best.onnx --threads 4
+    python -m vision.detection.bench --backend ultralytics --model vision/models/best.pt --device cpu
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from .backends import BACKENDS, create_backend
+
+
+def run_benchmark(backend, width: int, height: int, frames: int, warmup: int, seed: int = 0) -> Dict:
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(0, 255, size=(height, width, 3), dtype=np.uint8)
+    backend.warm_up(width, height, runs=warmup)
+    stages: Dict[str, List[float]] = {}
+    counts: List[int] = []
+    start = time.perf_counter()
+    for _ in range(frames):
+        dets = backend.predict(frame)
+        counts.append(len(dets))
+        for key, value in backend.timings.items():
+            stages.setdefault(key, []).append(value)
+    elapsed = time.perf_counter() - start
+    return {
+        "backend": backend.name,
+        "frames": frames,
+        "resolution": f"{width}x{height}",
+        "imgsz": backend.imgsz,
+        "threads": backend.threads,
+        "fps": frames / elapsed if elapsed > 0 else 0.0,
+        "mean_detections": statistics.fmean(counts) if counts else 0.0,
+        "stages_ms": {key: round(statistics.median(vals), 3) for key, vals in stages.items()},
+    }
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--backend", choices=sorted(BACKENDS), default="stub")
+    p.add_argument("--model", type=str, default=None)
+    p.add_argument("--device", type=str, default="cpu", help="ultralytics device (cpu, 0, ...)")
+    p.add_argument("--threads", type=int, default=0, help="Intra-op threads (0 = library default)")
+    p.add_argument("--imgsz", type=int, default=640)
+    p.add_argument("--conf", type=float, default=0.25)
+    p.add_argument("--width", type=int, default=1280)
+    p.add_argument("--height", type=int, default=720)
+    p.add_argument("--frames", type=int, default=100)
+    p.add_argument("--warmup", type=int, default=3)
+    p.add_argument("--json", action="store_true", help="Print the result as JSON")
+    args = p.parse_args()
+
+    backend = create_backend(
+        args.backend,
+        args.model,
+        imgsz=args.imgsz,
+        conf=args.conf,
+        threads=args.threads,
+        device=args.device,
+    )
+    result = run_benchmark(backend, args.width, args.height, args.frames, args.warmup)
+    if args.json:
+        print(json.dumps(result))
+        return
+    stages = " ".join(f"{k}={v:.2f}" for k, v in result["stages_ms"].items())
+    print(
+        f"{result['backend']}: {result['fps']:.1f} FPS over {result['frames']} frames "
+        f"({result['resolution']} -> {result['imgsz']}, threads={result['threads']}, "
+        f"~{result['mean_detections']:.1f} dets/frame) | median {stages}"
+    )
+
+
+if __name__ == "__main__":
+    main()
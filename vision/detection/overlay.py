@@ -0,0 +1,270 @@
+"""Draw `(N, 6)` detection arrays onto BGR frames, lazily and off the control path.
+
+`draw_detections` replaces ultralytics `Results.plot`. `OverlayRenderer` takes the raw
+frame plus detection array from the inference loop (a reference swap, no drawing) and
+only renders/encodes JPEGs on its own thread while at least one stream subscriber is
+connected, at the fastest rate and largest scale any subscriber asked for. Frames that
+live in a reused capture buffer are published with `copy=True`; they are copied into the
+renderer's own buffers, and only while someone is watching.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+BOX_COLOR = (0, 255, 0)
+TEXT_COLOR = (0, 0, 0)
+
+# draw(image, dets, meta, scale): dets are already scaled to `image`; meta is whatever was published
+DrawFn = Callable[[np.ndarray, np.ndarray, Dict[str, Any], float], None]
+
+
+def draw_detections(
+    image: np.ndarray,
+    dets: np.ndarray,
+    names: Optional[Dict[int, str]] = None,
+    thickness: int = 2,
+) -> np.ndarray:
+    """Draw boxes and `name conf` labels in place; returns `image` for chaining."""
+    names = names or {}
+    for x1, y1, x2, y2, conf, cls in dets.tolist():
+        p1 = (int(x1), int(y1))
+        cv2.rectangle(image, p1, (int(x2), int(y2)), BOX_COLOR, thickness)
+        label = f"{names.get(int(cls), int(cls))} {conf:.2f}"
+        (tw, th), base = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
+        top = max(p1[1] - th - base, 0)
+        cv2.rectangle(image, (p1[0], top), (p1[0] + tw, top + th + base), BOX_COLOR, -1)
+        cv2.putText(image, label, (p1[0], top + th), cv2.FONT_HERSHEY_SIMPLEX, 0.5, TEXT_COLOR, 1, cv2.LINE_AA)
+    return image
+
+
+class Subscription:
+    """One `/video` client; iterate for JPEG bytes paced to `fps`. Use as a context manager."""
+
+    def __init__(self, renderer: "OverlayRenderer", fps: float, scale: float) -> None:
+        self.renderer = renderer
+        self.fps = fps
+        self.scale = scale
+        self.start_seq = 0  # JPEGs rendered before we joined may be stale
+
+    @property
+    def interval_s(self) -> float:
+        return 1.0 / self.fps if self.fps > 0 else 0.0
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.renderer._unsubscribe(self)
+
+    def __iter__(self) -> Iterator[bytes]:
+        seq = self.start_seq
+        next_at = 0.0
+        while not self.renderer.closed:
+            delay = next_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            jpeg, seq_new = self.renderer.wait_jpeg(seq, timeout=1.0)
+            if jpeg is None:
+                continue
+            seq = seq_new
+            next_at = time.monotonic() + self.interval_s
+            yield jpeg
+
+
+class OverlayRenderer:
+    """Render + JPEG-encode published frames on a worker, only while someone is watching."""
+
+    def __init__(
+        self,
+        draw: Optional[DrawFn] = None,
+        names: Optional[Dict[int, str]] = None,
+        default_fps: float = 15.0,
+        max_fps: float = 30.0,
+        jpeg_quality: int = 75,
+    ) -> None:
+        self.names = names or {}
+        self.draw = draw or self._default_draw
+        self.default_fps = default_fps
+        self.max_fps = max_fps
+        self.jpeg_quality = int(jpeg_quality)
+        self.closed = False
+        self.stats: Dict[str, int] = {"published": 0, "rendered": 0, "render_errors": 0}
+        self._cond = threading.Condition()
+        self._subs: List[Subscription] = []
+        self._latest: Optional[Tuple[np.ndarray, np.ndarray, Dict[str, Any]]] = None
+        # publish(copy=True): three reused frames, so one can be rendered, one hold the
+        # latest publish and one take the next copy
+        self._bufs: List[np.ndarray] = []
+        self._latest_buf: Optional[int] = None
+        self._rendering_buf: Optional[int] = None
+        self._published_seq = 0
+        self._rendered_src_seq = 0
+        self._jpeg: Optional[bytes] = None
+        self._jpeg_seq = 0
+        self._render_ms = 0.0
+        self._worker = threading.Thread(target=self._run, name="overlay-render", daemon=True)
+        self._worker.start()
+
+    def publish(
+        self, frame: np.ndarray, dets: np.ndarray, meta: Optional[Dict[str, Any]] = None, copy: bool = False
+    ) -> None:
+        """Hand over the raw frame and detections; never draws.
+
+        Without `copy` the caller must not mutate them afterwards. With `copy` the frame is
+        copied into a reused buffer (nothing is kept while there are no subscribers), so a
+        capture ring may overwrite its buffer as soon as this returns.
+        """
+        if copy:
+            with self._cond:
+                if not self._subs:
+                    self._latest, self._latest_buf = None, None
+                    self._published_seq += 1
+                    self.stats["published"] += 1
+                    return
+                idx = self._free_buffer_locked(frame)
+            np.copyto(self._bufs[idx], frame)  # the worker never reads a buffer that is neither latest nor rendering
+            frame = self._bufs[idx]
+        with self._cond:
+            self._latest = (frame, dets, meta or {})
+            self._latest_buf = idx if copy else None
+            self._published_seq += 1
+            self.stats["published"] += 1
+            if self._subs:
+                self._cond.notify_all()
+
+    @property
+    def active(self) -> bool:
+        return bool(self._subs)
+
+    def subscribe(self, fps: Optional[float] = None, scale: float = 1.0) -> Subscription:
+        fps = self.default_fps if fps is None else fps
+        sub = Subscription(self, fps=min(max(float(fps), 0.1), self.max_fps), scale=min(max(float(scale), 0.05), 1.0))
+        with self._cond:
+            sub.start_seq = self._jpeg_seq
+            self._subs.append(sub)
+            self._cond.notify_all()
+        return sub
+
+    def wait_jpeg(self, after_seq: int, timeout: float = 1.0) -> Tuple[Optional[bytes], int]:
+        """Block until a JPEG newer than `after_seq` exists; returns `(jpeg, seq)` or `(None, after_seq)`."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._jpeg_seq <= after_seq and not self.closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None, after_seq
+                self._cond.wait(remaining)
+            return self._jpeg, self._jpeg_seq
+
+    def snapshot(self, scale: float = 1.0) -> Optional[np.ndarray]:
+        """Render the latest published frame on the caller's thread (for one-off grabs)."""
+        with self._cond:
+            latest = self._latest
+            if latest is not None and self._latest_buf is not None:
+                return self._render(latest, scale)  # under the lock: publish must not reuse its buffer
+        if latest is None:
+            return None
+        return self._render(latest, scale)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._cond:
+            out: Dict[str, Any] = dict(self.stats)
+            out["subscribers"] = len(self._subs)
+            out["fps"] = self._target_fps_locked()
+            out["scale"] = self._target_scale_locked()
+            out["render_ms"] = round(self._render_ms, 2)
+        return out
+
+    def close(self) -> None:
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+        self._worker.join(timeout=2.0)
+
+    def _unsubscribe(self, sub: Subscription) -> None:
+        with self._cond:
+            if sub in self._subs:
+                self._subs.remove(sub)
+
+    def _free_buffer_locked(self, frame: np.ndarray) -> int:
+        if not self._bufs or self._bufs[0].shape != frame.shape or self._bufs[0].dtype != frame.dtype:
+            # fresh arrays, so a render still reading an old one is unaffected
+            self._bufs = [np.empty(frame.shape, dtype=frame.dtype) for _ in range(3)]
+            self._latest, self._latest_buf, self._rendering_buf = None, None, None
+        busy = (self._latest_buf, self._rendering_buf)
+        return next(idx for idx in range(len(self._bufs)) if idx not in busy)
+
+    def _target_fps_locked(self) -> float:
+        return max((s.fps for s in self._subs), default=0.0)
+
+    def _target_scale_locked(self) -> float:
+        return max((s.scale for s in self._subs), default=0.0)
+
+    def _default_draw(self, image: np.ndarray, dets: np.ndarray, meta: Dict[str, Any], scale: float) -> None:
+        draw_detections(image, dets, self.names)
+
+    def _render(self, latest: Tuple[np.ndarray, np.ndarray, Dict[str, Any]], scale: float) -> np.ndarray:
+        frame, dets, meta = latest
+        if scale < 1.0:
+            height, width = frame.shape[:2]
+            size = (max(1, int(width * scale)), max(1, int(height * scale)))
+            image = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+            dets = dets.copy()
+            dets[:, :4] *= scale
+        else:
+            image = frame.copy()  # the published frame stays untouched
+        self.draw(image, dets, meta, scale)
+        return image
+
+    def _run(self) -> None:
+        next_at = 0.0
+        while True:
+            with self._cond:
+                while not self.closed and (not self._subs or self._published_seq == self._rendered_src_seq):
+                    self._cond.wait(0.5)
+                if self.closed:
+                    return
+                latest = self._latest
+                src_seq = self._published_seq
+                fps = self._target_fps_locked()
+                scale = self._target_scale_locked()
+            delay = next_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)  # newer frames published meanwhile are picked up next pass
+                continue
+            with self._cond:
+                if latest is not self._latest:
+                    continue  # replaced while we slept; its buffer may be reused already
+                if latest is None:
+                    self._rendered_src_seq = src_seq
+                    continue
+                self._rendering_buf = self._latest_buf
+            t0 = time.perf_counter()
+            try:
+                image = self._render(latest, scale)
+                ok, buf = cv2.imencode(".jpg", image, [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality])
+            except Exception:  # pragma: no cover - a bad draw callback must not kill the stream
+                ok = False
+                self.stats["render_errors"] += 1
+            elapsed_ms = (time.perf_counter() - t0) * 1000.0
+            next_at = time.monotonic() + (1.0 / fps if fps > 0 else 0.0)
+            with self._cond:
+                self._rendering_buf = None
+                self._rendered_src_seq = src_seq
+                self._render_ms = elapsed_ms
+                if ok:
+                    self._jpeg = buf.tobytes()
+                    self._jpeg_seq += 1
+                    self.stats["rendered"] += 1
+                    self._cond.notify_all()
+
+
+__all__ = ["draw_detections", "DrawFn", "OverlayRenderer", "Subscription"]
@@ -0,0 +1,120 @@
+"""Vectorised YOLO output decoding and NMS producing a single (N, 6) array.
+
+Rows are `[x1, y1, x2, y2, conf, cls]` in pixels, float32.
+"""
+from __future__ import annotations
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+DET_COLUMNS = ("x1", "y1", "x2", "y2", "conf", "cls")
+_MAX_WH = 7680.0  # class offset for batched per-class NMS
+
+
+def empty_detections() -> np.ndarray:
+    return np.zeros((0, 6), dtype=np.float32)
+
+
+def box_iou(box: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+    """IoU of one xyxy box against an (M, 4) array."""
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[2], boxes[:, 2])
+    y2 = np.minimum(box[3], boxes[:, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return inter / np.maximum(area + areas - inter, 1e-9)
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_thres: float, max_det: int = 300) -> np.ndarray:
+    """Greedy NMS; each pass suppresses against all remaining boxes at once. Returns kept indices."""
+    order = np.argsort(-scores, kind="stable")
+    keep = []
+    while order.size and len(keep) < max_det:
+        best = order[0]
+        keep.append(best)
+        if order.size == 1:
+            break
+        rest = order[1:]
+        order = rest[box_iou(boxes[best], boxes[rest]) <= iou_thres]
+    return np.asarray(keep, dtype=np.intp)
+
+
+def decode_yolov8(
+    output: np.ndarray,
+    conf_thres: float = 0.25,
+    iou_thres: float = 0.45,
+    max_det: int = 300,
+    num_classes: Optional[int] = None,
+) -> np.ndarray:
+    """Decode a raw YOLOv8 head `(1, 4 + nc, anchors)` into `(N, 6)` input-space detections.
+
+    Outputs already reduced to `(1, N, 6)` (end-to-end/NMS exports) pass straight through.
+    With `num_classes` the layout is read from the known `4 + nc` channel count; without
+    it the shorter axis is taken as channels, and a square output as channel-first.
+    """
+    pred = np.asarray(output)
+    if pred.ndim == 3:
+        pred = pred[0]
+    if pred.ndim != 2:
+        raise ValueError(f"Unexpected YOLO output shape {np.shape(output)}")
+    channels = 4 + num_classes if num_classes else None
+    if channels is not None and pred.shape[0] == channels:
+        channel_first = True
+    elif pred.shape[1] == 6 and (channels is not None or pred.shape[0] != 6):
+        dets = pred[pred[:, 4] >= conf_thres].astype(np.float32, copy=True)
+        return dets[:max_det]
+    elif channels is not None:
+        channel_first = False
+    else:
+        channel_first = pred.shape[0] <= pred.shape[1]
+    if channel_first:
+        pred = pred.T  # (anchors, 4 + nc)
+    scores_all = pred[:, 4:]
+    cls = scores_all.argmax(axis=1)
+    conf = scores_all[np.arange(pred.shape[0]), cls]
+    mask = conf >= conf_thres
+    if not mask.any():
+        return empty_detections()
+    xywh = pred[mask, :4]
+    conf = conf[mask]
+    cls = cls[mask]
+    boxes = np.empty_like(xywh, dtype=np.float32)
+    half_w = xywh[:, 2] / 2.0
+    half_h = xywh[:, 3] / 2.0
+    boxes[:, 0] = xywh[:, 0] - half_w
+    boxes[:, 1] = xywh[:, 1] - half_h
+    boxes[:, 2] = xywh[:, 0] + half_w
+    boxes[:, 3] = xywh[:, 1] + half_h
+    keep = nms(boxes + (cls[:, None] * _MAX_WH), conf, iou_thres, max_det)
+    dets = np.empty((keep.size, 6), dtype=np.float32)
+    dets[:, :4] = boxes[keep]
+    dets[:, 4] = conf[keep]
+    dets[:, 5] = cls[keep]
+    return dets
+
+
+def best_detection(
+    dets: np.ndarray,
+    names: Dict[int, str],
+    target_name: Optional[str],
+    conf_min: float,
+) -> Optional[Tuple[float, float, float]]:
+    """Highest-confidence detection of `target_name` (any class if unset) as `(u, v, conf)`."""
+    if dets.size == 0:
+        return None
+    mask = dets[:, 4] >= conf_min
+    if target_name:
+        ids = [idx for idx, name in names.items() if name == target_name]
+        if ids:
+            mask &= np.isin(dets[:, 5].astype(np.intp), ids)
+    if not mask.any():
+        return None
+    cand = dets[mask]
+    row = cand[int(cand[:, 4].argmax())]
+    return float((row[0] + row[2]) / 2.0), float((row[1] + row[3]) / 2.0), float(row[4])
+
+
+__all__ = ["DET_COLUMNS", "empty_detections", "box_iou", "nms", "decode_yolov8", "best_detection"]
@@ -0,0 +1,80 @@
+"""Letterbox preprocessing into reusable buffers."""
+from __future__ import annotations
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+try:
+    import cv2  # type: ignore
+except ImportError:  # pragma: no cover - numpy nearest-neighbour fallback below
+    cv2 = None
+
+
+class Letterbox:
+    """Resize + pad frames to a square network input without per-frame allocations.
+
+    The canvas, resize buffer and float32 NCHW blob are allocated once per source
+    resolution and reused for every frame; `unscale` maps boxes back to the source.
+    """
+
+    def __init__(self, imgsz: int = 640, pad_value: int = 114) -> None:
+        self.imgsz = int(imgsz)
+        self.pad_value = pad_value
+        self.canvas = np.full((self.imgsz, self.imgsz, 3), pad_value, dtype=np.uint8)
+        self.blob = np.empty((1, 3, self.imgsz, self.imgsz), dtype=np.float32)
+        self.scale = 1.0
+        self.pad: Tuple[int, int] = (0, 0)
+        self._src_shape: Optional[Tuple[int, int]] = None
+        self._resized: Optional[np.ndarray] = None
+        self._rows: Optional[np.ndarray] = None
+        self._cols: Optional[np.ndarray] = None
+
+    def _configure(self, height: int, width: int) -> None:
+        self.scale = min(self.imgsz / height, self.imgsz / width)
+        new_w = max(1, int(round(width * self.scale)))
+        new_h = max(1, int(round(height * self.scale)))
+        dx = (self.imgsz - new_w) // 2
+        dy = (self.imgsz - new_h) // 2
+        self.pad = (dx, dy)
+        self.canvas.fill(self.pad_value)
+        self._resized = np.empty((new_h, new_w, 3), dtype=np.uint8)
+        # nearest-neighbour source indices for the numpy path
+        self._rows = np.minimum((np.arange(new_h) / self.scale).astype(np.intp), height - 1)
+        self._cols = np.minimum((np.arange(new_w) / self.scale).astype(np.intp), width - 1)
+        self._src_shape = (height, width)
+
+    def __call__(self, frame: np.ndarray) -> np.ndarray:
+        """Return the shared (1, 3, imgsz, imgsz) float32 RGB blob for `frame` (BGR, HxWx3)."""
+        height, width = frame.shape[:2]
+        if self._src_shape != (height, width):
+            self._configure(height, width)
+        assert self._resized is not None
+        new_h, new_w = self._resized.shape[:2]
+        dx, dy = self.pad
+        if cv2 is not None:
+            cv2.resize(frame, (new_w, new_h), dst=self._resized, interpolation=cv2.INTER_LINEAR)
+        else:
+            np.take(frame[self._rows], self._cols, axis=1, out=self._resized)
+        self.canvas[dy : dy + new_h, dx : dx + new_w] = self._resized
+        # BGR HWC uint8 -> RGB CHW float32 in [0, 1], straight into the reused blob
+        np.multiply(self.canvas[..., ::-1].transpose(2, 0, 1), 1.0 / 255.0, out=self.blob[0])
+        return self.blob
+
+    def unscale(self, dets: np.ndarray) -> np.ndarray:
+        """Map (N, >=4) xyxy boxes from network input space back to the source frame, in place."""
+        if dets.size == 0 or self._src_shape is None:
+            return dets
+        dx, dy = self.pad
+        xs = dets[:, 0:4:2]  # x1, x2 (views, so the updates land in `dets`)
+        ys = dets[:, 1:4:2]  # y1, y2
+        xs -= dx
+        ys -= dy
+        dets[:, :4] /= self.scale
+        height, width = self._src_shape
+        np.clip(xs, 0, width, out=xs)
+        np.clip(ys, 0, height, out=ys)
+        return dets
+
+
+__all__ = ["Letterbox"]
@@ -0,0 +1,84 @@
+"""Vectorised conversion of `(N, 6)` detection arrays into the JSONL log format.
+
+Each log line is `{"ts": <epoch s>, "det": [[u, v, w, h, cls, conf], ...]}`, one row per
+box in `RECORD_KEYS` order. Centres and sizes are computed for the whole frame at once and
+the float32 array is serialised as is (`orjson` with numpy support when installed), so the
+inference loop builds no per-detection objects. `decode_line` expands rows into the
+`"detections": [{"u", "v", "w", "h", "cls", "conf"}, ...]` form the runtime reads (see
+docs/IK_PIPELINE.md), which is also what `encode_frame(..., compact=False)` writes.
+"""
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, List
+
+import numpy as np
+
+try:
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover - stdlib json fallback
+    orjson = None
+
+RECORD_KEYS = ("u", "v", "w", "h", "cls", "conf")
+COMPACT_KEY = "det"
+
+
+def detection_fields(dets: np.ndarray, dtype: Any = np.float64) -> np.ndarray:
+    """`(N, 6)` xyxy/conf/cls -> `(N, 6)` columns in `RECORD_KEYS` order."""
+    dets = np.asarray(dets, dtype=dtype).reshape(-1, 6)
+    out = np.empty_like(dets)
+    np.add(dets[:, 0], dets[:, 2], out=out[:, 0])
+    np.add(dets[:, 1], dets[:, 3], out=out[:, 1])
+    out[:, 0:2] *= 0.5
+    np.subtract(dets[:, 2], dets[:, 0], out=out[:, 2])
+    np.subtract(dets[:, 3], dets[:, 1], out=out[:, 3])
+    out[:, 4] = dets[:, 5]
+    out[:, 5] = dets[:, 4]
+    return out
+
+
+def to_records(dets: np.ndarray) -> List[Dict[str, Any]]:
+    """Per-detection dicts for the log; one host conversion for the whole frame."""
+    fields = detection_fields(dets)
+    if not len(fields):
+        return []
+    u, v, w, h, cls, conf = fields.T.tolist()
+    cls_int = [int(c) for c in cls]
+    return [
+        {"u": a, "v": b, "w": c, "h": d, "cls": e, "conf": f}
+        for a, b, c, d, e, f in zip(u, v, w, h, cls_int, conf)
+    ]
+
+
+def encode_frame(ts: float, dets: np.ndarray, compact: bool = True) -> bytes:
+    """Serialise one frame as a newline-terminated JSONL record (row form unless `compact=False`)."""
+    if not compact:
+        payload: Dict[str, Any] = {"ts": ts, "detections": to_records(dets)}
+    elif orjson is not None:
+        payload = {"ts": ts, COMPACT_KEY: detection_fields(dets, np.float32)}
+        return orjson.dumps(payload, option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_SERIALIZE_NUMPY)
+    else:
+        payload = {"ts": ts, COMPACT_KEY: detection_fields(dets, np.float32).tolist()}
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(payload, separators=(",", ":")) + "\n").encode()
+
+
+def decode_line(line: str | bytes) -> Dict[str, Any]:
+    """Parse one log line (either form) into the `"detections"` dict form.
+
+    Raises `json.JSONDecodeError` on malformed input.
+    """
+    if orjson is not None:
+        entry = orjson.loads(line)  # orjson.JSONDecodeError subclasses json.JSONDecodeError
+    else:
+        entry = json.loads(line)
+    rows = entry.pop(COMPACT_KEY, None) if isinstance(entry, dict) else None
+    if rows is not None:
+        entry["detections"] = [
+            {"u": u, "v": v, "w": w, "h": h, "cls": int(cls), "conf": conf} for u, v, w, h, cls, conf in rows
+        ]
+    return entry
+
+
+__all__ = ["RECORD_KEYS", "COMPACT_KEY", "detection_fields", "to_records", "encode_frame", "decode_line"]
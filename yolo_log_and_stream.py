@@ -1,81 +1,112 @@
 # YOLO on CSI/USB, log pixel coords to JSONL, and stream annotated frames over HTTP (MJPEG).
-# Env: MODEL=/path/best.pt | CAM=csi|usb | SENSOR_ID=0 | IMGSZ=640 | CONF=0.25 | LOG=./detections.log | PORT=8080
-import os, time, json, threading
-import cv2
-from ultralytics import YOLO
-from flask import Flask, Response
+# Env: MODEL=/path/best.pt | CAM=csi|usb|test|file|synthetic | SENSOR_ID=0 | IMGSZ=640 | CONF=0.25 | LOG=./detections.log | PORT=8080
+#      CAMERA_CONFIG=configs/camera.yaml (resolution, fps, pipeline tuning; CAM/SENSOR_ID override it)
+#      WARMUP=1 (dummy inferences before the camera loop; 0 disables)
+#      BACKEND=ultralytics|onnx|stub | DEVICE=cpu|0 (ultralytics; default CUDA if present) | THREADS=0 (CPU threads, 0 = default)
+#      NAMES=weed,crop (stub only: class names; otherwise read from MODEL when it is a dataset yaml or .onnx)
+#      STREAM_FPS=15 | STREAM_SCALE=1.0 (defaults for /video; clients may pass ?fps=&scale=)
+#      field recording: camera.yaml "recording" block; GET /record saves the pre-trigger ring as a clip
+#      change gate: camera.yaml "change_gate" block skips inference on unchanged frames; GET /gate for its counters
+import os, time, threading
+_LAUNCH_T0 = time.perf_counter()
+from common.startup import StartupTimer
+from vision.capture.gate import ChangeGate
+from vision.capture.pipeline import CAMERA_CONFIG, load_camera_config
+from vision.capture.recorder import FrameRecorder
+from vision.capture.sources import CaptureError, open_source
+from vision.detection.backends import create_backend_async
+from vision.detection.overlay import OverlayRenderer
+from vision.detection.records import encode_frame
+
+timer = StartupTimer(label="yolo", t0=_LAUNCH_T0)
 
 MODEL = os.environ.get("MODEL", "best.pt")
-CAM   = os.environ.get("CAM", "csi")          # "csi" or "usb"
+CAM   = os.environ.get("CAM", "csi")          # see configs/camera.yaml "source"
 SENS  = int(os.environ.get("SENSOR_ID", "0")) # CSI slot index
 IMGSZ = int(os.environ.get("IMGSZ", "640"))
 CONF  = float(os.environ.get("CONF", "0.25"))
 LOG   = os.path.abspath(os.environ.get("LOG", "./detections.log"))
 PORT  = int(os.environ.get("PORT", "8080"))
+WARMUP = int(os.environ.get("WARMUP", "1"))      # dummy inferences before the camera loop
+BACKEND = os.environ.get("BACKEND", "ultralytics")
+DEVICE = os.environ.get("DEVICE") or None
+THREADS = int(os.environ.get("THREADS", "0"))
+NAMES = os.environ.get("NAMES") or None
+STREAM_FPS = float(os.environ.get("STREAM_FPS", "15"))
+STREAM_SCALE = float(os.environ.get("STREAM_SCALE", "1.0"))
+CAMERA_CFG = os.environ.get("CAMERA_CONFIG", str(CAMERA_CONFIG))
 
-def csi_gst(width=1280, height=720, fps=30):
-    # Use sensor-id (some boards have multiple CSI lanes)
-    return (
-        f"nvarguscamerasrc sensor-id={SENS} ! "
-        f"video/x-raw(memory:NVMM), width={width}, height={height}, framerate={fps}/1, format=NV12 ! "
-        f"nvvidconv ! video/x-raw, format=BGRx ! "
-        f"videoconvert ! video/x-raw, format=BGR ! appsink"
-    )
-
-# Open camera via OpenCV
-cap = cv2.VideoCapture(
-    0 if CAM != "csi" else csi_gst(),
-    cv2.CAP_GSTREAMER if CAM == "csi" else 0
+# backend import + weight load overlap with camera bring-up below
+model_future = create_backend_async(
+    BACKEND, MODEL, imgsz=IMGSZ, conf=CONF, threads=THREADS, device=DEVICE, names=NAMES
 )
-if not cap.isOpened():
-    raise SystemExit("Camera open failed (check CAM=csi|usb, SENSOR_ID, and that no other process holds CSI).")
 
-model = YOLO(MODEL)
+import cv2
+from flask import Flask, Response, request
+timer.mark("imports")
+
+# latest-frame appsink, BGRx without CPU conversion where OpenCV allows it (vision/capture)
+camera_cfg = load_camera_config(CAMERA_CFG, source=CAM, sensor_id=SENS)
+try:
+    cam = open_source(camera_cfg)
+except CaptureError as exc:
+    raise SystemExit(f"Camera open failed ({exc}); check CAM, SENSOR_ID, and that no other process holds CSI.")
+timer.mark("camera")
+
+model = model_future.result()
+timer.mark("model")
+if WARMUP > 0:
+    model.warm_up(cam.width, cam.height, runs=WARMUP)
+    timer.mark("warmup")
+
+def draw_overlay(image, boxes, meta, scale):
+    pix = boxes[:, :4].astype(int)
+    centres = (pix[:, :2] + pix[:, 2:]) // 2
+    for (x1, y1, x2, y2), (u, v) in zip(pix.tolist(), centres.tolist()):
+        cv2.rectangle(image, (x1, y1), (x2, y2), (0,255,0), 2)
+        cv2.circle(image, (u, v), 4, (0,0,255), -1)
 
-last_frame = None
-last_lock  = threading.Lock()
+# overlays are drawn on the renderer's thread, and only while /video has viewers
+overlay = OverlayRenderer(draw=draw_overlay, default_fps=STREAM_FPS, jpeg_quality=70)
+recorder = FrameRecorder.from_config(camera_cfg["recording"])  # None unless recording is enabled
+gate = ChangeGate.from_config(camera_cfg["change_gate"])  # None unless change_gate is enabled
 stop_flag  = False
 
 def infer_and_log():
-    global last_frame, stop_flag
-    with open(LOG, "a") as f:
+    first_frame = True
+    boxes = None
+    with open(LOG, "ab") as f:
         while not stop_flag:
-            ok, frame = cap.read()
-            if not ok:
+            frame = cam.read()
+            if frame is None:
                 time.sleep(0.02); continue
 
-            # YOLO inference
-            res = model.predict(source=frame, imgsz=IMGSZ, conf=CONF, verbose=False)
-            dets = []
-            if len(res):
-                for b in res[0].boxes:
-                    x1,y1,x2,y2 = map(float, b.xyxy[0])
-                    u = (x1 + x2) / 2.0
-                    v = (y1 + y2) / 2.0
-                    dets.append({
-                        "u": u, "v": v,
-                        "w": x2-x1, "h": y2-y1,
-                        "cls": int(b.cls[0]) if hasattr(b,'cls') else -1,
-                        "conf": float(b.conf[0]) if hasattr(b,'conf') else 0.0
-                    })
-                    # draw overlays for the stream
-                    cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), (0,255,0), 2)
-                    cv2.circle(frame, (int(u), int(v)), 4, (0,0,255), -1)
-
-            # append JSONL
-            f.write(json.dumps({"ts": time.time(), "detections": dets}) + "\n")
+            # YOLO inference -> (N, 6) [x1, y1, x2, y2, conf, cls]; an unchanged scene reuses the last boxes
+            if gate is None or gate.check(frame.image):
+                boxes = model.predict(frame.image)
+
+            # append JSONL (centres/sizes computed for the whole frame, one write),
+            # stamped with when the pixels were captured
+            captured = time.time() - frame.age()
+            f.write(encode_frame(captured, boxes))
             f.flush()
+            if recorder is not None:
+                recorder.push(frame.image, boxes, captured)  # a copy into the pool; disk I/O is on its thread
+
+            if first_frame:
+                first_frame = False
+                timer.mark("first_frame")
+                print(timer.report(), flush=True)
 
-            # publish frame for HTTP stream
-            with last_lock:
-                last_frame = frame
+            # publish raw frame + boxes for the HTTP stream (no drawing here); frame.image is
+            # a capture-ring buffer, so the renderer takes a copy while anyone is watching
+            overlay.publish(frame.image, boxes, copy=True)
 
 # start worker thread
 t = threading.Thread(target=infer_and_log, daemon=True)
 t.start()
 
 # Minimal Flask app for MJPEG
-from flask import Flask
 app = Flask(__name__)
 
 @app.route("/")
@@ -84,22 +115,37 @@ def root():
 
 @app.route("/video")
 def video():
+    fps = request.args.get("fps", type=float)
+    scale = request.args.get("scale", default=STREAM_SCALE, type=float)
     def gen():
-        while True:
-            with last_lock:
-                frm = None if last_frame is None else last_frame.copy()
-            if frm is None:
-                time.sleep(0.02); continue
-            ok, jpg = cv2.imencode(".jpg", frm, [int(cv2.IMWRITE_JPEG_QUALITY), 70])
-            if not ok:
-                continue
-            yield (b"--frame\r\nContent-Type: image/jpeg\r\n\r\n" + bytearray(jpg) + b"\r\n")
+        with overlay.subscribe(fps=fps, scale=scale) as sub:
+            for jpg in sub:
+                yield (b"--frame\r\nContent-Type: image/jpeg\r\n\r\n" + jpg + b"\r\n")
     return Response(gen(), mimetype="multipart/x-mixed-replace; boundary=frame")
 
+@app.route("/gate")
+def gate_stats():
+    if gate is None:
+        return {"error": "change gate disabled (camera.yaml change_gate.enabled)"}, 409
+    return gate.summary()
+
+@app.route("/record")
+def record():
+    if recorder is None:
+        return {"error": "recording disabled (camera.yaml recording.enabled)"}, 409
+    post_s = request.args.get("post_s", type=float)
+    return {"clip": recorder.trigger("manual", post_s=post_s), **recorder.summary()}
+
 if __name__ == "__main__":
     try:
         # Run HTTP server; capture thread keeps feeding frames
         app.run(host="0.0.0.0", port=PORT, threaded=True)
     finally:
         stop_flag = True
-        cap.release()
+        overlay.close()
+        cam.release()
+        if recorder is not None:
+            recorder.close()
+            print(f"[recorder] {recorder.summary()}")
+        if gate is not None:
+            print(f"[gate] {gate.summary()}")
@@ -1,57 +1,58 @@
 # Logs bbox center pixel coords (u,v) to JSONL and optionally shows live video.
 # Env vars:
-#   MODEL=/path/to/best.pt | CAM=usb|csi | IMGSZ=640 | CONF=0.25 | LOG=./detections.log | SHOW=0|1
-import os, time, json
-import cv2
-from ultralytics import YOLO
+#   MODEL=/path/to/best.pt | CAM=usb|csi|test|file|synthetic | IMGSZ=640 | CONF=0.25 | LOG=./detections.log | SHOW=0|1
+#   CAMERA_CONFIG=configs/camera.yaml (resolution, fps, pipeline tuning; CAM overrides its source)
+#   BACKEND=ultralytics|onnx|stub | DEVICE=cpu|0 | THREADS=0 | NAMES=weed,crop (stub class names)
+import os, time
+from vision.capture.gate import ChangeGate
+from vision.capture.pipeline import CAMERA_CONFIG, load_camera_config
+from vision.capture.recorder import FrameRecorder
+from vision.capture.sources import CaptureError, open_source
+from vision.detection.backends import create_backend
+from vision.detection.records import encode_frame
 
 MODEL = os.environ.get("MODEL", "best.pt")
-CAM   = os.environ.get("CAM", "usb")      # "usb" or "csi"
+CAM   = os.environ.get("CAM", "usb")      # see configs/camera.yaml "source"
 IMGSZ = int(os.environ.get("IMGSZ", "640"))
 CONF  = float(os.environ.get("CONF", "0.25"))
 LOG   = os.path.abspath(os.environ.get("LOG", "./detections.log"))
 SHOW  = int(os.environ.get("SHOW", "0"))
+BACKEND = os.environ.get("BACKEND", "ultralytics")
+DEVICE = os.environ.get("DEVICE") or None
+THREADS = int(os.environ.get("THREADS", "0"))
+NAMES = os.environ.get("NAMES") or None
+CAMERA_CFG = os.environ.get("CAMERA_CONFIG", str(CAMERA_CONFIG))
 
-def csi_gst(width=1280, height=720, fps=30):
-    return (
-        f"nvarguscamerasrc ! video/x-raw(memory:NVMM), width={width}, height={height}, "
-        f"framerate={fps}/1, format=NV12 ! nvvidconv flip-method=0 ! video/x-raw, "
-        f"width={width}, height={height}, format=BGRx ! videoconvert ! "
-        f"video/x-raw, format=BGR ! appsink"
-    )
-    if show:
-        # direct to Jetson HDMI monitor (no GTK needed)
-        pipeline += " ! nvvidconv ! nvoverlaysink sync=false"
-    else:
-        pipeline += " ! appsink drop=1"
-    return pipeline
+camera_cfg = load_camera_config(CAMERA_CFG, source=CAM)
+try:
+    cam = open_source(camera_cfg)
+except CaptureError as exc:
+    raise SystemExit(f"Camera open failed ({exc}); check CAM=usb|csi and device.")
 
-cap = cv2.VideoCapture(0 if CAM!="csi" else csi_gst(),
-                       cv2.CAP_GSTREAMER if CAM=="csi" else 0)
-if not cap.isOpened():
-    raise SystemExit("Camera open failed (check CAM=usb|csi and device).")
+model = create_backend(BACKEND, MODEL, imgsz=IMGSZ, conf=CONF, threads=THREADS, device=DEVICE, names=NAMES)
+recorder = FrameRecorder.from_config(camera_cfg["recording"])  # None unless recording is enabled
+gate = ChangeGate.from_config(camera_cfg["change_gate"])  # None unless change_gate is enabled
+boxes = None
 
-model = YOLO(MODEL)
+try:
+    with open(LOG, "ab") as f:
+        while True:
+            frame = cam.read()
+            if frame is None:
+                break
 
-with open(LOG, "a") as f:
-    while True:
-        ok, frame = cap.read()
-        if not ok:
-            break
-
-        res = model.predict(source=frame, imgsz=IMGSZ, conf=CONF, verbose=False)
-        dets = []
-        if len(res):
-            for b in res[0].boxes:
-                x1,y1,x2,y2 = map(float, b.xyxy[0])
-                u = (x1 + x2) / 2.0
-                v = (y1 + y2) / 2.0
-                dets.append({
-                    "u": u, "v": v,
-                    "w": x2-x1, "h": y2-y1,
-                    "cls": int(b.cls[0]) if hasattr(b,'cls') else -1,
-                    "conf": float(b.conf[0]) if hasattr(b,'conf') else 0.0
-                })
-
-        f.write(json.dumps({"ts": time.time(), "detections": dets}) + "\n")
-        f.flush()
+            # stamp the record with when the pixels were captured, not when inference finished
+            captured = time.time() - frame.age()
+            if gate is None or gate.check(frame.image):
+                boxes = model.predict(frame.image)  # otherwise the scene is unchanged: reuse the last boxes
+            f.write(encode_frame(captured, boxes))
+            f.flush()
+            if recorder is not None:
+                recorder.push(frame.image, boxes, captured)  # a copy into the pool; disk I/O is on its thread
+finally:
+    cam.release()
+    if recorder is not None:
+        recorder.close()
+        print(f"[recorder] {recorder.summary()}")
+    if gate is not None:
+        print(f"[gate] {gate.summary()}")